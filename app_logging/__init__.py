@@ -0,0 +1,3 @@
+from .logger import JsonLogger, get_logger
+
+__all__ = ["JsonLogger", "get_logger"]
@@ -0,0 +1,157 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", 1.0))
+MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 5 * 1024 * 1024))
+BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 3))
+QUEUE_SIZE = 10000
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "app": record.app,
+            "event": record.msg,
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that never blocks the caller: records are dropped when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; the record is passed on untouched
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLogger:
+    """Structured logger: `logger.info("event_name", key=value, ...)` writes one JSON line.
+
+    Calls only put the record on a queue; a background thread writes the file.
+    Debug events are kept with probability `debug_sample_rate`, and a disabled
+    or unsampled debug call returns after one comparison, so they can stay on
+    hot paths. Pass values as fields rather than pre-formatted strings, so
+    nothing is built for events that are dropped.
+    """
+
+    def __init__(self, app_name, logger, handler, debug_sample_rate):
+        self.app_name = app_name
+        self._logger = logger
+        self._handler = handler
+        self.debug_sample_rate = debug_sample_rate
+        # Cached so a disabled debug call doesn't walk the logging hierarchy
+        self._debug_enabled = logger.isEnabledFor(logging.DEBUG) and debug_sample_rate > 0
+
+    @property
+    def dropped(self):
+        """Records dropped because the queue was full."""
+        return self._handler.dropped
+
+    def debug(self, event, **fields):
+        if not self._debug_enabled:
+            return
+        if self.debug_sample_rate < 1:
+            if random.random() >= self.debug_sample_rate:
+                return
+            fields["sample_rate"] = self.debug_sample_rate
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, exc_info=False, **fields):
+        self._log(logging.ERROR, event, fields, exc_info)
+
+    def _log(self, level, event, fields, exc_info=False):
+        if not self._logger.isEnabledFor(level):
+            return
+        record = self._logger.makeRecord(
+            self._logger.name, level, "", 0, event, None, None,
+            extra={"app": self.app_name, "fields": fields}
+        )
+        if exc_info:
+            record.exc_info = sys.exc_info()
+        self._handler.handle(record)
+
+
+def get_logger(app_name, log_dir=None, level=None, debug_sample_rate=None,
+               max_bytes=None, backup_count=None):
+    """Return the structured logger of an app, creating it on first use.
+
+    Safe to call on every Streamlit rerun: the same logger (and its writer
+    thread) is returned for the same app name.
+
+    Args:
+        app_name (str): Name recorded in every line and used for the file name
+        log_dir (str or Path): Directory of `<app_name>.jsonl`, defaults to ./logs
+        level (str): Minimum level, defaults to $LOG_LEVEL or INFO
+        debug_sample_rate (float): Fraction of debug events kept, defaults to
+            $LOG_DEBUG_SAMPLE_RATE or 1.0
+        max_bytes (int): Size at which the file is rotated, defaults to $LOG_MAX_BYTES or 5 MB
+        backup_count (int): Rotated files kept, defaults to $LOG_BACKUP_COUNT or 3
+
+    Returns:
+        JsonLogger: The app's logger
+    """
+    with _loggers_lock:
+        if app_name in _loggers:
+            return _loggers[app_name]
+
+        log_dir = Path(log_dir or "logs")
+        log_dir.mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            log_dir / f"{app_name}.jsonl",
+            maxBytes=max_bytes or MAX_BYTES,
+            backupCount=BACKUP_COUNT if backup_count is None else backup_count,
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.Queue(QUEUE_SIZE)
+        handler = DroppingQueueHandler(log_queue)
+        listener = QueueListener(log_queue, file_handler)
+        listener.start()
+        atexit.register(listener.stop)  # Writes what is still queued
+
+        logger = logging.getLogger(f"app_logging.{app_name}")
+        logger.setLevel((level or LOG_LEVEL).upper())
+        logger.propagate = False
+
+        json_logger = JsonLogger(
+            app_name, logger, handler,
+            DEBUG_SAMPLE_RATE if debug_sample_rate is None else debug_sample_rate
+        )
+        _loggers[app_name] = json_logger
+        return json_logger
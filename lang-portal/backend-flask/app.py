@@ -2,12 +2,15 @@ from flask import Flask, g
 from flask_cors import CORS
 
 from lib.db import Db
+import lib.compression
+import lib.serializer
 
 import routes.words
 import routes.groups
 import routes.study_sessions
 import routes.dashboard
 import routes.study_activities
+import routes.metrics
 
 def get_allowed_origins(app):
     try:
@@ -33,13 +36,24 @@ def create_app(test_config=None):
     
     if test_config is None:
         app.config.from_mapping(
-            DATABASE='words.db'
+            DATABASE='words.db',
+            COMPRESS_MIN_SIZE=1024,
+            JSON_PROVIDER='orjson',
+            DB_BUSY_TIMEOUT=0.1,
+            DB_MAX_RETRIES=8,
+            DB_JOURNAL_MODE='wal'
         )
     else:
         app.config.update(test_config)
     
     # Initialize database first since we need it for CORS configuration
-    app.db = Db(database=app.config['DATABASE'])
+    app.db = Db(
+        database=app.config['DATABASE'],
+        busy_timeout=app.config.get('DB_BUSY_TIMEOUT', 0.1),
+        max_retries=app.config.get('DB_MAX_RETRIES', 8),
+        journal_mode=app.config.get('DB_JOURNAL_MODE', 'wal')
+    )
+    app.db.upgrade(app)
     
     # Get allowed origins from study_activities table
     allowed_origins = get_allowed_origins(app)
@@ -57,6 +71,12 @@ def create_app(test_config=None):
         }
     })
 
+    # Serialize responses with orjson (falls back to the stdlib encoder if it's missing)
+    lib.serializer.init_app(app)
+
+    # gzip/brotli encode large responses for clients that accept it
+    lib.compression.init_app(app)
+
     # Close database connection
     @app.teardown_appcontext
     def close_db(exception):
@@ -68,6 +88,7 @@ def create_app(test_config=None):
     routes.study_sessions.load(app)
     routes.dashboard.load(app)
     routes.study_activities.load(app)
+    routes.metrics.load(app)
     
     return app
 
@@ -0,0 +1,46 @@
+"""Bytes and time per request for the list routes, with and without `fields=` and compression.
+
+Usage:
+  python benchmarks/bench_payloads.py [--words 1000] [--iterations 200]
+"""
+import argparse
+
+from common import make_app, cleanup, time_requests
+from lib.compression import brotli
+
+CASES = [
+  '/groups/1/words/raw?limit=1000',
+  '/groups/1/words/raw?limit=1000&fields=id,german,english',
+  '/words',
+  '/words?fields=id,german,english',
+  '/study_sessions?per_page=100',
+  '/study_sessions?per_page=100&fields=id,group_name,start_time',
+]
+
+# Without brotli installed the server answers br-only clients uncompressed, so there is nothing to measure
+ENCODINGS = [None, 'gzip'] + (['br'] if brotli is not None else [])
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--words', type=int, default=1000)
+  parser.add_argument('--iterations', type=int, default=200)
+  args = parser.parse_args()
+
+  app = make_app(n_words=args.words, n_reviews=args.words)
+  client = app.test_client()
+  try:
+    if brotli is None:
+      print("brotli is not installed; skipping the br rows")
+    print(f"{'url':<62} {'encoding':<9} {'bytes':>9} {'ms/req':>8}")
+    for url in CASES:
+      for encoding in ENCODINGS:
+        headers = {'Accept-Encoding': encoding} if encoding else None
+        ms, size = time_requests(client, url, args.iterations, headers)
+        print(f"{url:<62} {encoding or 'identity':<9} {size:>9} {ms:>8.2f}")
+  finally:
+    cleanup(app)
+
+
+if __name__ == '__main__':
+  main()
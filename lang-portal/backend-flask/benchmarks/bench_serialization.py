@@ -0,0 +1,75 @@
+"""Serialization throughput on 1k-row pages: dicts + stdlib json vs dicts + orjson vs SQLite json_object rows.
+
+Usage:
+  python benchmarks/bench_serialization.py [--rows 1000] [--iterations 200]
+"""
+import argparse
+import json
+import time
+
+from common import make_app, cleanup, time_requests
+
+from lib.fields import json_object
+from lib.serializer import dumps, json_rows
+from routes.groups import RAW_WORD_COLUMNS
+
+FIELDS = list(RAW_WORD_COLUMNS)
+QUERY = '''
+  SELECT {select}
+  FROM words w
+  JOIN word_groups wg ON w.id = wg.word_id
+  WHERE wg.group_id = 1
+  LIMIT ?
+'''
+
+
+def dict_rows(cursor, rows):
+  cursor.execute(QUERY.format(select=', '.join(f'{RAW_WORD_COLUMNS[f]} AS {f}' for f in FIELDS)), (rows,))
+  return [{field: row[field] for field in FIELDS} for row in cursor.fetchall()]
+
+
+def stdlib_dicts(cursor, rows):
+  return json.dumps({'raw_words': dict_rows(cursor, rows)}).encode('utf-8')
+
+
+def orjson_dicts(cursor, rows):
+  return dumps({'raw_words': dict_rows(cursor, rows)})
+
+
+def sqlite_rows(cursor, rows):
+  cursor.execute(QUERY.format(select=json_object(FIELDS, RAW_WORD_COLUMNS)), (rows,))
+  return b'{"raw_words":' + json_rows(cursor) + b'}'
+
+
+def bench(fn, cursor, rows, iterations):
+  fn(cursor, rows)
+  start = time.perf_counter()
+  for _ in range(iterations):
+    fn(cursor, rows)
+  return (time.perf_counter() - start) / iterations
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--rows', type=int, default=1000)
+  parser.add_argument('--iterations', type=int, default=200)
+  args = parser.parse_args()
+
+  app = make_app(n_words=args.rows)
+  try:
+    print(f'Encoding {args.rows} rows')
+    with app.app_context():
+      for fn in (stdlib_dicts, orjson_dicts, sqlite_rows):
+        cursor = app.db.cursor()
+        seconds = bench(fn, cursor, args.rows, args.iterations)
+        print(f'  {fn.__name__:<14} {seconds * 1000:8.2f} ms/page {args.rows / seconds:12.0f} rows/s')
+
+    url = f'/groups/1/words/raw?limit={args.rows}'
+    ms, size = time_requests(app.test_client(), url, args.iterations)
+    print(f'End to end {url}: {ms:.2f} ms/req, {args.rows / ms * 1000:.0f} rows/s ({size} bytes)')
+  finally:
+    cleanup(app)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,71 @@
+"""Fuzzy lookup latency: trigram index vs comparing against every row in Python, as the vocabulary grows.
+
+Usage:
+  python benchmarks/bench_trigrams.py [--sizes 1000,10000,100000] [--queries 50]
+"""
+import argparse
+import random
+import time
+
+from common import make_app, cleanup
+
+from lib import trigrams
+
+
+def typo(rng, word):
+  """Drop, double or swap one character."""
+  i = rng.randrange(len(word) - 1)
+  return rng.choice([
+    word[:i] + word[i + 1:],
+    word[:i] + word[i] + word[i:],
+    word[:i] + word[i + 1] + word[i] + word[i + 2:]
+  ])
+
+
+def full_scan(cursor, text, n):
+  target = trigrams.normalize(text)
+  max_distance = max(1, len(target) // 4)
+  cursor.execute('SELECT id, german FROM words')
+  matches = []
+  for word_id, german in cursor.fetchall():
+    distance = trigrams.edit_distance(target, trigrams.normalize(german), max_distance)
+    if distance <= max_distance:
+      matches.append((distance, word_id))
+  return sorted(matches)[:n]
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--sizes', default='1000,10000,100000')
+  parser.add_argument('--queries', type=int, default=50)
+  args = parser.parse_args()
+
+  print(f"{'words':>8} {'index ms':>9} {'scan ms':>9} {'index hit rate':>15}")
+  for size in (int(s) for s in args.sizes.split(',')):
+    app = make_app(n_words=size)
+    rng = random.Random(size)
+    try:
+      with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT id, german FROM words ORDER BY random() LIMIT ?', (args.queries,))
+        queries = [(word_id, typo(rng, german)) for word_id, german in cursor.fetchall()]
+
+        start = time.perf_counter()
+        hits = sum(
+          any(match['id'] == word_id for match in trigrams.fuzzy_lookup(cursor, query, 'german', 5))
+          for word_id, query in queries
+        )
+        index_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        start = time.perf_counter()
+        for _, query in queries:
+          full_scan(cursor, query, 5)
+        scan_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+      print(f'{size:>8} {index_ms:>9.2f} {scan_ms:>9.2f} {hits / len(queries):>15.0%}')
+    finally:
+      cleanup(app)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,85 @@
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+# Benchmarks run from anywhere; the app loads sql/ and seed/ relative to the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from app import create_app
+from lib import trigrams
+
+
+def random_word(rng, min_len=5, max_len=12):
+  return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_len, max_len)))
+
+
+def make_app(n_words=1000, n_reviews=0, seed=42, **config):
+  """Create the Flask app on a fresh temporary database filled with synthetic words.
+
+  All words are put in group 1; `n_reviews` review items are spread over them in one session.
+  """
+  rng = random.Random(seed)
+  fd, path = tempfile.mkstemp(suffix='.db', prefix='bench_')
+  os.close(fd)
+
+  app = create_app({'DATABASE': path, **config})
+  with app.app_context():
+    cursor = app.db.cursor()
+    app.db.setup_tables(cursor)
+    app.db.import_study_activities_json(cursor, 'seed/study_activities.json')
+
+    cursor.execute('INSERT INTO groups (name, words_count) VALUES (?, ?)', ('Bench Words', n_words))
+    group_id = cursor.lastrowid
+
+    words = []
+    for _ in range(n_words):
+      parts = [random_word(rng, 2, 4) for _ in range(3)]
+      words.append((''.join(parts), 'to ' + random_word(rng), json.dumps(parts)))
+    cursor.executemany('INSERT INTO words (german, english, parts) VALUES (?, ?, ?)', words)
+    cursor.execute('INSERT INTO word_groups (word_id, group_id) SELECT id, ? FROM words', (group_id,))
+    trigrams.rebuild(cursor)
+
+    if n_reviews:
+      cursor.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, 1)', (group_id,))
+      session_id = cursor.lastrowid
+      cursor.executemany(
+        'INSERT INTO word_review_items (word_id, study_session_id, correct_count) VALUES (?, ?, ?)',
+        [(rng.randint(1, n_words), session_id, rng.randint(0, 1)) for _ in range(n_reviews)]
+      )
+    app.db.commit()
+    app.db.close()
+
+  app.bench_database = path
+  return app
+
+
+def cleanup(app):
+  # WAL mode leaves -wal and -shm files next to the database
+  for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(app.bench_database + suffix):
+      os.remove(app.bench_database + suffix)
+
+
+def time_requests(client, url, iterations=200, headers=None):
+  """Issue `iterations` GETs and return (mean ms per request, response bytes of the last one)."""
+  response = client.get(url, headers=headers)
+  assert response.status_code == 200, response.get_data(as_text=True)
+  start = time.perf_counter()
+  for _ in range(iterations):
+    response = client.get(url, headers=headers)
+  elapsed = time.perf_counter() - start
+  return elapsed / iterations * 1000, len(response.get_data())
+
+
+def percentile(values, pct):
+  ordered = sorted(values)
+  if not ordered:
+    return 0.0
+  index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+  return ordered[index]
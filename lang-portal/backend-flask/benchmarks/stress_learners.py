@@ -0,0 +1,144 @@
+"""Drive N concurrent simulated learners against the backend and report throughput, p99 and error rates.
+
+Each learner creates a study session, fetches words and posts review items in a loop, like the
+practice apps do. Optionally another client resets the study history every few seconds, like the
+Settings page. Without --url an in-process threaded server on a temporary database is used; clients
+and server then share one interpreter, so point --url at a separately started backend to size real
+deployments.
+
+Usage:
+  python benchmarks/stress_learners.py [--learners 16] [--duration 10] [--url http://127.0.0.1:5000]
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from werkzeug.serving import make_server
+
+from common import make_app, cleanup, percentile
+
+
+class Results:
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.latencies = defaultdict(list)
+    self.errors = defaultdict(int)
+
+  def record(self, op, seconds, ok):
+    with self._lock:
+      self.latencies[op].append(seconds)
+      if not ok:
+        self.errors[op] += 1
+
+
+def timed(results, op, call):
+  start = time.perf_counter()
+  try:
+    response = call()
+    ok = response.status_code < 400
+  except requests.RequestException:
+    response, ok = None, False
+  results.record(op, time.perf_counter() - start, ok)
+  return response
+
+
+def learner(base_url, group_id, reviews_per_session, deadline, results, seed):
+  rng = random.Random(seed)
+  session = requests.Session()
+  while time.monotonic() < deadline:
+    words = timed(results, 'fetch_words', lambda: session.get(
+      f'{base_url}/groups/{group_id}/words/raw', params={'fields': 'id,german,english'}, timeout=30
+    ))
+    created = timed(results, 'create_session', lambda: session.post(
+      f'{base_url}/study_sessions', json={'group_id': group_id, 'study_activity_id': 1}, timeout=30
+    ))
+    if words is None or created is None or not (words.ok and created.ok):
+      continue
+    word_ids = [word['id'] for word in words.json()['raw_words']] or [1]
+    session_id = created.json()['session_id']
+    for _ in range(reviews_per_session):
+      if time.monotonic() >= deadline:
+        break
+      reviewed = timed(results, 'review', lambda: session.post(
+        f'{base_url}/study_sessions/{session_id}/review',
+        json={'word_id': rng.choice(word_ids), 'correct_count': rng.random() < 0.7},
+        timeout=30
+      ))
+      # The session was removed by a history reset; start a new one like the apps would
+      if reviewed is not None and reviewed.status_code == 404:
+        break
+
+
+def resetter(base_url, interval, deadline, results):
+  session = requests.Session()
+  while time.monotonic() + interval < deadline:
+    time.sleep(interval)
+    timed(results, 'reset', lambda: session.post(f'{base_url}/study_sessions/reset', timeout=30))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--learners', type=int, default=16)
+  parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+  parser.add_argument('--reviews', type=int, default=20, help='review items per session')
+  parser.add_argument('--reset-every', type=float, default=0, help='seconds between history resets, 0 disables')
+  parser.add_argument('--group-id', type=int, default=1)
+  parser.add_argument('--url', help='backend to test instead of an in-process server')
+  parser.add_argument('--words', type=int, default=500, help='words in the temporary database')
+  parser.add_argument('--max-retries', type=int, default=8, help='DB_MAX_RETRIES of the in-process server')
+  args = parser.parse_args()
+
+  app = server = None
+  base_url = args.url
+  if base_url is None:
+    app = make_app(n_words=args.words, DB_MAX_RETRIES=args.max_retries)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+  try:
+    requests.get(f'{base_url}/metrics/db', params={'reset': 'true'}, timeout=10)
+    results = Results()
+    deadline = time.monotonic() + args.duration
+    threads = [
+      threading.Thread(target=learner, args=(base_url, args.group_id, args.reviews, deadline, results, i))
+      for i in range(args.learners)
+    ]
+    if args.reset_every:
+      threads.append(threading.Thread(target=resetter, args=(base_url, args.reset_every, deadline, results)))
+
+    start = time.perf_counter()
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(latencies) for latencies in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f'{args.learners} learners for {elapsed:.1f}s against {base_url}')
+    print(f'{total} requests, {total / elapsed:.1f} req/s, {errors} errors ({errors / max(total, 1):.2%})')
+    print(f"{'operation':<16} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for op, latencies in sorted(results.latencies.items()):
+      print(
+        f'{op:<16} {len(latencies):>7} {len(latencies) / elapsed:>8.1f} '
+        f'{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} '
+        f'{results.errors[op]:>7}'
+      )
+
+    print('Lock contention (/metrics/db):')
+    for key, value in requests.get(f'{base_url}/metrics/db', timeout=10).json().items():
+      print(f'  {key:<24} {value}')
+  finally:
+    if server is not None:
+      server.shutdown()
+      cleanup(app)
+
+
+if __name__ == '__main__':
+  main()
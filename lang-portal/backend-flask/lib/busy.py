@@ -0,0 +1,135 @@
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Defaults for Db; SQLite's own busy handler waits BUSY_TIMEOUT seconds before we see SQLITE_BUSY
+BUSY_TIMEOUT = 0.1
+MAX_RETRIES = 8
+BACKOFF_BASE = 0.01
+BACKOFF_MAX = 1.0
+
+
+def is_busy(error):
+  """True for SQLITE_BUSY / SQLITE_LOCKED errors, which are worth retrying."""
+  code = getattr(error, 'sqlite_errorcode', None)
+  if code is not None:
+    # Extended codes (e.g. SQLITE_BUSY_SNAPSHOT) keep the primary code in the low byte
+    return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+  message = str(error)
+  return 'database is locked' in message or 'database table is locked' in message
+
+
+class LockMetrics:
+  """Thread-safe counters of SQLITE_BUSY errors, retries and time spent waiting on locks."""
+
+  def __init__(self, window=1000):
+    self._lock = threading.Lock()
+    self._waits = deque(maxlen=window)  # Recent lock waits, for percentiles
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self.busy_errors = 0
+      self.retries = 0
+      self.gave_up = 0
+      self.waits = 0
+      self.wait_seconds_total = 0.0
+      self.wait_seconds_max = 0.0
+      self._waits.clear()
+
+  def record_busy(self):
+    with self._lock:
+      self.busy_errors += 1
+
+  def record_retry(self):
+    with self._lock:
+      self.retries += 1
+
+  def record_wait(self, seconds, succeeded):
+    with self._lock:
+      self.waits += 1
+      self.wait_seconds_total += seconds
+      self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+      self._waits.append(seconds)
+      if not succeeded:
+        self.gave_up += 1
+
+  def snapshot(self):
+    with self._lock:
+      waits = sorted(self._waits)
+
+      def percentile(pct):
+        if not waits:
+          return 0.0
+        return waits[min(len(waits) - 1, int(round(pct / 100 * (len(waits) - 1))))]
+
+      return {
+        'busy_errors': self.busy_errors,
+        'retries': self.retries,
+        'gave_up': self.gave_up,
+        'lock_waits': self.waits,
+        'lock_wait_seconds_total': round(self.wait_seconds_total, 6),
+        'lock_wait_seconds_max': round(self.wait_seconds_max, 6),
+        'lock_wait_seconds_p50': round(percentile(50), 6),
+        'lock_wait_seconds_p99': round(percentile(99), 6)
+      }
+
+
+class RetryConnection(sqlite3.Connection):
+  """sqlite3 connection whose cursors and commits retry with backoff on SQLITE_BUSY.
+
+  Set `metrics`, `max_retries`, `backoff_base` and `backoff_max` after connecting.
+  """
+  metrics = None
+  max_retries = MAX_RETRIES
+  backoff_base = BACKOFF_BASE
+  backoff_max = BACKOFF_MAX
+
+  def cursor(self, factory=None):
+    return super().cursor(factory or RetryCursor)
+
+  def commit(self):
+    return self.retry(super().commit)
+
+  def retry(self, operation, *args):
+    """Run `operation`, retrying with full-jitter exponential backoff while the database is busy."""
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+      opened_transaction = not self.in_transaction
+      try:
+        result = operation(*args)
+      except sqlite3.OperationalError as e:
+        if not is_busy(e):
+          raise
+        if self.metrics is not None:
+          self.metrics.record_busy()
+        if attempt >= self.max_retries:
+          self._record_wait(started, succeeded=False)
+          raise
+        # A statement that began the transaction holds a stale snapshot; start over cleanly
+        if opened_transaction and self.in_transaction:
+          super().rollback()
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+        attempt += 1
+        if self.metrics is not None:
+          self.metrics.record_retry()
+        continue
+      if attempt:
+        self._record_wait(started, succeeded=True)
+      return result
+
+  def _record_wait(self, started, succeeded):
+    if self.metrics is not None:
+      self.metrics.record_wait(time.perf_counter() - started, succeeded)
+
+
+class RetryCursor(sqlite3.Cursor):
+  def execute(self, sql, parameters=()):
+    return self.connection.retry(super().execute, sql, parameters)
+
+  def executemany(self, sql, seq_of_parameters):
+    # Materialize generators so a retry sends the same rows again
+    return self.connection.retry(super().executemany, sql, list(seq_of_parameters))
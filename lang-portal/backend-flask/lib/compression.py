@@ -0,0 +1,61 @@
+import gzip
+
+from flask import request
+
+# brotli is optional; without it we only negotiate gzip
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+# Responses smaller than this are sent as-is, compressing them costs more than it saves
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+
+def choose_encoding(accept_encodings):
+  """Pick the best encoding the client accepts: brotli first (if installed), then gzip."""
+  br = accept_encodings.quality('br') if brotli is not None else 0
+  gz = accept_encodings.quality('gzip')
+  if br > 0 and br >= gz:
+    return 'br'
+  if gz > 0:
+    return 'gzip'
+  return None
+
+
+def compress(data, encoding, config):
+  if encoding == 'br':
+    return brotli.compress(data, quality=config.get('COMPRESS_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY))
+  return gzip.compress(data, compresslevel=config.get('COMPRESS_GZIP_LEVEL', DEFAULT_GZIP_LEVEL))
+
+
+def init_app(app):
+  """Register an after_request hook that gzip/brotli encodes large responses."""
+  app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+
+  @app.after_request
+  def compress_response(response):
+    # Leave streamed, already-encoded and non-200 responses alone
+    if (response.direct_passthrough
+        or response.status_code != 200
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+      return response
+
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+      return response
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+      return response
+
+    response.set_data(compress(data, encoding, app.config))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -1,21 +1,38 @@
+import os
 import sqlite3
 import json
 from flask import g
 
+from lib import trigrams
+from lib import busy
+
 class Db:
-  def __init__(self, database='words.db'):
+  def __init__(self, database='words.db', busy_timeout=busy.BUSY_TIMEOUT, max_retries=busy.MAX_RETRIES, journal_mode='wal'):
     self.database = database
     self.connection = None
+    # Seconds SQLite itself waits on a lock before we retry with backoff
+    self.busy_timeout = busy_timeout
+    self.max_retries = max_retries
+    # WAL lets readers and the single writer work at the same time
+    self.journal_mode = journal_mode
+    self.metrics = busy.LockMetrics()
 
   def get(self):
     if 'db' not in g:
-      g.db = sqlite3.connect(self.database)
+      g.db = sqlite3.connect(self.database, timeout=self.busy_timeout, factory=busy.RetryConnection)
       g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
+      g.db.metrics = self.metrics
+      g.db.max_retries = self.max_retries
+      if self.journal_mode:
+        g.db.execute(f'PRAGMA journal_mode = {self.journal_mode}')
     return g.db
 
   def commit(self):
     self.get().commit()
 
+  def rollback(self):
+    self.get().rollback()
+
   def cursor(self):
     # Ensure the connection is valid before getting a cursor
     connection = self.get()
@@ -42,18 +59,33 @@ class Db:
     self.get().commit()
 
     cursor.execute(self.sql('setup/create_table_word_review_items.sql'))
+    cursor.execute(self.sql('setup/create_table_review_batches.sql'))
     self.get().commit()
 
     cursor.execute(self.sql('setup/create_table_groups.sql'))
     self.get().commit()
 
     cursor.execute(self.sql('setup/create_table_word_groups.sql'))
+    cursor.execute(self.sql('setup/create_index_word_groups_group_word.sql'))
     self.get().commit()
 
     cursor.execute(self.sql('setup/create_table_study_activities.sql'))
     self.get().commit()
 
     cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
+    cursor.execute(self.sql('setup/create_table_study_session_keys.sql'))
+    self.get().commit()
+
+    self.setup_trigram_index(cursor)
+
+  def setup_trigram_index(self, cursor):
+    # Trigram index over the german and english forms, used for fuzzy lookups and distractors
+    cursor.execute(self.sql('setup/create_table_word_trigrams.sql'))
+    cursor.execute(self.sql('setup/create_index_word_trigrams_trigram.sql'))
+    cursor.execute(self.sql('setup/create_index_word_trigrams_word_id.sql'))
+    cursor.execute(self.sql('setup/create_trigger_words_delete_trigrams.sql'))
+    cursor.execute(self.sql('setup/create_table_word_trigrams_pending.sql'))
+    cursor.execute(self.sql('setup/create_trigger_words_update_trigrams.sql'))
     self.get().commit()
 
   def import_study_activities_json(self,cursor,data_json_path):
@@ -77,6 +109,7 @@ class Db:
 
       # Insert some sample words (verbs) from JSON file and associate with the group
       words = self.load_json(data_json_path)
+      indexed_words = []
 
       for word in words:
         # Insert the word into the words table
@@ -86,11 +119,15 @@ class Db:
         
         # Get the last inserted word's ID
         word_id = cursor.lastrowid
+        indexed_words.append((word_id, word['german'], word['english']))
 
         # Insert the word-group relationship into word_groups table
         cursor.execute('''
           INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)
         ''', (word_id, core_verbs_group_id))
+
+      # Keep the trigram index in step with the words table
+      trigrams.index_words(cursor, indexed_words)
       self.get().commit()
 
       # Update the words_count in the groups table by counting all words in the group
@@ -106,6 +143,24 @@ class Db:
 
       print(f"Successfully added {len(words)} verbs to the '{group_name}' group.")
 
+  # Create the tables added since a words.db may have been set up, so older databases keep working
+  def upgrade(self, app):
+    if not os.path.exists(self.database):
+      return  # setup_tables creates everything for a new database
+    with app.app_context():
+      cursor = self.cursor()
+      cursor.execute(self.sql('setup/create_table_review_batches.sql'))
+      cursor.execute(self.sql('setup/create_table_study_session_keys.sql'))
+      self.get().commit()
+
+      # Index words imported before the trigram index existed
+      self.setup_trigram_index(cursor)
+      cursor.execute('SELECT EXISTS (SELECT 1 FROM word_trigrams), EXISTS (SELECT 1 FROM words)')
+      indexed, has_words = cursor.fetchone()
+      if has_words and not indexed:
+        trigrams.rebuild(cursor)
+        self.get().commit()
+
   # Initialize the database with sample data
   def init(self, app):
     with app.app_context():
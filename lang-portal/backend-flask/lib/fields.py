@@ -0,0 +1,30 @@
+def parse_fields(value, columns):
+  """Resolve a `fields=` query parameter against the columns a route can return.
+
+  Args:
+    value (str): Comma separated field names, e.g. "id,german,english" (None or empty means all)
+    columns (dict): Response field name -> SQL expression, in response order
+
+  Returns:
+    list: The requested field names, in the order of `columns`
+
+  Raises:
+    ValueError: If an unknown field is requested, or only separators (e.g. "fields=,")
+  """
+  if not value:
+    return list(columns)
+
+  allowed = f"allowed fields: {', '.join(columns)}"
+  requested = {field.strip() for field in value.split(',') if field.strip()}
+  if not requested:
+    raise ValueError(f"No fields requested; {allowed}")
+  unknown = requested - set(columns)
+  if unknown:
+    raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}; {allowed}")
+  return [field for field in columns if field in requested]
+
+
+def json_object(fields, columns):
+  """Build a SQLite json_object(...) expression for the requested fields, keyed by response name."""
+  pairs = ', '.join(f"'{field}', {columns[field]}" for field in fields)
+  return f'json_object({pairs})'
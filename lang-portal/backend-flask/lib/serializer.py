@@ -0,0 +1,92 @@
+import dataclasses
+import decimal
+import json
+import sqlite3
+import uuid
+from datetime import date
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+# orjson is optional; without it everything falls back to the standard library encoder
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+
+def _default(obj):
+  """Types the encoders can't handle on their own."""
+  if isinstance(obj, sqlite3.Row):
+    return dict(obj)
+  if isinstance(obj, date):
+    return obj.isoformat()
+  if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+    return str(obj)
+  if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+    return dataclasses.asdict(obj)
+  raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+  """Serialize `obj` to JSON bytes with orjson when available."""
+  if orjson is not None:
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+  return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class OrjsonProvider(JSONProvider):
+  """Flask JSON provider backed by orjson; `jsonify` responses skip the str round trip."""
+
+  def dumps(self, obj, **kwargs):
+    return dumps(obj).decode('utf-8')
+
+  def loads(self, s, **kwargs):
+    return orjson.loads(s)
+
+  def response(self, *args, **kwargs):
+    obj = self._prepare_response_obj(args, kwargs)
+    return self._app.response_class(dumps(obj), mimetype='application/json')
+
+
+PROVIDERS = {
+  'orjson': OrjsonProvider,
+  'stdlib': DefaultJSONProvider
+}
+
+
+def init_app(app):
+  """Install the JSON provider named by the JSON_PROVIDER config key.
+
+  JSON_PROVIDER may be 'orjson' (the default, falls back to 'stdlib' when orjson isn't
+  installed), 'stdlib', or any flask JSONProvider subclass.
+  """
+  provider = app.config.setdefault('JSON_PROVIDER', 'orjson')
+  if provider == 'orjson' and orjson is None:
+    provider = 'stdlib'
+  provider_class = PROVIDERS[provider] if isinstance(provider, str) else provider
+  app.json = provider_class(app)
+
+
+def json_array(rows):
+  """Join rows whose first column is a json_object(...) text into a JSON array, as bytes."""
+  return b'[' + ','.join(row[0] for row in rows).encode('utf-8') + b']'
+
+
+def json_rows(cursor):
+  """Fetch the rows of a `SELECT json_object(...)` query as a JSON array, as bytes.
+
+  SQLite builds each row's JSON text itself, so no dict is created per row.
+  """
+  cursor.row_factory = None
+  return json_array(cursor)
+
+
+def rows_response(key, rows, status=200, **envelope):
+  """Build a JSON response holding the `json_rows` bytes under `key`, next to the `envelope` values."""
+  head = b'{' + dumps(key) + b':' + rows
+  if envelope:
+    body = head + b',' + dumps(envelope)[1:]
+  else:
+    body = head + b'}'
+  return current_app.response_class(body, status=status, mimetype='application/json')
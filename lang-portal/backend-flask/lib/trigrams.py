@@ -0,0 +1,181 @@
+import re
+
+# Word forms that are indexed in the word_trigrams table
+FIELDS = ('german', 'english')
+
+# Words are split like pg_trgm does: on anything that isn't a letter or digit
+WORD_RE = re.compile(r'[^\W_]+')
+# English forms can list alternatives, e.g. "to undertake; to do (an activity)"
+ALTERNATIVES_RE = re.compile(r'[;,/]')
+
+# How many candidates (by trigram overlap) are re-ranked in Python per lookup
+CANDIDATES_PER_RESULT = 10
+MIN_CANDIDATES = 50
+
+
+def normalize(text):
+  return ' '.join(WORD_RE.findall(text.casefold()))
+
+
+def variants(form, field):
+  """Normalized spellings a lookup may match: the whole form, each alternative, and English infinitives without "to"."""
+  found = {normalize(form)}
+  for alternative in ALTERNATIVES_RE.split(form):
+    alternative = normalize(alternative)
+    found.add(alternative)
+    if field == 'english' and alternative.startswith('to '):
+      found.add(alternative[3:])
+  found.discard('')
+  return found
+
+
+def trigrams(text):
+  """Return the set of trigrams of `text`, each word padded with two leading and one trailing space."""
+  grams = set()
+  for word in WORD_RE.findall(text.casefold()):
+    padded = f'  {word} '
+    grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+  return grams
+
+
+def similarity(a, b):
+  """Jaccard similarity of two trigram sets."""
+  if not a or not b:
+    return 0.0
+  shared = len(a & b)
+  return shared / (len(a) + len(b) - shared)
+
+
+def edit_distance(a, b, max_distance=None):
+  """Levenshtein distance between `a` and `b`.
+
+  With `max_distance`, gives up as soon as the distance is known to exceed it and returns max_distance + 1.
+  """
+  if len(a) < len(b):
+    a, b = b, a
+  if max_distance is not None and len(a) - len(b) > max_distance:
+    return max_distance + 1
+
+  previous = list(range(len(b) + 1))
+  for i, ca in enumerate(a, 1):
+    current = [i]
+    for j, cb in enumerate(b, 1):
+      current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+    if max_distance is not None and min(current) > max_distance:
+      return max_distance + 1
+    previous = current
+  return previous[-1]
+
+
+def index_words(cursor, words):
+  """Add the trigrams of `words`, an iterable of (id, german, english), to the word_trigrams table."""
+  cursor.executemany(
+    'INSERT INTO word_trigrams (trigram, word_id, field) VALUES (?, ?, ?)',
+    (
+      (gram, word_id, field)
+      for word_id, german, english in words
+      for field, text in (('german', german), ('english', english))
+      for gram in trigrams(text)
+    )
+  )
+
+
+def rebuild(cursor):
+  """Rebuild the whole trigram index from the words table."""
+  cursor.execute('DELETE FROM word_trigrams')
+  cursor.execute('DELETE FROM word_trigrams_pending')
+  cursor.execute('SELECT id, german, english FROM words')
+  index_words(cursor, cursor.fetchall())
+
+
+def index_pending(cursor):
+  """Re-index the words queued by the words_update_trigrams trigger after their german or english form changed."""
+  cursor.execute('SELECT 1 FROM word_trigrams_pending LIMIT 1')
+  if cursor.fetchone() is None:
+    return
+  # Writing first takes the write lock, so concurrent lookups don't index the same words twice
+  cursor.execute('DELETE FROM word_trigrams WHERE word_id IN (SELECT word_id FROM word_trigrams_pending)')
+  cursor.execute('''
+    SELECT w.id, w.german, w.english
+    FROM word_trigrams_pending p
+    JOIN words w ON w.id = p.word_id
+  ''')
+  index_words(cursor, cursor.fetchall())
+  cursor.execute('DELETE FROM word_trigrams_pending')
+  cursor.connection.commit()
+
+
+def candidates(cursor, grams, field, limit, exclude_id=None):
+  """Words sharing the most trigrams with `grams`, as (id, german, english, overlap) rows.
+
+  Only the posting lists of the query trigrams are read from the index, not the whole vocabulary.
+  """
+  if not grams:
+    return []
+  index_pending(cursor)
+  placeholders = ', '.join('?' for _ in grams)
+  cursor.execute(f'''
+    SELECT w.id, w.german, w.english, c.overlap
+    FROM (
+      SELECT word_id, COUNT(*) AS overlap
+      FROM word_trigrams
+      WHERE field = ? AND trigram IN ({placeholders})
+      GROUP BY word_id
+      ORDER BY overlap DESC
+      LIMIT ?
+    ) c
+    JOIN words w ON w.id = c.word_id
+    WHERE w.id != ?
+    ORDER BY c.overlap DESC
+  ''', (field, *grams, limit + 1, -1 if exclude_id is None else exclude_id))
+  return cursor.fetchall()[:limit]
+
+
+def similar_words(cursor, text, field, n, exclude_id=None):
+  """The `n` words whose `field` form looks most like `text`, e.g. as multiple-choice distractors.
+
+  Words with the same normalized form as `text` are skipped since they wouldn't be wrong answers.
+  """
+  grams = trigrams(text)
+  target = normalize(text)
+  results = []
+  for word_id, german, english, _ in candidates(cursor, grams, field, max(MIN_CANDIDATES, n * CANDIDATES_PER_RESULT), exclude_id):
+    form = german if field == 'german' else english
+    if normalize(form) == target:
+      continue
+    results.append({
+      'id': word_id,
+      'german': german,
+      'english': english,
+      'similarity': round(similarity(grams, trigrams(form)), 4)
+    })
+  results.sort(key=lambda word: word['similarity'], reverse=True)
+  return results[:n]
+
+
+def fuzzy_lookup(cursor, text, field, n, max_distance=None):
+  """Words whose `field` form is within `max_distance` edits of `text` (typo tolerant lookup).
+
+  Candidates come from the trigram index; only those are checked with the edit distance.
+  The default `max_distance` allows one typo per four characters.
+  """
+  target = normalize(text)
+  if max_distance is None:
+    max_distance = max(1, len(target) // 4)
+
+  grams = trigrams(text)
+  results = []
+  for word_id, german, english, _ in candidates(cursor, grams, field, max(MIN_CANDIDATES, n * CANDIDATES_PER_RESULT)):
+    form = german if field == 'german' else english
+    distance = min(edit_distance(target, variant, max_distance) for variant in variants(form, field))
+    if distance > max_distance:
+      continue
+    results.append({
+      'id': word_id,
+      'german': german,
+      'english': english,
+      'distance': distance,
+      'similarity': round(similarity(grams, trigrams(form)), 4)
+    })
+  results.sort(key=lambda word: (word['distance'], -word['similarity']))
+  return results[:n]
@@ -2,6 +2,85 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
 
+from lib.fields import parse_fields, json_object
+from lib.serializer import json_array, json_rows, rows_response
+
+# Columns returned by GET /groups, keyed by response name
+GROUP_COLUMNS = {
+  'id': 'id',
+  'group_name': 'name',
+  'word_count': 'words_count'
+}
+
+# Fields that can be requested through `fields=` on GET /groups/:id/words
+GROUP_WORD_COLUMNS = {
+  'id': 'w.id',
+  'german': 'w.german',
+  'english': 'w.english',
+  'parts': 'w.parts',
+  'correct_count': 'COALESCE(SUM(wr.correct_count), 0)',
+  'wrong_count': 'COALESCE(COUNT(wr.correct_count) - SUM(wr.correct_count), 0)'
+}
+REVIEW_FIELDS = ('correct_count', 'wrong_count')
+
+# Fields that can be requested through `fields=` on GET /groups/:id/words/raw
+RAW_WORD_COLUMNS = {
+  'id': 'w.id',
+  'german': 'w.german',
+  'english': 'w.english',
+  'parts': 'w.parts'
+}
+
+# Upper bound on the number of word ids in one bulk request
+MAX_BULK_WORD_IDS = 100000
+
+
+def parse_word_ids(data):
+  """Return `data['word_ids']` if it is a list of integer ids, otherwise None."""
+  word_ids = data.get('word_ids', [])
+  if not isinstance(word_ids, list) or len(word_ids) > MAX_BULK_WORD_IDS:
+    return None
+  if not all(isinstance(word_id, int) and not isinstance(word_id, bool) for word_id in word_ids):
+    return None
+  return word_ids
+
+
+def load_word_ids(cursor, word_ids):
+  """Fill the temp.bulk_word_ids table with the distinct `word_ids` that exist in words.
+
+  Returns the number of distinct ids that don't exist.
+  """
+  cursor.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_word_ids (word_id INTEGER PRIMARY KEY)')
+  cursor.execute('DELETE FROM temp.bulk_word_ids')
+  cursor.executemany('INSERT OR IGNORE INTO temp.bulk_word_ids (word_id) VALUES (?)', [(word_id,) for word_id in word_ids])
+  cursor.execute('DELETE FROM temp.bulk_word_ids WHERE word_id NOT IN (SELECT id FROM words)')
+  return cursor.rowcount
+
+
+def add_loaded_words(cursor, group_id):
+  """Add the words in temp.bulk_word_ids to a group, skipping existing members. Returns the number added."""
+  cursor.execute('''
+    INSERT INTO word_groups (word_id, group_id)
+    SELECT t.word_id, ?
+    FROM temp.bulk_word_ids t
+    WHERE NOT EXISTS (
+      SELECT 1 FROM word_groups wg WHERE wg.group_id = ? AND wg.word_id = t.word_id
+    )
+  ''', (group_id, group_id))
+  return cursor.rowcount
+
+
+def refresh_words_count(cursor, group_ids):
+  """Recompute the words_count counter cache of the given groups and return the new counts by id."""
+  placeholders = ', '.join('?' for _ in group_ids)
+  cursor.execute(f'''
+    UPDATE groups
+    SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id)
+    WHERE id IN ({placeholders})
+  ''', tuple(group_ids))
+  cursor.execute(f'SELECT id, words_count FROM groups WHERE id IN ({placeholders})', tuple(group_ids))
+  return {row[0]: row[1] for row in cursor.fetchall()}
+
 def load(app):
   @app.route('/groups', methods=['GET'])
   @cross_origin()
@@ -27,34 +106,25 @@ def load(app):
 
       # Query to fetch groups with sorting and the cached word count
       cursor.execute(f'''
-        SELECT id, name, words_count
+        SELECT {json_object(GROUP_COLUMNS, GROUP_COLUMNS)}
         FROM groups
         ORDER BY {sort_by} {order}
         LIMIT ? OFFSET ?
       ''', (groups_per_page, offset))
 
-      groups = cursor.fetchall()
+      groups = json_rows(cursor)
 
       # Query the total number of groups
       cursor.execute('SELECT COUNT(*) FROM groups')
       total_groups = cursor.fetchone()[0]
       total_pages = (total_groups + groups_per_page - 1) // groups_per_page
 
-      # Format the response
-      groups_data = []
-      for group in groups:
-        groups_data.append({
-          "id": group["id"],
-          "group_name": group["name"],
-          "word_count": group["words_count"]
-        })
-
       # Return groups and pagination metadata
-      return jsonify({
-        'groups': groups_data,
-        'total_pages': total_pages,
-        'current_page': page
-      })
+      return rows_response(
+        'groups', groups,
+        total_pages=total_pages,
+        current_page=page
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
@@ -105,29 +175,36 @@ def load(app):
       if order not in ['asc', 'desc']:
         order = 'asc'
 
+      # Only select (and serialize) the fields the client asked for
+      try:
+        fields = parse_fields(request.args.get('fields'), GROUP_WORD_COLUMNS)
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
       # Check if the group exists
       cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
       group = cursor.fetchone()
       if not group:
         return jsonify({"error": "Group not found"}), 404
 
+      # The review join is only needed when review counts are returned or sorted on
+      review_join = ''
+      if sort_by in REVIEW_FIELDS or any(field in REVIEW_FIELDS for field in fields):
+        review_join = 'LEFT JOIN word_review_items wr ON w.id = wr.word_id'
+
       # Query to fetch words with pagination and sorting
       cursor.execute(f'''
-        SELECT w.id,
-              w.german,
-              w.english,
-              w.parts,
-              COALESCE(SUM(wr.correct_count), 0) AS correct_count,
-              COALESCE(COUNT(wr.correct_count) - SUM(wr.correct_count), 0) AS wrong_count
+        SELECT {json_object(fields, GROUP_WORD_COLUMNS)}
         FROM words w
         JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN word_review_items wr ON w.id = wr.word_id
+        {review_join}
         WHERE wg.group_id = ?
-        ORDER BY {sort_by} {order}
+        GROUP BY w.id
+        ORDER BY {GROUP_WORD_COLUMNS[sort_by]} {order}
         LIMIT ? OFFSET ?
       ''', (id, words_per_page, offset))
       
-      words = cursor.fetchall()
+      words = json_rows(cursor)
 
       # Get total words count for pagination
       cursor.execute('''
@@ -138,23 +215,11 @@ def load(app):
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "german": word["german"],
-          "english": word["english"],
-          "parts": word["parts"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
-
-      return jsonify({
-        'words': words_data,
-        'total_pages': total_pages,
-        'current_page': page
-      })
+      return rows_response(
+        'words', words,
+        total_pages=total_pages,
+        current_page=page
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
@@ -165,6 +230,12 @@ def load(app):
     try:
       cursor = app.db.cursor()
       
+      # Only select (and serialize) the fields the client asked for
+      try:
+        fields = parse_fields(request.args.get('fields'), RAW_WORD_COLUMNS)
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
       # Check if the group exists
       cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
       group = cursor.fetchone()
@@ -177,23 +248,22 @@ def load(app):
       offset = (page - 1) * words_per_page
 
       # Query to fetch raw word data for the group
-      cursor.execute('''
-        SELECT w.*
+      cursor.execute(f'''
+        SELECT {json_object(fields, RAW_WORD_COLUMNS)}
         FROM words w
         JOIN word_groups wg ON w.id = wg.word_id
         WHERE wg.group_id = ?
         LIMIT ? OFFSET ?
       ''', (id, words_per_page, offset))
       
+      cursor.row_factory = None
       words = cursor.fetchall()
-      # Convert each row to a dict (adjust according to your cursor's row format)
-      words_data = [dict(word) for word in words]
 
-      return jsonify({
-        "raw_words": words_data,
-        "current_page": page,
-        "words_count": len(words_data)
-      })
+      return rows_response(
+        "raw_words", json_array(words),
+        current_page=page,
+        words_count=len(words)
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
   
@@ -213,17 +283,19 @@ def load(app):
       sort_by = request.args.get('sort_by', 'created_at')
       order = request.args.get('order', 'desc')  # Default to newest first
 
-      # Map frontend sort keys to database columns
+      # Map frontend sort keys to the columns of the sessions subquery below
       sort_mapping = {
-        'start_time': 'created_at',
+        'start_time': 'start_time',
         'end_time': 'last_activity_time',
-        'activity_name': 'a.name',
-        'group_name': 'g.name',
+        'activity_name': 'activity_name',
+        'group_name': 'group_name',
         'review_items_count': 'review_count'
       }
 
-      # Use mapped sort column or default to created_at
-      sort_column = sort_mapping.get(sort_by, 'created_at')
+      # Use mapped sort column or default to start_time
+      sort_column = sort_mapping.get(sort_by, 'start_time')
+      if order not in ['asc', 'desc']:
+        order = 'desc'
 
       # Get total count for pagination
       cursor.execute('''
@@ -234,57 +306,220 @@ def load(app):
       total_sessions = cursor.fetchone()[0]
       total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
 
-      # Get study sessions for this group with dynamic calculations
+      # Get study sessions for this group with dynamic calculations.
+      # If there's no last_activity_time, use start_time + 30 minutes as the end time.
       cursor.execute(f'''
-        SELECT 
-          s.id,
-          s.group_id,
-          s.study_activity_id,
-          s.created_at as start_time,
-          (
-            SELECT MAX(created_at)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as last_activity_time,
-          a.name as activity_name,
-          g.name as group_name,
-          (
-            SELECT COUNT(*)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as review_count
-        FROM study_sessions s
-        JOIN study_activities a ON s.study_activity_id = a.id
-        JOIN groups g ON s.group_id = g.id
-        WHERE s.group_id = ?
+        SELECT json_object(
+          'id', id,
+          'group_id', group_id,
+          'group_name', group_name,
+          'study_activity_id', study_activity_id,
+          'activity_name', activity_name,
+          'start_time', start_time,
+          'end_time', COALESCE(last_activity_time, datetime(start_time, '+30 minutes')),
+          'review_items_count', review_count
+        )
+        FROM (
+          SELECT 
+            s.id,
+            s.group_id,
+            s.study_activity_id,
+            s.created_at as start_time,
+            (
+              SELECT MAX(created_at)
+              FROM word_review_items
+              WHERE study_session_id = s.id
+            ) as last_activity_time,
+            a.name as activity_name,
+            g.name as group_name,
+            (
+              SELECT COUNT(*)
+              FROM word_review_items
+              WHERE study_session_id = s.id
+            ) as review_count
+          FROM study_sessions s
+          JOIN study_activities a ON s.study_activity_id = a.id
+          JOIN groups g ON s.group_id = g.id
+          WHERE s.group_id = ?
+        )
         ORDER BY {sort_column} {order}
         LIMIT ? OFFSET ?
       ''', (id, sessions_per_page, offset))
       
-      sessions = cursor.fetchall()
-      sessions_data = []
-      
-      for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
-        
-        sessions_data.append({
-          "id": session["id"],
-          "group_id": session["group_id"],
-          "group_name": session["group_name"],
-          "study_activity_id": session["study_activity_id"],
-          "activity_name": session["activity_name"],
-          "start_time": session["start_time"],
-          "end_time": end_time,
-          "review_items_count": session["review_count"]
+      sessions = json_rows(cursor)
+
+      return rows_response(
+        'study_sessions', sessions,
+        total_pages=total_pages,
+        current_page=page
+      )
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # POST /groups creates one group ({"name", "word_ids"}) or many ({"groups": [...]}) in one transaction
+  @app.route('/groups', methods=['POST'])
+  @cross_origin()
+  def create_groups():
+    try:
+      data = request.get_json(silent=True)
+      if not isinstance(data, dict):
+        return jsonify({"error": "A JSON object is required"}), 400
+      specs = data.get('groups', [data])
+      if not isinstance(specs, list) or not specs:
+        return jsonify({"error": "groups must be a non-empty list"}), 400
+
+      names = []
+      for spec in specs:
+        name = spec.get('name') if isinstance(spec, dict) else None
+        if not isinstance(name, str) or not name.strip():
+          return jsonify({"error": "Every group needs a name"}), 400
+        if parse_word_ids(spec) is None:
+          return jsonify({"error": f"word_ids must be a list of at most {MAX_BULK_WORD_IDS} integers"}), 400
+        names.append(name.strip())
+      if len(set(names)) != len(names):
+        return jsonify({"error": "Group names must be unique"}), 400
+
+      cursor = app.db.cursor()
+      placeholders = ', '.join('?' for _ in names)
+      cursor.execute(f'SELECT name FROM groups WHERE name IN ({placeholders})', tuple(names))
+      existing = [row[0] for row in cursor.fetchall()]
+      if existing:
+        return jsonify({"error": f"Groups already exist: {', '.join(existing)}"}), 409
+
+      created = []
+      for name, spec in zip(names, specs):
+        cursor.execute('INSERT INTO groups (name) VALUES (?)', (name,))
+        group_id = cursor.lastrowid
+        missing = load_word_ids(cursor, parse_word_ids(spec))
+        created.append({
+          "id": group_id,
+          "name": name,
+          "words_added": add_loaded_words(cursor, group_id),
+          "missing_word_ids": missing
         })
+      refresh_words_count(cursor, [group["id"] for group in created])
+      app.db.commit()
 
-      return jsonify({
-        'study_sessions': sessions_data,
-        'total_pages': total_pages,
-        'current_page': page
-      })
+      return jsonify({"created": len(created), "groups": created}), 201
+    except Exception as e:
+      app.db.rollback()
+      return jsonify({"error": str(e)}), 500
+
+  # POST /groups/:id/words adds words to a group, DELETE removes them; both take {"word_ids": [...]}
+  @app.route('/groups/<int:id>/words', methods=['POST', 'DELETE'])
+  @cross_origin()
+  def update_group_words(id):
+    try:
+      data = request.get_json(silent=True)
+      word_ids = parse_word_ids(data) if isinstance(data, dict) else None
+      if word_ids is None:
+        return jsonify({"error": f"word_ids must be a list of at most {MAX_BULK_WORD_IDS} integers"}), 400
+
+      cursor = app.db.cursor()
+      cursor.execute('SELECT id FROM groups WHERE id = ?', (id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Group not found"}), 404
+
+      missing = load_word_ids(cursor, word_ids)
+      result = {"group_id": id, "requested": len(set(word_ids)), "missing": missing}
+      if request.method == 'POST':
+        result["added"] = add_loaded_words(cursor, id)
+        result["already_in_group"] = result["requested"] - missing - result["added"]
+      else:
+        cursor.execute('''
+          DELETE FROM word_groups
+          WHERE group_id = ? AND word_id IN (SELECT word_id FROM temp.bulk_word_ids)
+        ''', (id,))
+        result["removed"] = cursor.rowcount
+      result["words_count"] = refresh_words_count(cursor, [id])[id]
+      app.db.commit()
+
+      return jsonify(result)
+    except Exception as e:
+      app.db.rollback()
+      return jsonify({"error": str(e)}), 500
+
+  # POST /groups/:id/copy creates a new group {"name"} with the same words
+  @app.route('/groups/<int:id>/copy', methods=['POST'])
+  @cross_origin()
+  def copy_group(id):
+    try:
+      data = request.get_json(silent=True)
+      name = data.get('name') if isinstance(data, dict) else None
+      if not isinstance(name, str) or not name.strip():
+        return jsonify({"error": "name is required"}), 400
+      name = name.strip()
+
+      cursor = app.db.cursor()
+      cursor.execute('SELECT id FROM groups WHERE id = ?', (id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Group not found"}), 404
+      cursor.execute('SELECT id FROM groups WHERE name = ?', (name,))
+      if cursor.fetchone():
+        return jsonify({"error": f"Groups already exist: {name}"}), 409
+
+      cursor.execute('INSERT INTO groups (name) VALUES (?)', (name,))
+      new_id = cursor.lastrowid
+      cursor.execute('''
+        INSERT INTO word_groups (word_id, group_id)
+        SELECT DISTINCT word_id, ? FROM word_groups WHERE group_id = ?
+      ''', (new_id, id))
+      words_count = refresh_words_count(cursor, [new_id])[new_id]
+      app.db.commit()
+
+      return jsonify({"group_id": new_id, "name": name, "copied_from": id, "words_count": words_count}), 201
+    except Exception as e:
+      app.db.rollback()
+      return jsonify({"error": str(e)}), 500
+
+  # POST /groups/:id/merge adds the words of {"source_group_ids": [...]} to this group.
+  # With "delete_sources": true the sources are removed and their study sessions moved to this group.
+  @app.route('/groups/<int:id>/merge', methods=['POST'])
+  @cross_origin()
+  def merge_groups(id):
+    try:
+      data = request.get_json(silent=True)
+      source_ids = data.get('source_group_ids') if isinstance(data, dict) else None
+      if (not isinstance(source_ids, list) or not source_ids
+          or not all(isinstance(source_id, int) and not isinstance(source_id, bool) for source_id in source_ids)):
+        return jsonify({"error": "source_group_ids must be a non-empty list of integers"}), 400
+      source_ids = sorted(set(source_ids))
+      if id in source_ids:
+        return jsonify({"error": "A group can't be merged into itself"}), 400
+      delete_sources = bool(data.get('delete_sources', False))
+
+      cursor = app.db.cursor()
+      group_ids = [id] + source_ids
+      placeholders = ', '.join('?' for _ in group_ids)
+      cursor.execute(f'SELECT id FROM groups WHERE id IN ({placeholders})', tuple(group_ids))
+      found = {row[0] for row in cursor.fetchall()}
+      if found != set(group_ids):
+        missing = ', '.join(str(group_id) for group_id in group_ids if group_id not in found)
+        return jsonify({"error": f"Group not found: {missing}"}), 404
+
+      source_placeholders = ', '.join('?' for _ in source_ids)
+      cursor.execute(f'''
+        INSERT INTO word_groups (word_id, group_id)
+        SELECT DISTINCT wg.word_id, ?
+        FROM word_groups wg
+        WHERE wg.group_id IN ({source_placeholders})
+          AND NOT EXISTS (
+            SELECT 1 FROM word_groups t WHERE t.group_id = ? AND t.word_id = wg.word_id
+          )
+      ''', (id, *source_ids, id))
+      result = {"group_id": id, "added": cursor.rowcount, "deleted_groups": 0, "moved_sessions": 0}
+
+      if delete_sources:
+        cursor.execute(f'UPDATE study_sessions SET group_id = ? WHERE group_id IN ({source_placeholders})', (id, *source_ids))
+        result["moved_sessions"] = cursor.rowcount
+        cursor.execute(f'DELETE FROM word_groups WHERE group_id IN ({source_placeholders})', tuple(source_ids))
+        cursor.execute(f'DELETE FROM groups WHERE id IN ({source_placeholders})', tuple(source_ids))
+        result["deleted_groups"] = cursor.rowcount
+
+      result["words_count"] = refresh_words_count(cursor, [id])[id]
+      app.db.commit()
+
+      return jsonify(result)
     except Exception as e:
-      return jsonify({"error": str(e)}), 500
\ No newline at end of file
+      app.db.rollback()
+      return jsonify({"error": str(e)}), 500
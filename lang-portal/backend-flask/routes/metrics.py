@@ -0,0 +1,12 @@
+from flask import jsonify, request
+from flask_cors import cross_origin
+
+def load(app):
+  # Lock contention seen by this process: SQLITE_BUSY errors, retries and lock wait times
+  @app.route('/metrics/db', methods=['GET'])
+  @cross_origin()
+  def get_db_metrics():
+    metrics = app.db.metrics.snapshot()
+    if request.args.get('reset') == 'true':
+      app.db.metrics.reset()
+    return jsonify(metrics)
@@ -3,8 +3,27 @@ from flask_cors import cross_origin
 from datetime import datetime
 import math
 
+from lib.fields import parse_fields, json_object
+from lib.serializer import json_rows, rows_response
+
+# Largest batch accepted by POST /study_sessions/:id/reviews
+MAX_BATCH_ITEMS = 1000
+
+# Fields that can be requested through `fields=` on GET /study_sessions
+SESSION_COLUMNS = {
+  'id': 'ss.id',
+  'group_id': 'ss.group_id',
+  'group_name': 'g.name',
+  'activity_id': 'sa.id',
+  'activity_name': 'sa.name',
+  'start_time': 'ss.created_at',
+  'end_time': 'ss.created_at',  # For now, just use the same time since we don't track end time
+  'review_items_count': 'COUNT(wri.id)'
+}
+
 def load(app):
   # DONE /study_sessions POST
+  # With an idempotency_key, resending the request (e.g. after a timeout) returns the session it created.
   @app.route('/study_sessions', methods=['POST'])
   @cross_origin()
   def create_study_session():
@@ -14,21 +33,49 @@ def load(app):
       study_activity_id = data.get('study_activity_id')
       if not group_id or not study_activity_id:
         return jsonify({"error": "group_id and study_activity_id are required"}), 400
+      idempotency_key = data.get('idempotency_key')
+      if idempotency_key is not None and (not isinstance(idempotency_key, str) or not idempotency_key):
+        return jsonify({"error": "idempotency_key must be a non-empty string"}), 400
+
       cursor = app.db.cursor()
       created_at = datetime.utcnow().isoformat()
       cursor.execute('''
         INSERT INTO study_sessions (group_id, study_activity_id, created_at)
         VALUES (?, ?, ?)
       ''', (group_id, study_activity_id, created_at))
-      app.db.commit()
       new_session_id = cursor.lastrowid
+      if idempotency_key is not None:
+        cursor.execute('''
+          INSERT OR IGNORE INTO study_session_keys (idempotency_key, study_session_id)
+          VALUES (?, ?)
+        ''', (idempotency_key, new_session_id))
+        if cursor.rowcount == 0:
+          # Sent before: drop the new row and answer with the session the first request created
+          app.db.rollback()
+          cursor.execute('''
+            SELECT ss.id, ss.group_id, ss.study_activity_id, ss.created_at
+            FROM study_session_keys k
+            JOIN study_sessions ss ON ss.id = k.study_session_id
+            WHERE k.idempotency_key = ?
+          ''', (idempotency_key,))
+          session = cursor.fetchone()
+          return jsonify({
+            "session_id": session["id"],
+            "group_id": session["group_id"],
+            "study_activity_id": session["study_activity_id"],
+            "created_at": session["created_at"],
+            "duplicate": True
+          }), 200
+      app.db.commit()
       return jsonify({
         "session_id": new_session_id,
         "group_id": group_id,
         "study_activity_id": study_activity_id,
-        "created_at": created_at
+        "created_at": created_at,
+        "duplicate": False
       }), 201
     except Exception as e:
+      app.db.rollback()
       return jsonify({"error": str(e)}), 500
 
 
@@ -52,42 +99,37 @@ def load(app):
       ''')
       total_count = cursor.fetchone()['count']
 
+      # Only select (and serialize) the fields the client asked for
+      try:
+        fields = parse_fields(request.args.get('fields'), SESSION_COLUMNS)
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+      # The review items join is only needed when the count is returned
+      review_join = ''
+      if 'review_items_count' in fields:
+        review_join = 'LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id'
+
       # Get paginated sessions
-      cursor.execute('''
-        SELECT 
-          ss.id,
-          ss.group_id,
-          g.name as group_name,
-          sa.id as activity_id,
-          sa.name as activity_name,
-          ss.created_at,
-          COUNT(wri.id) as review_items_count
+      cursor.execute(f'''
+        SELECT {json_object(fields, SESSION_COLUMNS)}
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
+        {review_join}
         GROUP BY ss.id
         ORDER BY ss.created_at DESC
         LIMIT ? OFFSET ?
       ''', (per_page, offset))
-      sessions = cursor.fetchall()
+      sessions = json_rows(cursor)
 
-      return jsonify({
-        'items': [{
-          'id': session['id'],
-          'group_id': session['group_id'],
-          'group_name': session['group_name'],
-          'activity_id': session['activity_id'],
-          'activity_name': session['activity_name'],
-          'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-          'review_items_count': session['review_items_count']
-        } for session in sessions],
-        'total': total_count,
-        'page': page,
-        'per_page': per_page,
-        'total_pages': math.ceil(total_count / per_page)
-      })
+      return rows_response(
+        'items', sessions,
+        total=total_count,
+        page=page,
+        per_page=per_page,
+        total_pages=math.ceil(total_count / per_page)
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
@@ -126,10 +168,13 @@ def load(app):
 
       # Get the words reviewed in this session with their review status
       cursor.execute('''
-        SELECT 
-          w.*,
-          COALESCE(SUM(CASE WHEN wri.correct_count = 1 THEN 1 ELSE 0 END), 0) as session_correct_count,
-          COALESCE(SUM(CASE WHEN wri.correct_count = 0 THEN 1 ELSE 0 END), 0) as session_wrong_count
+        SELECT json_object(
+          'id', w.id,
+          'german', w.german,
+          'english', w.english,
+          'correct_count', COALESCE(SUM(CASE WHEN wri.correct_count = 1 THEN 1 ELSE 0 END), 0),
+          'wrong_count', COALESCE(SUM(CASE WHEN wri.correct_count = 0 THEN 1 ELSE 0 END), 0)
+        )
         FROM words w
         JOIN word_review_items wri ON wri.word_id = w.id
         WHERE wri.study_session_id = ?
@@ -138,7 +183,7 @@ def load(app):
         LIMIT ? OFFSET ?
       ''', (id, per_page, offset))
       
-      words = cursor.fetchall()
+      words = json_rows(cursor)
 
       # Get total count of words
       cursor.execute('''
@@ -148,10 +193,11 @@ def load(app):
         WHERE wri.study_session_id = ?
       ''', (id,))
       
-      total_count = cursor.fetchone()['count']
+      total_count = cursor.fetchone()[0]
 
-      return jsonify({
-        'session': {
+      return rows_response(
+        'words', words,
+        session={
           'id': session['id'],
           'group_id': session['group_id'],
           'group_name': session['group_name'],
@@ -161,18 +207,11 @@ def load(app):
           'end_time': session['created_at'],  # For now, just use the same time
           'review_items_count': session['review_items_count']
         },
-        'words': [{
-          'id': word['id'],
-          'german': word['german'],
-          'english': word['english'],
-          'correct_count': word['session_correct_count'],
-          'wrong_count': word['session_wrong_count']
-        } for word in words],
-        'total': total_count,
-        'page': page,
-        'per_page': per_page,
-        'total_pages': math.ceil(total_count / per_page)
-      })
+        total=total_count,
+        page=page,
+        per_page=per_page,
+        total_pages=math.ceil(total_count / per_page)
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
@@ -207,6 +246,62 @@ def load(app):
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
+  # POST /study_sessions/:id/reviews stores a batch of review items in one transaction.
+  # With a batch_id, resending the same batch (e.g. after a timeout) is a no-op.
+  @app.route('/study_sessions/<int:id>/reviews', methods=['POST'])
+  @cross_origin()
+  def review_study_session_batch(id):
+    try:
+      data = request.get_json(silent=True)
+      if not isinstance(data, dict):
+        return jsonify({"error": "A JSON object is required"}), 400
+      items = data.get('items')
+      if not isinstance(items, list) or not items or len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"items must be a list of 1 to {MAX_BATCH_ITEMS} review items"}), 400
+      rows = []
+      for index, item in enumerate(items):
+        if not isinstance(item, dict) or item.get('word_id') is None or item.get('correct_count') is None:
+          return jsonify({"error": f"items[{index}] needs word_id and correct_count"}), 400
+        word_id, correct_count = item['word_id'], item['correct_count']
+        if isinstance(word_id, bool) or not isinstance(word_id, int):
+          return jsonify({"error": f"items[{index}].word_id must be an integer"}), 400
+        # true/false, as sent by the study activities, or a count
+        if not isinstance(correct_count, (bool, int)):
+          return jsonify({"error": f"items[{index}].correct_count must be a boolean or an integer"}), 400
+        rows.append((id, word_id, int(correct_count)))
+      batch_id = data.get('batch_id')
+      if batch_id is not None and (not isinstance(batch_id, str) or not batch_id):
+        return jsonify({"error": "batch_id must be a non-empty string"}), 400
+
+      cursor = app.db.cursor()
+      cursor.execute('SELECT id FROM study_sessions WHERE id = ?', (id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Study session not found"}), 404
+
+      duplicate = False
+      if batch_id is not None:
+        cursor.execute('''
+          INSERT OR IGNORE INTO review_batches (batch_id, study_session_id, items_count)
+          VALUES (?, ?, ?)
+        ''', (batch_id, id, len(rows)))
+        duplicate = cursor.rowcount == 0
+      if not duplicate:
+        cursor.executemany('''
+          INSERT INTO word_review_items (study_session_id, word_id, correct_count)
+          VALUES (?, ?, ?)
+        ''', rows)
+      app.db.commit()
+
+      return jsonify({
+        "batch_id": batch_id,
+        "study_session_id": id,
+        "items_count": len(rows),
+        "duplicate": duplicate
+      }), 200 if duplicate else 201
+    except Exception as e:
+      app.db.rollback()
+      return jsonify({"error": str(e)}), 500
+
   @app.route('/study_sessions/reset', methods=['POST'])
   @cross_origin()
   def reset_study_sessions():
@@ -215,7 +310,9 @@ def load(app):
       
       # First delete all word review items since they have foreign key constraints
       cursor.execute('DELETE FROM word_review_items')
-      
+      cursor.execute('DELETE FROM review_batches')
+      cursor.execute('DELETE FROM study_session_keys')
+
       # Then delete all study sessions
       cursor.execute('DELETE FROM study_sessions')
       
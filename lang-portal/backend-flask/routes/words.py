@@ -1,6 +1,20 @@
 from flask import request, jsonify
 from flask_cors import cross_origin
 
+from lib.fields import parse_fields, json_object
+from lib.serializer import json_rows, rows_response
+from lib import trigrams
+
+# Fields that can be requested through `fields=` on GET /words
+WORD_COLUMNS = {
+  'id': 'w.id',
+  'german': 'w.german',
+  'english': 'w.english',
+  'correct_count': 'COALESCE(SUM(r.correct_count), 0)',
+  'wrong_count': 'COALESCE(COUNT(r.id) - SUM(r.correct_count), 0)'
+}
+REVIEW_FIELDS = ('correct_count', 'wrong_count')
+
 def load(app):
   # Endpoint: GET /words with pagination (50 words per page)
   @app.route('/words', methods=['GET'])
@@ -27,41 +41,40 @@ def load(app):
       if order not in ['asc', 'desc']:
         order = 'asc'
 
-      # Query to fetch words with sorting; note that we now select w.german and w.english
+      # Only select (and serialize) the fields the client asked for
+      try:
+        fields = parse_fields(request.args.get('fields'), WORD_COLUMNS)
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+      # The review join is only needed when review counts are returned or sorted on
+      review_join = ''
+      if sort_by in REVIEW_FIELDS or any(field in REVIEW_FIELDS for field in fields):
+        review_join = 'LEFT JOIN word_review_items r ON w.id = r.word_id'
+
       cursor.execute(f'''
-        SELECT w.id, w.german, w.english, 
-              COALESCE(SUM(r.correct_count), 0) AS correct_count,
-              COALESCE(COUNT(r.id) - SUM(r.correct_count), 0) AS wrong_count
+        SELECT {json_object(fields, WORD_COLUMNS)}
         FROM words w
-        LEFT JOIN word_review_items r ON w.id = r.word_id
-        ORDER BY {sort_by} {order}
+        {review_join}
+        GROUP BY w.id
+        ORDER BY {WORD_COLUMNS[sort_by]} {order}
         LIMIT ? OFFSET ?
       ''', (words_per_page, offset))
 
-      words = cursor.fetchall()
+      # SQLite builds the JSON for each row, no dicts are created in Python
+      words = json_rows(cursor)
 
       # Query the total number of words
       cursor.execute('SELECT COUNT(*) FROM words')
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response using the new keys: "german" and "english"
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "german": word["german"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
-
-      return jsonify({
-        "words": words_data,
-        "total_pages": total_pages,
-        "current_page": page,
-        "total_words": total_words
-      })
+      return rows_response(
+        "words", words,
+        total_pages=total_pages,
+        current_page=page,
+        total_words=total_words
+      )
 
     except Exception as e:
       return jsonify({"error": str(e)}), 500
@@ -117,3 +130,53 @@ def load(app):
       
     except Exception as e:
       return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /words/:id/similar to get plausible wrong answers (distractors) for a word
+  @app.route('/words/<int:word_id>/similar', methods=['GET'])
+  @cross_origin()
+  def get_similar_words(word_id):
+    try:
+      n = min(max(1, request.args.get('n', 3, type=int)), 50)
+      field = request.args.get('field', 'german')
+      if field not in trigrams.FIELDS:
+        return jsonify({"error": f"field must be one of: {', '.join(trigrams.FIELDS)}"}), 400
+
+      cursor = app.db.cursor()
+      cursor.execute('SELECT id, german, english FROM words WHERE id = ?', (word_id,))
+      word = cursor.fetchone()
+      if not word:
+        return jsonify({"error": "Word not found"}), 404
+
+      return jsonify({
+        "word": {
+          "id": word["id"],
+          "german": word["german"],
+          "english": word["english"]
+        },
+        "similar": trigrams.similar_words(cursor, word[field], field, n, exclude_id=word_id)
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /words/fuzzy?q= to look words up with typo tolerance, e.g. "Verbesern" -> "verbessern"
+  @app.route('/words/fuzzy', methods=['GET'])
+  @cross_origin()
+  def get_words_fuzzy():
+    try:
+      query = request.args.get('q', '').strip()
+      if not query:
+        return jsonify({"error": "q is required"}), 400
+      n = min(max(1, request.args.get('n', 5, type=int)), 50)
+      max_distance = request.args.get('max_distance', type=int)
+      field = request.args.get('field', 'german')
+      if field not in trigrams.FIELDS:
+        return jsonify({"error": f"field must be one of: {', '.join(trigrams.FIELDS)}"}), 400
+
+      cursor = app.db.cursor()
+      return jsonify({
+        "query": query,
+        "field": field,
+        "matches": trigrams.fuzzy_lookup(cursor, query, field, n, max_distance)
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
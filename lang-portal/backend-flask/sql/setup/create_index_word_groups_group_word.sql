@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_word ON word_groups (group_id, word_id);
\ No newline at end of file
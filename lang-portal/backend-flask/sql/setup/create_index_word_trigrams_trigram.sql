@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_trigrams_trigram ON word_trigrams (field, trigram, word_id);
\ No newline at end of file
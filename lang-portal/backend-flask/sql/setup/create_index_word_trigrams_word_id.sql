@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_trigrams_word_id ON word_trigrams (word_id);
\ No newline at end of file
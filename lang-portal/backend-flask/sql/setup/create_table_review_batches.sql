@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS review_batches (
+  batch_id TEXT PRIMARY KEY,  -- Generated by the client; a retried batch is recognised and not stored twice
+  study_session_id INTEGER NOT NULL,
+  items_count INTEGER NOT NULL,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+);
\ No newline at end of file
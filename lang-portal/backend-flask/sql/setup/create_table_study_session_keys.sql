@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS study_session_keys (
+  idempotency_key TEXT PRIMARY KEY,  -- Generated by the client; a retried POST /study_sessions returns the session it created
+  study_session_id INTEGER NOT NULL,
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+);
\ No newline at end of file
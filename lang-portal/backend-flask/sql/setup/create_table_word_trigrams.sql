@@ -0,0 +1,6 @@
+CREATE TABLE IF NOT EXISTS word_trigrams (
+  trigram TEXT NOT NULL,
+  word_id INTEGER NOT NULL,
+  field TEXT NOT NULL,  -- Which form the trigram comes from ('german' or 'english')
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
\ No newline at end of file
@@ -0,0 +1,3 @@
+CREATE TABLE IF NOT EXISTS word_trigrams_pending (
+  word_id INTEGER PRIMARY KEY  -- A word whose forms changed; its trigrams are re-indexed before the next lookup
+);
\ No newline at end of file
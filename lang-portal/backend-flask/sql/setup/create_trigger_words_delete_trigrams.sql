@@ -0,0 +1,4 @@
+CREATE TRIGGER IF NOT EXISTS words_delete_trigrams AFTER DELETE ON words
+BEGIN
+  DELETE FROM word_trigrams WHERE word_id = OLD.id;
+END;
\ No newline at end of file
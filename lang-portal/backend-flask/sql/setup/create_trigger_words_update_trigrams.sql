@@ -0,0 +1,6 @@
+-- Trigrams are computed in Python, so the trigger drops the stale ones and queues the word for lib/trigrams.index_pending
+CREATE TRIGGER IF NOT EXISTS words_update_trigrams AFTER UPDATE OF german, english ON words
+BEGIN
+  DELETE FROM word_trigrams WHERE word_id = OLD.id;
+  INSERT OR IGNORE INTO word_trigrams_pending (word_id) VALUES (NEW.id);
+END;
\ No newline at end of file
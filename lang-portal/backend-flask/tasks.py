@@ -9,3 +9,17 @@ def init_db(c):
     with app.app_context():
         db.init(app)
     print("Database initialized successfully.")
+
+
+@task
+def index_trigrams(c):
+    """Create (if needed) and rebuild the word trigram index of an existing words.db."""
+    from flask import Flask
+    from lib import trigrams
+    app = Flask(__name__)
+    with app.app_context():
+        cursor = db.cursor()
+        db.setup_trigram_index(cursor)
+        trigrams.rebuild(cursor)
+        db.commit()
+    print("Trigram index rebuilt successfully.")
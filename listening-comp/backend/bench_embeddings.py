@@ -0,0 +1,79 @@
+"""Benchmark sequential vs concurrent Bedrock embedding against a local stub.
+
+The stub sleeps like a Bedrock round trip and enforces a requests-per-second quota,
+answering over-quota calls with ThrottlingException like the real service does.
+
+Usage (from listening-comp/):
+    python -m backend.bench_embeddings [--texts 300] [--latency 0.15] [--quota 40] [--workers 1,4,8,16]
+"""
+import argparse
+import io
+import json
+import threading
+import time
+
+from backend.embeddings import BedrockEmbeddingFunction, TokenBucket
+
+
+class StubThrottlingError(Exception):
+    def __init__(self):
+        super().__init__("Rate exceeded")
+        self.response = {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}
+
+
+class StubBedrockClient:
+    """Stands in for a bedrock-runtime client: fixed latency, a per-second quota, deterministic vectors."""
+
+    def __init__(self, latency: float, quota: float, dimensions: int = 8):
+        self.latency = latency
+        self.quota = TokenBucket(quota) if quota else None
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+
+    def invoke_model(self, modelId, body):
+        with self.lock:
+            self.calls += 1
+        if self.quota is not None and self.quota.try_acquire():
+            with self.lock:
+                self.throttled += 1
+            raise StubThrottlingError()
+        time.sleep(self.latency)
+        text = json.loads(body)["inputText"]
+        # The first component identifies the text, so the order of the results can be checked
+        embedding = [float(len(text))] + [float(ord(c)) for c in text[:self.dimensions - 1]]
+        return {"body": io.BytesIO(json.dumps({"embedding": embedding}).encode())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.15, help="seconds per stub call")
+    parser.add_argument("--quota", type=float, default=40, help="stub requests per second, 0 for unlimited")
+    parser.add_argument("--rate", type=float, default=40, help="client-side requests per second")
+    parser.add_argument("--workers", default="1,4,8,16")
+    args = parser.parse_args()
+
+    texts = [f"Frage {i}: " + "Wie spät ist es? " * (i % 5 + 1) for i in range(args.texts)]
+    expected = [float(len(text)) for text in texts]
+
+    print(f"{args.texts} texts, {args.latency * 1000:.0f} ms per call, quota {args.quota or 'unlimited'}/s")
+    print(f"{'workers':>7} {'seconds':>8} {'texts/s':>8} {'calls':>6} {'throttled':>9} {'ordered':>8}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        stub = StubBedrockClient(args.latency, args.quota)
+        embed = BedrockEmbeddingFunction(
+            max_workers=workers, requests_per_second=args.rate, client=stub
+        )
+        start = time.perf_counter()
+        embeddings = embed(texts)
+        elapsed = time.perf_counter() - start
+        ordered = [embedding[0] for embedding in embeddings] == expected
+        print(
+            f"{workers:>7} {elapsed:>8.2f} {len(texts) / elapsed:>8.1f} "
+            f"{stub.calls:>6} {stub.throttled:>9} {str(ordered):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
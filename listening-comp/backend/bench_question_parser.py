@@ -0,0 +1,141 @@
+"""Fuzz and throughput checks for backend/question_parser.py.
+
+The fuzz round trip renders random questions the ways files and LLM responses
+write them (German or English markers, values on the marker line or the next
+one, several markers on one line, markdown bold, different list styles, speaker
+labels in conversations, tags or none, CRLF, stray blank lines) and checks that parsing gives the question back.
+Random garbage must parse without raising. The throughput check streams a large
+synthetic question file.
+
+Usage (from listening-comp/):
+    python -m backend.bench_question_parser [--cases 2000] [--questions 20000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+from backend.question_parser import FIELD_MARKERS, iter_questions, iter_questions_file, parse_questions
+
+WORDS = "Haus Zug Arzt Termin morgen heute Wetter Regen Kaffee Schule Reise Freund gern nicht sehr".split()
+# How LLMs label the lines of a dialogue; "Sprecher 1:" must not be read as a Speaker field
+SPEAKER_LABELS = ["Person {letter}:", "Sprecher {n}:", "Speaker {n}:", "Sprecher {letter}:", "Sprecher:", "Anna:"]
+SECTION_FIELDS = [
+    ["Text", "Statements"],
+    ["Introduction", "Conversation", "Question", "Options"],
+    ["Situation", "Question", "Statements"],
+    ["Statement", "Options"],
+]
+
+
+def sentence(rng, words=(3, 9)):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(*words))) + rng.choice([".", "?", "!", ""])
+
+
+def random_question(rng):
+    question = {}
+    for field in rng.choice(SECTION_FIELDS):
+        if field in ("Options", "Statements"):
+            question[field] = [sentence(rng) for _ in range(rng.randint(2, 4))]
+        elif field == "Conversation":
+            label = rng.choice(SPEAKER_LABELS)
+            question[field] = "\n".join(
+                label.format(n=n, letter="AB"[n - 1]) + " " + sentence(rng)
+                for n in (rng.randint(1, 2) for _ in range(rng.randint(1, 4)))
+            )
+        else:
+            question[field] = sentence(rng)
+    return question
+
+
+def render(rng, question):
+    blocks = []  # The lines of each field
+    same_line = rng.random() < 0.5
+    for field, value in question.items():
+        marker = rng.choice(FIELD_MARKERS[field])
+        marker = f"**{marker}:**" if rng.random() < 0.2 else f"{marker}:"
+        if isinstance(value, list):
+            style = rng.choice(["{n}. ", "{n}) ", "{letter}) ", "- "])
+            blocks.append([marker] + [style.format(n=n, letter="abcd"[n - 1]) + item for n, item in enumerate(value, 1)])
+        elif same_line or "\n" in value:
+            blocks.append(f"{marker} {value}".split("\n"))
+        else:
+            blocks.append([marker, value])
+    # Markers sharing a line, as LLMs sometimes write "Einleitung: ... Frage: ..."
+    for i in range(len(blocks) - 1):
+        if len(blocks[i]) == 1 and len(blocks[i + 1]) == 1 and rng.random() < 0.5:
+            blocks[i + 1] = [f"{blocks[i][0]} {blocks[i + 1][0]}"]
+            blocks[i] = []
+    lines = []
+    for block in blocks:
+        lines.extend(block)
+        if rng.random() < 0.3:
+            lines.append("")
+    return lines
+
+
+def fuzz(cases, rng):
+    checked = failures = 0
+    for case in range(cases):
+        questions = [random_question(rng) for _ in range(rng.randint(1, 4))]
+        tagged = rng.random() < 0.5 or len(questions) == 1
+        lines = []
+        for question in questions:
+            body = render(rng, question)
+            lines.extend(["<question>", *body, "</question>", ""] if tagged else body + [""])
+        newline = "\r\n" if rng.random() < 0.2 else "\n"
+        text = newline.join(lines)
+        # Without tags, a question only ends at a repeated field; keep those cases unambiguous
+        if not tagged and any(set(a) & set(b) != set(a) for a, b in zip(questions, questions[1:])):
+            continue
+        checked += 1
+        parsed = parse_questions(text)
+        if parsed != questions:
+            failures += 1
+            if failures <= 3:
+                print(f"Mismatch in case {case}:\n{text}\nexpected {questions}\nparsed   {parsed}\n")
+
+    alphabet = string.ascii_letters + string.digits + " .:)-*<>/\n\tüäößÜ"
+    for _ in range(cases):
+        garbage = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 400)))
+        garbage += rng.choice(["", "\nFrage:", "\n<question>", "\n1. x", "\nStatement 3:"])
+        list(iter_questions(garbage.splitlines()))
+    return checked, failures
+
+
+def throughput(count, rng):
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", encoding="utf-8", delete=False) as f:
+        for _ in range(count):
+            f.write("<question>\n" + "\n".join(render(rng, random_question(rng))) + "\n</question>\n\n")
+        path = f.name
+    try:
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        parsed = sum(1 for _ in iter_questions_file(path))
+        elapsed = time.perf_counter() - start
+    finally:
+        os.remove(path)
+    print(f"Parsed {parsed} questions ({size / 2**20:.1f} MB) in {elapsed:.2f}s: "
+          f"{parsed / elapsed:,.0f} questions/s, {size / 2**20 / elapsed:.1f} MB/s")
+    return parsed == count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    checked, failures = fuzz(args.cases, rng)
+    print(f"Fuzz: {checked} round trips, {failures} mismatches; {args.cases} garbage inputs parsed")
+    complete = throughput(args.questions, rng)
+    if failures or not complete:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
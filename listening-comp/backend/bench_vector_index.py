@@ -0,0 +1,121 @@
+"""Benchmark recall and latency of the vector index options over synthetic question corpora.
+
+Compares exact float32 search (the ground truth), the quantized side index
+(float16 and int8, with and without exact re-ranking) and, when chroma-hnswlib
+is installed, HNSW graphs with different M / ef_construction / ef_search. The
+corpus is clustered like topic embeddings and L2-normalized like Titan's output.
+
+Usage (from listening-comp/):
+    python -m backend.bench_vector_index [--sizes 10000,100000,1000000] [--dimensions 256]
+        [--queries 200] [--k 5] [--hnsw 16:100:10,16:100:64,32:200:128]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.quantized_index import QuantizedIndex
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+def synthetic_corpus(size, dimensions, clusters, seed=0):
+    """Unit vectors scattered around `clusters` topic centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions), dtype=np.float32)
+    vectors = np.empty((size, dimensions), dtype=np.float32)
+    for start in range(0, size, 100_000):
+        stop = min(start + 100_000, size)
+        vectors[start:stop] = centers[rng.integers(0, clusters, stop - start)]
+        vectors[start:stop] += rng.standard_normal((stop - start, dimensions), dtype=np.float32) * 0.8
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_search(vectors, query, k):
+    distances = np.einsum("ij,ij->i", vectors, vectors) - 2 * (vectors @ query)
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top])]
+
+
+def measure(search, queries, truth, k):
+    """p50 and p99 latency in ms and mean recall@k of search(query) -> positions."""
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(set(found[:k]) & set(expected)) / k)
+    return np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000, float(np.mean(recalls))
+
+
+def report(name, nbytes, build_seconds, p50, p99, recall):
+    print(f"  {name:<28} {nbytes / 2**20:>9.1f} {build_seconds:>8.2f} {p50:>8.2f} {p99:>8.2f} {recall:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="corpus sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--dimensions", type=int, default=256, help="Titan v1 uses 1536, v2 256/512/1024")
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5, help="results per query, recall@k is reported")
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--hnsw", default="16:100:10,16:100:64,32:200:128", help="M:ef_construction:ef_search,...")
+    args = parser.parse_args()
+
+    for size in (int(size) for size in args.sizes.split(",")):
+        vectors = synthetic_corpus(size, args.dimensions, args.clusters)
+        rng = np.random.default_rng(1)
+        # Queries near stored questions, like a topic close to existing exercises
+        queries = vectors[rng.integers(0, size, args.queries)] + rng.standard_normal(
+            (args.queries, args.dimensions), dtype=np.float32) * 0.05
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = [exact_search(vectors, query, args.k) for query in queries]
+
+        print(f"{size} vectors x {args.dimensions} dimensions, {args.queries} queries, recall@{args.k}")
+        print(f"  {'index':<28} {'MB':>9} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'recall':>7}")
+        report("exact float32", vectors.nbytes, 0.0,
+               *measure(lambda query: exact_search(vectors, query, args.k), queries, truth, args.k))
+
+        ids = np.arange(size).astype(str).tolist()
+        for quantization in ("float16", "int8"):
+            for rerank in (False, True):
+                start = time.perf_counter()
+                index = QuantizedIndex(
+                    args.dimensions, quantization, args.rerank_factor,
+                    # In the store the exact vectors come from Chroma; here from memory
+                    (lambda hit_ids: vectors[[int(hit_id) for hit_id in hit_ids]]) if rerank else None
+                )
+                index.add(ids, vectors)
+                build_seconds = time.perf_counter() - start
+                name = f"{quantization}" + (f" + rerank x{args.rerank_factor}" if rerank else "")
+                report(name, index.nbytes, build_seconds, *measure(
+                    lambda query: [int(hit_id) for hit_id, _ in index.search(query, args.k)], queries, truth, args.k
+                ))
+                del index
+
+        if hnswlib is None:
+            print("  (install chroma-hnswlib to benchmark HNSW settings)")
+        for setting in args.hnsw.split(",") if hnswlib is not None else []:
+            m, ef_construction, ef_search = (int(value) for value in setting.split(":"))
+            start = time.perf_counter()
+            graph = hnswlib.Index(space="l2", dim=args.dimensions)
+            graph.init_index(max_elements=size, M=m, ef_construction=ef_construction)
+            graph.add_items(vectors, np.arange(size))
+            graph.set_ef(max(ef_search, args.k))
+            build_seconds = time.perf_counter() - start
+            # Vectors plus roughly 2 * M neighbour links of 4 bytes on the base layer
+            nbytes = vectors.nbytes + size * 2 * m * 4
+            report(f"hnsw M={m} efc={ef_construction} ef={ef_search}", nbytes, build_seconds, *measure(
+                lambda query: graph.knn_query(query, k=args.k)[0][0].tolist(), queries, truth, args.k
+            ))
+            del graph
+        print()
+
+
+if __name__ == "__main__":
+    main()
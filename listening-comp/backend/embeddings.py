@@ -0,0 +1,270 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import boto3
+import numpy as np
+from botocore.config import Config
+from chromadb.utils import embedding_functions
+
+from backend.storage import SQLiteCache
+
+MODEL_ID = "amazon.titan-embed-text-v2:0"
+EMBEDDING_DIMENSIONS = 1536  # Size of the zero vector returned when a text can't be embedded
+
+# Bedrock error codes that mean "slow down" rather than "this request is wrong"
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+
+def is_throttling_error(error) -> bool:
+    """True if a boto3 ClientError (or anything shaped like one) reports throttling."""
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") in THROTTLING_CODES
+
+
+class TokenBucket:
+    """Thread-safe token bucket: on average `rate` acquisitions per second, bursts up to `capacity`.
+
+    The rate can be lowered while throttled and recovers gradually towards `max_rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.slowed_at = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available and return 0, else return the seconds until one is."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def slow_down(self, factor: float = 0.5, min_rate: float = 0.5, cooldown: float = 1.0):
+        """Multiplicative decrease after a throttling error, at most once per `cooldown` seconds.
+
+        Concurrent workers usually get throttled together; one burst should halve the rate once.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now - self.slowed_at >= cooldown:
+                self.rate = max(min_rate, self.rate * factor)
+                self.slowed_at = now
+
+    def speed_up(self):
+        """Additive increase after a success, up to the configured rate."""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 500)
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, whitespace collapsed, stripped."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache(SQLiteCache):
+    """Persistent embedding cache in SQLite, keyed by hash(model id, normalized text).
+
+    Holds at most `max_entries` embeddings as float32 blobs; beyond that the
+    least recently used ones are evicted.
+    """
+
+    table = "embeddings"
+    value_column = "embedding"
+
+    def __init__(self, path: str, max_entries: int = 100_000):
+        super().__init__(path, max_entries)
+
+    @staticmethod
+    def key(model_id: str, text: str) -> str:
+        return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Cached embeddings for `keys` (see `key`), with None where nothing is cached."""
+        return [None if blob is None else self._decode(blob) for blob in super().get_many(keys)]
+
+    def put_many(self, keys: List[str], embeddings: List[List[float]]):
+        super().put_many(keys, [array("f", embedding).tobytes() for embedding in embeddings])
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        values = array("f")
+        values.frombytes(blob)
+        return values.tolist()
+
+
+class BedrockEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    def __init__(self, model_id=MODEL_ID, max_workers: int = 8, requests_per_second: float = 20.0,
+                 max_retries: int = 8, backoff_base: float = 0.5, backoff_max: float = 20.0, client=None,
+                 cache: Optional[EmbeddingCache] = None):
+        """Initialize Bedrock embedding function (using region eu-west-1)
+
+        Args:
+            model_id (str): Bedrock embedding model
+            max_workers (int): Concurrent invoke_model calls; 1 embeds one text after another
+            requests_per_second (float): Token-bucket limit shared by all workers
+            max_retries (int): Retries of a throttled text before it falls back to a zero vector
+            backoff_base (float): First backoff ceiling in seconds after throttling, doubled per retry
+            backoff_max (float): Upper bound of a single backoff
+            client: bedrock-runtime client to use instead of creating one (e.g. a stub)
+            cache (EmbeddingCache): Consulted before calling the model; new embeddings are added to it
+        """
+        self.bedrock_client = client or boto3.client(
+            'bedrock-runtime',
+            region_name="eu-west-1",
+            config=Config(max_pool_connections=max(10, max_workers))
+        )
+        self.model_id = model_id
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.cache = cache
+        self.throttled = 0  # Throttling errors seen, for monitoring
+
+    @property
+    def model_name(self) -> str:
+        """Identifies the embedding model; recorded in collection metadata"""
+        return f"bedrock:{self.model_id}"
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts using Bedrock, in the order of `input`"""
+        if self.cache is None:
+            return [embedding or [0.0] * EMBEDDING_DIMENSIONS for embedding in self._embed_all(input)]
+
+        keys = [self.cache.key(self.model_id, text) for text in input]
+        embeddings = self.cache.get_many(keys)
+        # Embed each missing text once, even if it occurs several times in the input
+        missing = {}
+        for key, text, embedding in zip(keys, input, embeddings):
+            if embedding is None:
+                missing.setdefault(key, text)
+        if missing:
+            computed = dict(zip(missing, self._embed_all(list(missing.values()))))
+            # Failed texts (None) aren't cached, so they are retried next time
+            succeeded = [key for key, embedding in computed.items() if embedding is not None]
+            self.cache.put_many(succeeded, [computed[key] for key in succeeded])
+            embeddings = [
+                embedding if embedding is not None else computed[key]
+                for key, embedding in zip(keys, embeddings)
+            ]
+        return [embedding or [0.0] * EMBEDDING_DIMENSIONS for embedding in embeddings]
+
+    def _embed_all(self, texts: List[str]) -> List[Optional[List[float]]]:
+        if self.max_workers <= 1 or len(texts) <= 1:
+            return [self._embed(text) for text in texts]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(texts))) as executor:
+            return list(executor.map(self._embed, texts))
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """Embedding of one text, or None if it can't be embedded."""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.bedrock_client.invoke_model(
+                    modelId=self.model_id,
+                    body=json.dumps({
+                        "inputText": text
+                    })
+                )
+                response_body = json.loads(response['body'].read())
+                self.rate_limiter.speed_up()
+                return response_body['embedding']
+            except Exception as e:
+                if is_throttling_error(e) and attempt < self.max_retries:
+                    # Back off this text and slow every worker down until requests succeed again
+                    self.throttled += 1
+                    self.rate_limiter.slow_down()
+                    time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                    attempt += 1
+                    continue
+                print(f"Error generating embedding: {str(e)}")
+                # The caller substitutes a zero vector
+                return None
+
+
+class HashingEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    def __init__(self, dimensions: int = 512, char_ngrams=(3, 5)):
+        """Local CPU embeddings: hashed word and character n-gram counts, no model or network needed
+
+        Args:
+            dimensions (int): Size of the vectors
+            char_ngrams (tuple): Smallest and largest character n-gram, taken within words
+        """
+        self.dimensions = dimensions
+        self.char_ngrams = char_ngrams
+
+    @property
+    def model_name(self) -> str:
+        """Identifies the embedding model; recorded in collection metadata"""
+        return f"hashing-v1:{self.dimensions}:{self.char_ngrams[0]}-{self.char_ngrams[1]}"
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        """Embed a batch of texts as L2-normalized, sublinear-scaled hashed n-gram vectors"""
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(input):
+            for feature in self._features(text):
+                # crc32 is stable across processes, unlike hash(); the top bit picks the sign
+                h = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                columns.append(h % self.dimensions)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+
+        vectors = np.zeros((len(input), self.dimensions), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), signs)
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        return vectors.tolist()
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", normalize_text(text).lower())
+        features = [f"w:{word}" for word in words]
+        low, high = self.char_ngrams
+        for word in words:
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+
+EMBEDDING_BACKENDS = ("bedrock", "hashing")
+
+
+def create_embedding_function(backend: str, cache: Optional[EmbeddingCache] = None):
+    """Embedding function for a backend name from EMBEDDING_BACKENDS.
+
+    Only the Bedrock backend uses the cache; local embeddings are cheaper to recompute.
+    """
+    if backend == "bedrock":
+        return BedrockEmbeddingFunction(cache=cache)
+    if backend == "hashing":
+        return HashingEmbeddingFunction()
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {', '.join(EMBEDDING_BACKENDS)}")
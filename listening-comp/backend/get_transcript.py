@@ -2,9 +2,18 @@ import os
 from youtube_transcript_api import YouTubeTranscriptApi
 from typing import Optional, List, Dict
 
+from backend.transcript_store import TRANSCRIPT_STORE_DIR, TranscriptStore
+
 class YouTubeTranscriptDownloader:
-    def __init__(self, languages: List[str] = ["de", "en"]):
+    def __init__(self, languages: List[str] = ["de", "en"], store_dir: Optional[str] = TRANSCRIPT_STORE_DIR):
+        """
+        Args:
+            languages (List[str]): Transcript languages in order of preference
+            store_dir (str): Where downloaded transcripts are kept with their timestamps
+                (see backend/transcript_store.py); None downloads every time
+        """
         self.languages = languages
+        self.store = TranscriptStore(store_dir) if store_dir else None
 
     def extract_video_id(self, url: str) -> Optional[str]:
         """
@@ -22,15 +31,17 @@ class YouTubeTranscriptDownloader:
             return url.split("youtu.be/")[1][:11]
         return None
 
-    def get_transcript(self, video_id: str) -> Optional[List[Dict]]:
+    def get_transcript(self, video_id: str, refresh: bool = False) -> Optional[List[Dict]]:
         """
-        Download YouTube Transcript
+        Download YouTube Transcript, or load it from the transcript store if it was downloaded before
         
         Args:
             video_id (str): YouTube video ID or URL
+            refresh (bool): Download it again even if it is stored; the stored copy is only
+                used if the download fails
             
         Returns:
-            Optional[List[Dict]]: Transcript if successful, None otherwise
+            Optional[List[Dict]]: Transcript segments (text, start, duration) if successful, None otherwise
         """
         # Extract video ID if full URL is provided
         if "youtube.com" in video_id or "youtu.be" in video_id:
@@ -39,12 +50,22 @@ class YouTubeTranscriptDownloader:
             print("Invalid video ID or URL")
             return None
 
+        stored = self.store.get(video_id, self.languages) if self.store is not None else None
+        if stored is not None and not refresh:
+            return stored
+
         print(f"Downloading transcript for video ID: {video_id}")
         try:
-            return YouTubeTranscriptApi.get_transcript(video_id, languages=self.languages)
+            fetched = YouTubeTranscriptApi().fetch(video_id, languages=self.languages)
+            transcript = fetched.to_raw_data()
+            if self.store is not None:
+                self.store.put(video_id, transcript, fetched.language_code)
+            return transcript
         except Exception as e:
             print(f"An error occurred: {str(e)}")
-            return None
+            if stored is not None:
+                print(f"Using the stored transcript of {video_id}")
+            return stored
 
     def save_transcript(self, transcript: List[Dict], filename: str) -> bool:
         """
@@ -72,7 +93,7 @@ def main(video_url, print_transcript=False):
 
     if transcript:
         video_id = downloader.extract_video_id(video_url)
-        filename = f"./data/transcripts/{video_id}.txt"
+        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "transcripts", f"{video_id}.txt")
         if downloader.save_transcript(transcript, filename):
             print(f"Transcript saved successfully to {filename}")
             if print_transcript:
@@ -84,5 +105,6 @@ def main(video_url, print_transcript=False):
         print("Failed to get transcript")
 
 if __name__ == "__main__":
+    # Run from listening-comp/: python -m backend.get_transcript
     video_url = "https://www.youtube.com/watch?v=J6B82SjPFYY&list=PLxNPzeuPCA7BWJ8Uy5XaSkCdkhei21FhO"
     main(video_url, print_transcript=True)
@@ -0,0 +1,94 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# Frequent German and English words that carry no topic
+STOPWORDS = {
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einen", "einem", "einer", "eines",
+    "und", "oder", "aber", "in", "im", "am", "an", "auf", "aus", "bei", "mit", "nach", "von", "vom",
+    "zu", "zum", "zur", "für", "über", "ist", "sind", "war", "hat", "haben", "wird", "ich", "du",
+    "er", "sie", "es", "wir", "ihr", "nicht", "auch", "wie", "was", "wo", "wann", "the", "a", "an",
+    "and", "or", "of", "to", "in", "on", "at", "is", "are", "was", "for", "with", "what", "which",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords and single characters."""
+    return [token for token in re.findall(r"\w+", text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-process BM25 inverted index over documents keyed by id.
+
+    Adding an id that is already indexed replaces its document, so the index can
+    follow ChromaDB upserts. Safe to share between threads.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self.doc_lengths = {}
+        self.doc_terms = {}  # doc_id -> its distinct terms, to remove it without scanning the postings
+        self.total_length = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, ids: Iterable[str], documents: Iterable[str]):
+        with self.lock:
+            for doc_id, document in zip(ids, documents):
+                self._remove(doc_id)
+                counts = Counter(tokenize(document))
+                for term, frequency in counts.items():
+                    self.postings[term][doc_id] = frequency
+                length = sum(counts.values())
+                self.doc_lengths[doc_id] = length
+                self.doc_terms[doc_id] = tuple(counts)
+                self.total_length += length
+
+    def remove(self, ids: Iterable[str]):
+        with self.lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """Best matching (id, score) pairs, highest score first; only documents sharing a term with the query."""
+        terms = set(tokenize(query))
+        with self.lock:
+            n_docs = len(self.doc_lengths)
+            if not n_docs or not terms:
+                return []
+            average_length = self.total_length / n_docs
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:n_results]
+
+    def _remove(self, doc_id: str):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(doc_id):
+            del self.postings[term][doc_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """Fuse ranked id lists: each id scores the sum of 1 / (k + rank) over the lists it appears in."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return dict(scores)
@@ -0,0 +1,29 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+from backend.storage import SQLiteCache
+
+
+class ResponseCache(SQLiteCache):
+    """Persistent cache of LLM responses in SQLite, keyed by hash(model id, prompt, input, inference config).
+
+    Only deterministic calls (temperature 0) should be cached: for those the same
+    key always means the same response, so a cached one can replace the call.
+    Responses are never evicted.
+    """
+
+    table = "llm_responses"
+    value_column = "response"
+    value_type = "TEXT"
+
+    @staticmethod
+    def key(model_id: str, prompt: str, text: str, inference_config: Dict) -> str:
+        payload = json.dumps([model_id, prompt, text, inference_config], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key])[0]
+
+    def put(self, key: str, response: str):
+        self.put_many([key], [response])
@@ -0,0 +1,161 @@
+import re
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Mersenne prime modulus of the universal hash functions a * x + b mod p
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Character n-grams of the lowercased text with punctuation and extra whitespace removed.
+
+    Character shingles tolerate the small spelling and punctuation differences
+    between transcripts of the same exercise.
+    """
+    normalized = " ".join(re.findall(r"\w+", text.lower()))
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows) splitting num_perm whose S-curve midpoint (1/bands)^(1/rows) is closest to threshold."""
+    candidates = [(bands, num_perm // bands) for bands in range(1, num_perm + 1)]
+    return min(candidates, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class NearDuplicateIndex:
+    """MinHash signatures with locality-sensitive hashing over documents keyed by id.
+
+    `find` returns an indexed document whose estimated Jaccard similarity to the
+    given one is at least `threshold`, comparing against the few candidates that
+    share an LSH band instead of every document. Safe to share between threads.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        # As in datasketch: a * x + b wraps around in uint64, which mixes the bits further
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.signatures = {}
+        self.buckets = [defaultdict(set) for _ in range(self.bands)]
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def signature(self, document: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(document, self.shingle_size)),
+            dtype=np.uint64
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def add(self, ids: Iterable[str], documents: Iterable[str]):
+        signatures = [(doc_id, self.signature(document)) for doc_id, document in zip(ids, documents)]
+        with self.lock:
+            for doc_id, signature in signatures:
+                self._remove(doc_id)
+                self._insert(doc_id, signature)
+
+    def remove(self, ids: Iterable[str]):
+        with self.lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def find(self, document: str, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """The most similar indexed (id, estimated similarity) at or above the threshold, or None."""
+        signature = self.signature(document)
+        with self.lock:
+            return self._best_match(signature, exclude)
+
+    def add_unique(self, doc_id: str, document: str) -> Optional[Tuple[str, float]]:
+        """Index the document unless it is a near duplicate; returns the (id, similarity) it duplicates."""
+        signature = self.signature(document)
+        with self.lock:
+            match = self._best_match(signature, doc_id)
+            if match is None:
+                self._remove(doc_id)
+                self._insert(doc_id, signature)
+            return match
+
+    def clusters(self) -> List[List[str]]:
+        """Groups of ids that are near duplicates of each other (transitively), largest first."""
+        with self.lock:
+            parent = {doc_id: doc_id for doc_id in self.signatures}
+
+            def root(doc_id):
+                while parent[doc_id] != doc_id:
+                    parent[doc_id] = parent[parent[doc_id]]
+                    doc_id = parent[doc_id]
+                return doc_id
+
+            for doc_id, signature in self.signatures.items():
+                for other in self._candidates(signature):
+                    if other != doc_id and self.similarity(signature, self.signatures[other]) >= self.threshold:
+                        parent[root(other)] = root(doc_id)
+
+        groups = defaultdict(list)
+        for doc_id in parent:
+            groups[root(doc_id)].append(doc_id)
+        clusters = [sorted(group) for group in groups.values() if len(group) > 1]
+        return sorted(clusters, key=lambda group: (-len(group), group[0]))
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity: the share of equal MinHash values."""
+        return float(np.mean(first == second))
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _candidates(self, signature: np.ndarray) -> set:
+        candidates = set()
+        for buckets, key in zip(self.buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(key, ()))
+        return candidates
+
+    def _best_match(self, signature: np.ndarray, exclude: Optional[str]) -> Optional[Tuple[str, float]]:
+        best = None
+        for other in self._candidates(signature):
+            if other == exclude:
+                continue
+            score = self.similarity(signature, self.signatures[other])
+            if score >= self.threshold and (best is None or (score, other) > (best[1], best[0])):
+                best = (other, score)
+        return best
+
+    def _insert(self, doc_id: str, signature: np.ndarray):
+        self.signatures[doc_id] = signature
+        for buckets, key in zip(self.buckets, self._band_keys(signature)):
+            buckets[key].add(doc_id)
+
+    def _remove(self, doc_id: str):
+        signature = self.signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for buckets, key in zip(self.buckets, self._band_keys(signature)):
+            bucket = buckets[key]
+            bucket.discard(doc_id)
+            if not bucket:
+                del buckets[key]
+
+
+def duplicate_clusters(documents: Dict[str, str], threshold: float = 0.9) -> List[List[str]]:
+    """Clusters of near-duplicate ids among documents keyed by id, largest first."""
+    index = NearDuplicateIndex(threshold)
+    index.add(documents.keys(), documents.values())
+    return index.clusters()
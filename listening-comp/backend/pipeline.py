@@ -0,0 +1,277 @@
+"""Batch ingestion: YouTube videos -> transcripts -> Teil question files -> vector index.
+
+The three steps run as concurrent stages connected by bounded queues, so a
+video is being structured while the next transcripts download and the previous
+video is indexed, and a slow stage holds the faster ones back instead of
+letting work pile up. Every finished stage is checkpointed per video in
+data/pipeline_state.json; a rerun (after a crash, or with more videos) resumes
+each video after its last finished stage.
+
+Usage (from listening-comp/):
+    python -m backend.pipeline J6B82SjPFYY https://youtu.be/<id> [--file ids.txt] [--playlist URL] [--force]
+"""
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from backend.get_transcript import YouTubeTranscriptDownloader
+from backend.storage import read_json, write_json_atomic
+from backend.structured_data import DATA_DIR, QUESTIONS_DIR, SECTIONS, TRANSCRIPTS_DIR, TranscriptStructurer
+from backend.vector_store import QuestionVectorStore
+
+try:
+    import yt_dlp
+except ImportError:
+    yt_dlp = None
+
+STATE_PATH = os.path.join(DATA_DIR, "pipeline_state.json")
+# Stages in order; a video's checkpoint is the last one it finished
+STAGES = ("downloaded", "structured", "indexed")
+
+
+def playlist_video_ids(url: str) -> List[str]:
+    """Video IDs of a YouTube playlist (needs yt-dlp)."""
+    if yt_dlp is None:
+        raise RuntimeError("Expanding playlists needs yt-dlp: pip install yt-dlp")
+    with yt_dlp.YoutubeDL({"extract_flat": True, "quiet": True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return [entry["id"] for entry in info.get("entries") or [] if entry and entry.get("id")]
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        transcripts_dir: str = TRANSCRIPTS_DIR,
+        questions_dir: str = QUESTIONS_DIR,
+        state_path: str = STATE_PATH,
+        download_workers: int = 4,
+        structure_workers: int = 2,
+        queue_size: int = 4,
+        downloader: Optional[YouTubeTranscriptDownloader] = None,
+        structurer: Optional[TranscriptStructurer] = None,
+        store: Optional[QuestionVectorStore] = None
+    ):
+        """Download, structure and index videos, resuming from per-video checkpoints.
+
+        Args:
+            transcripts_dir (str): Where transcripts are written
+            questions_dir (str): Where the Teil question files are written
+            state_path (str): JSON file with each video's checkpoint
+            download_workers (int): Transcripts downloaded concurrently
+            structure_workers (int): Videos structured concurrently (each runs its sections in parallel too)
+            queue_size (int): Videos that may wait between two stages
+            downloader, structurer, store: Defaults are created on first use
+        """
+        self.transcripts_dir = transcripts_dir
+        self.questions_dir = questions_dir
+        self.state_path = state_path
+        self.download_workers = download_workers
+        self.structure_workers = structure_workers
+        self.queue_size = queue_size
+        self.downloader = downloader or YouTubeTranscriptDownloader()
+        self.structurer = structurer
+        self.store = store
+        # Guards the checkpoint state and the structuring manifest, which several workers update
+        self.lock = threading.Lock()
+        self.state = self.load_state()
+        self.structure_manifest = {}
+        self.index_manifest = {}
+        self.force = False
+        self.counts = {}
+        self.stage_seconds = {}
+
+    def load_state(self) -> Dict:
+        return read_json(self.state_path)
+
+    def save_state(self):
+        write_json_atomic(self.state_path, self.state)
+
+    def checkpoint(self, video_id: str, stage: Optional[str] = None, error: Optional[str] = None):
+        """Record a finished stage or an error for a video and persist it right away."""
+        with self.lock:
+            entry = self.state.setdefault(video_id, {"stage": None})
+            if stage is not None:
+                entry["stage"] = stage
+            entry["error"] = error
+            entry["updated_at"] = time.time()
+            self.save_state()
+
+    def finished(self, video_id: str, stage: str) -> bool:
+        """Whether a video already got through a stage (always False with force)."""
+        if self.force:
+            return False
+        done = self.state.get(video_id, {}).get("stage")
+        return done is not None and STAGES.index(done) >= STAGES.index(stage)
+
+    def transcript_path(self, video_id: str) -> str:
+        return os.path.join(self.transcripts_dir, f"{video_id}.txt")
+
+    def question_files(self, video_id: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.questions_dir, f"{video_id}_teil*.txt")))
+
+    def download(self, video_id: str) -> bool:
+        if self.finished(video_id, "downloaded") and os.path.exists(self.transcript_path(video_id)):
+            return True
+        # With force the transcript is downloaded again instead of read from the transcript store
+        transcript = self.downloader.get_transcript(video_id, refresh=self.force)
+        if not transcript:
+            self.checkpoint(video_id, error="transcript download failed")
+            return False
+        os.makedirs(self.transcripts_dir, exist_ok=True)
+        if not self.downloader.save_transcript(transcript, self.transcript_path(video_id)):
+            self.checkpoint(video_id, error="transcript could not be saved")
+            return False
+        self.checkpoint(video_id, "downloaded")
+        return True
+
+    def structure(self, video_id: str) -> bool:
+        if self.finished(video_id, "structured") and len(self.question_files(video_id)) == len(SECTIONS):
+            return True
+        status = self.structurer.structure_file(self.transcript_path(video_id), self.questions_dir, self.structure_manifest)
+        with self.lock:
+            # A snapshot, as other workers add their entries meanwhile
+            self.structurer.save_manifest(dict(self.structure_manifest), self.questions_dir)
+        if status in ("structured", "unchanged"):
+            self.checkpoint(video_id, "structured")
+            return True
+        # Sections that did succeed are cached, so the rerun only repeats the failed calls
+        self.checkpoint(video_id, error=f"structuring {status}; rerun to retry")
+        return False
+
+    def index(self, video_id: str) -> bool:
+        if self.finished(video_id, "indexed"):
+            return True
+        # Single worker, so the index manifest needs no lock
+        files = self.question_files(video_id)
+        for filename in files:
+            section_num = int(os.path.splitext(filename)[0].rsplit("_teil", 1)[1])
+            self.store.index_questions_file(filename, section_num, self.index_manifest)
+        # Sections that failed when the transcript was structured again had their old files removed
+        for section_num in SECTIONS:
+            filename = os.path.join(self.questions_dir, f"{video_id}_teil{section_num}.txt")
+            if filename not in files:
+                self.store.remove_questions_file(filename, self.index_manifest)
+        self.store.save_manifest(self.index_manifest)
+        self.checkpoint(video_id, "indexed")
+        return True
+
+    def _worker(self, stage, in_queue: queue.Queue, out_queue: Optional[queue.Queue]):
+        """Run a stage on the videos of in_queue until a None arrives; pass the successful ones on."""
+        while True:
+            video_id = in_queue.get()
+            if video_id is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok = stage(video_id)
+            except Exception as e:
+                print(f"Error in {stage.__name__} for {video_id}: {str(e)}")
+                self.checkpoint(video_id, error=f"{stage.__name__}: {str(e)}")
+                ok = False
+            with self.lock:
+                self.stage_seconds[stage.__name__] = self.stage_seconds.get(stage.__name__, 0.0) + time.perf_counter() - started
+            if out_queue is not None and ok:
+                # Blocks while the next stage is behind
+                out_queue.put(video_id)
+                continue
+            with self.lock:
+                self.counts["completed" if ok else "failed"] += 1
+
+    def run(self, video_ids: Iterable[str], force: bool = False) -> Dict[str, int]:
+        """Ingest videos; those already indexed are skipped unless force is set.
+
+        Returns:
+            Dict[str, int]: Videos completed, skipped (already indexed) and failed
+        """
+        self.force = force
+        self.counts = {"completed": 0, "skipped": 0, "failed": 0}
+        self.stage_seconds = {}
+        # A structurer created here is closed at the end of the run; one passed in belongs to the caller
+        owns_structurer = self.structurer is None
+        if owns_structurer:
+            self.structurer = TranscriptStructurer()
+        try:
+            return self._run(video_ids)
+        finally:
+            if owns_structurer:
+                self.structurer.close()
+                self.structurer = None
+
+    def _run(self, video_ids: Iterable[str]) -> Dict[str, int]:
+        if self.store is None:
+            self.store = QuestionVectorStore()
+        self.structure_manifest = self.structurer.load_manifest(self.questions_dir)
+        self.index_manifest = self.store.load_manifest()
+
+        stages = [
+            (self.download, self.download_workers),
+            (self.structure, self.structure_workers),
+            (self.index, 1),  # The vector store and its manifest are written by one thread
+        ]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages] + [None]
+        workers = []
+        for (stage, count), in_queue, out_queue in zip(stages, queues, queues[1:]):
+            threads = [
+                threading.Thread(target=self._worker, args=(stage, in_queue, out_queue), daemon=True)
+                for _ in range(count)
+            ]
+            for thread in threads:
+                thread.start()
+            workers.append(threads)
+
+        started = time.perf_counter()
+        seen = set()
+        for video_id in video_ids:
+            video_id = self.downloader.extract_video_id(video_id) if "youtu" in video_id else video_id
+            if not video_id or video_id in seen:
+                continue
+            seen.add(video_id)
+            if self.finished(video_id, "indexed"):
+                self.counts["skipped"] += 1
+                continue
+            queues[0].put(video_id)
+
+        # Stop each stage once the one before it has drained into it
+        for threads, in_queue in zip(workers, queues):
+            for _ in threads:
+                in_queue.put(None)
+            for thread in threads:
+                thread.join()
+
+        wall = time.perf_counter() - started
+        busy = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stage_seconds.items())
+        print(f"{self.counts} in {wall:.1f}s" + (f" (time spent per stage: {busy})" if busy else ""))
+        return self.counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download, structure and index YouTube listening exercises")
+    parser.add_argument("videos", nargs="*", help="video IDs or URLs")
+    parser.add_argument("--file", help="text file with one video ID or URL per line")
+    parser.add_argument("--playlist", action="append", default=[], help="playlist URL (needs yt-dlp)")
+    parser.add_argument("--force", action="store_true", help="run every stage again, also for indexed videos: transcripts are downloaded again, "
+                        "unchanged transcripts and question files are still not re-structured or re-indexed")
+    parser.add_argument("--download-workers", type=int, default=4)
+    parser.add_argument("--structure-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=4)
+    args = parser.parse_args()
+
+    video_ids = list(args.videos)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            video_ids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    for playlist in args.playlist:
+        video_ids.extend(playlist_video_ids(playlist))
+    if not video_ids:
+        parser.error("no videos given")
+
+    pipeline = IngestionPipeline(
+        download_workers=args.download_workers,
+        structure_workers=args.structure_workers,
+        queue_size=args.queue_size
+    )
+    pipeline.run(video_ids, force=args.force)
@@ -0,0 +1,118 @@
+import threading
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+QUANTIZATIONS = ("float16", "int8")
+SCAN_CHUNK_ROWS = 65536
+
+
+class QuantizedIndex:
+    """Brute-force vector index over float16 or int8 codes, re-ranked with exact vectors.
+
+    Vectors are kept at 2 (float16) or 1 (int8, with one float32 scale per vector)
+    bytes per dimension instead of 4. A search scans the codes for the
+    `n_results * rerank_factor` nearest candidates by approximate squared L2 distance
+    (the metric of Chroma's default "l2" space), then fetches the candidates' float32
+    vectors through `fetch_exact` and returns the n_results nearest by exact distance.
+    Without `fetch_exact` the approximate distances are returned. Safe to share
+    between threads.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        quantization: str = "int8",
+        rerank_factor: int = 4,
+        fetch_exact: Optional[Callable[[List[str]], Sequence[Sequence[float]]]] = None
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {', '.join(QUANTIZATIONS)}")
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.fetch_exact = fetch_exact
+        self.ids = []
+        self.positions = {}
+        self.codes = np.empty((0, dimensions), dtype=np.float16 if quantization == "float16" else np.int8)
+        self.scales = np.empty(0, dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)  # Squared norms of the decoded vectors
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes + self.norms.nbytes
+
+    def add(self, ids: Iterable[str], embeddings: Sequence[Sequence[float]]):
+        ids = list(ids)
+        if not ids:
+            return
+        codes, scales = self._encode(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dimensions))
+        decoded = self._decode(codes, scales)
+        norms = np.einsum("ij,ij->i", decoded, decoded)
+        with self.lock:
+            self._remove(ids)
+            start = len(self.ids)
+            self.ids.extend(ids)
+            self.positions.update((doc_id, start + offset) for offset, doc_id in enumerate(ids))
+            self.codes = np.concatenate([self.codes, codes])
+            self.scales = np.concatenate([self.scales, scales])
+            self.norms = np.concatenate([self.norms, norms])
+
+    def remove(self, ids: Iterable[str]):
+        with self.lock:
+            self._remove(ids)
+
+    def search(self, query: Sequence[float], n_results: int = 5) -> List[Tuple[str, float]]:
+        """The n_results nearest (id, squared L2 distance) pairs, nearest first."""
+        query = np.asarray(query, dtype=np.float32)
+        with self.lock:
+            if not self.ids:
+                return []
+            candidates = min(len(self.ids), n_results * (self.rerank_factor if self.fetch_exact else 1))
+            distances = np.empty(len(self.ids), dtype=np.float32)
+            # |x - q|^2 = |x|^2 - 2 x.q + |q|^2, with x.q = scale * (codes . q); converting
+            # the codes in chunks keeps the float32 working copy small
+            for start in range(0, len(self.ids), SCAN_CHUNK_ROWS):
+                stop = start + SCAN_CHUNK_ROWS
+                dots = (self.codes[start:stop].astype(np.float32) @ query) * self.scales[start:stop]
+                distances[start:stop] = self.norms[start:stop] - 2 * dots
+            top = np.argpartition(distances, candidates - 1)[:candidates]
+            ids = [self.ids[position] for position in top]
+            approximate = distances[top] + float(query @ query)
+
+        if self.fetch_exact is None:
+            ranked = sorted(zip(ids, approximate.tolist()), key=lambda item: item[1])
+            return ranked[:n_results]
+        exact = np.asarray(self.fetch_exact(ids), dtype=np.float32) - query
+        ranked = sorted(zip(ids, np.einsum("ij,ij->i", exact, exact).tolist()), key=lambda item: item[1])
+        return ranked[:n_results]
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.quantization == "float16":
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        # Symmetric per-vector scale: the largest component maps to 127
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _decode(self, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        if self.quantization == "float16":
+            return codes.astype(np.float32)
+        return codes.astype(np.float32) * scales[:, None]
+
+    def _remove(self, ids: Iterable[str]):
+        positions = [self.positions[doc_id] for doc_id in ids if doc_id in self.positions]
+        if not positions:
+            return
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[positions] = False
+        self.ids = [doc_id for doc_id, kept in zip(self.ids, keep) if kept]
+        self.positions = {doc_id: position for position, doc_id in enumerate(self.ids)}
+        self.codes = self.codes[keep]
+        self.scales = self.scales[keep]
+        self.norms = self.norms[keep]
@@ -1,7 +1,7 @@
 import boto3
 import json
-import re
 from typing import Dict, Optional
+from backend.question_parser import parse_question
 from backend.vector_store import QuestionVectorStore
 
 # MODEL_ID = "mistral.mistral-7b-instruct-v0:2"
@@ -34,133 +34,6 @@ class QuestionGenerator:
             print(f"Error invoking Bedrock: {str(e)}", flush=True)
             return None
 
-    def _split_multiple_markers(self, line: str) -> list:
-        """
-        If a single line contains multiple markers (e.g. 'Einleitung:' and
-        'Unterhaltung:'), split them so each marker becomes it
-        """
-        markers = [
-            "Einleitung:", "Introduction:",
-            "Unterhaltung:", "Conversation:",
-            "Situation:",
-            "Frage:", "Question:",
-            "Antwortmöglichkeiten:", "Options:"
-        ]
-        pattern = r'(' + '|'.join(re.escape(m) for m in markers) + r')'
-
-        tokens = re.split(pattern, line)
-        results = []
-        current_marker = None
-        current_text = []
-        
-        for t in tokens:
-            t = t.strip()
-            if not t:
-                continue
-            if t in markers:
-                # flush old
-                if current_marker or current_text:
-                    results.append(f"{current_marker} {' '.join(current_text)}".strip())
-                current_marker = t
-                current_text = []
-            else:
-                current_text.append(t)
-        if current_marker or current_text:
-            results.append(f"{current_marker} {' '.join(current_text)}".strip())
-        
-        return [r for r in results if r.strip()]
-
-    def _parse_question_response(self, response: str) -> Optional[Dict]:
-        """Parse a question response into a dictionary with keys:
-           Introduction, Conversation, Situation, Question, Options."""
-        try:
-            raw_lines = response.strip().split('\n')
-            all_lines = []
-            for line in raw_lines:
-                splitted = self._split_multiple_markers(line)
-                if splitted:
-                    all_lines.extend(splitted)
-                else:
-                    all_lines.append(line.strip())
-
-            question = {}
-            current_key = None
-            current_value = []
-
-            for line in all_lines:
-                line = line.strip()
-                if not line:
-                    continue
-
-                if line.startswith("Einleitung:") or line.startswith("Introduction:"):
-                    if current_key:
-                        if current_key == 'Options':
-                            question[current_key] = current_value
-                        else:
-                            question[current_key] = '\n'.join(current_value)
-                    current_key = 'Introduction'
-                    current_value = [line.split(":", 1)[1].strip()]
-                
-                elif line.startswith("Unterhaltung:") or line.startswith("Conversation:"):
-                    if current_key:
-                        if current_key == 'Options':
-                            question[current_key] = current_value
-                        else:
-                            question[current_key] = '\n'.join(current_value)
-                    current_key = 'Conversation'
-                    current_value = [line.split(":", 1)[1].strip()]
-                
-                elif line.startswith("Situation:"):
-                    if current_key:
-                        if current_key == 'Options':
-                            question[current_key] = current_value
-                        else:
-                            question[current_key] = '\n'.join(current_value)
-                    current_key = 'Situation'
-                    current_value = [line.split(":", 1)[1].strip()]
-                
-                elif line.startswith("Frage:") or line.startswith("Question:"):
-                    if current_key:
-                        if current_key == 'Options':
-                            question[current_key] = current_value
-                        else:
-                            question[current_key] = '\n'.join(current_value)
-                    current_key = 'Question'
-                    current_value = [line.split(":", 1)[1].strip()]
-
-                elif line.startswith("Antwortmöglichkeiten:") or line.startswith("Options:"):
-                    if current_key:
-                        if current_key == 'Options':
-                            question[current_key] = current_value
-                        else:
-                            question[current_key] = '\n'.join(current_value)
-                    current_key = 'Options'
-                    current_value = []
-                
-                elif (
-                    line
-                    and len(line) > 1
-                    and (line[0].isdigit() or line[0].isalpha())
-                    and line[1] in ['.', ')']
-                    and current_key == 'Options'
-                ):
-                    # e.g. "1. Something"
-                    current_value.append(line[2:].strip())
-                else:
-                    current_value.append(line)
-            
-            # flush last
-            if current_key:
-                if current_key == 'Options':
-                    question[current_key] = current_value
-                else:
-                    question[current_key] = '\n'.join(current_value)
-
-            return question
-        except Exception as e:
-            print(f"Error parsing question response: {str(e)}", flush=True)
-            return None
-
     def generate_similar_question(self, section_num: int, topic: str) -> Optional[Dict]:
         """Attempt to generate a question based on similar existing questions."""
         similar_questions = self.vector_store.search_similar_questions(section_num, topic, n_results=3)
@@ -245,7 +118,7 @@ class QuestionGenerator:
             print("[DEBUG] Response is None; returning None.", flush=True)
             return None
 
-        return self._parse_question_response(response)
+        return parse_question(response)
 
     def generate_question(self, section_num: int, topic: str) -> Dict:
         """
@@ -301,7 +174,7 @@ class QuestionGenerator:
         if not response:
             return {}
 
-        question = self._parse_question_response(response)
+        question = parse_question(response)
         print("[DEBUG] Final parsed fallback question =", question, flush=True)
         return question if question else {}
 
@@ -0,0 +1,143 @@
+"""Parser for Goethe B1 question text: the question files and the LLM's generated questions.
+
+Both use "Marker: value" fields in German or English, numbered option lists and,
+in files, optional <question>/<statement> blocks. Lines are tokenized with regexes
+compiled once at import, then a single pass assembles the questions, so a file
+is parsed as it is read.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Union
+
+Question = Dict[str, Union[str, List[str]]]
+
+# Field name -> the markers that introduce it
+FIELD_MARKERS = {
+    "Introduction": ("Einleitung", "Introduction"),
+    "Conversation": ("Unterhaltung", "Gespräch", "Dialog", "Conversation"),
+    "Situation": ("Situation",),
+    "Question": ("Frage", "Question"),
+    "Options": ("Antwortmöglichkeiten", "Optionen", "Options"),
+    "Text": ("Text",),
+    "Statements": ("Aussagen", "Statements"),
+    "Statement": ("Aussage", "Statement"),
+    "Speaker": ("Sprecher", "Speaker"),
+    "Answer": ("Antwort", "Lösung", "Answer"),
+}
+LIST_FIELDS = {"Options", "Statements"}
+
+_FIELD_BY_MARKER = {marker: field for field, markers in FIELD_MARKERS.items() for marker in markers}
+_MARKER_NAMES = "|".join(
+    re.escape(marker) for marker in sorted(_FIELD_BY_MARKER, key=len, reverse=True)
+)
+# A capitalized marker, optionally numbered ("Statement 2:") and in markdown bold ("**Frage:**")
+_MARKER_PATTERN = rf"\**({_MARKER_NAMES})(?:\s+(\d+))?\s*:\**"
+# A field starts at the beginning of a line, possibly after list numbering ("1. Frage:")
+_LINE_MARKER = re.compile(rf"(?:(?:\d{{1,2}}[.)]|[-•])\s*)?{_MARKER_PATTERN}")
+# Further markers on a field's line ("Einleitung: ... Frage: ...")
+_INLINE_MARKER = re.compile(rf"(?<!\w){_MARKER_PATTERN}")
+_OPEN_TAG = re.compile(r"^\s*<(question|statement)>\s*$", re.IGNORECASE)
+_CLOSE_TAG = re.compile(r"^\s*</(question|statement)>\s*$", re.IGNORECASE)
+# "1. x", "2) x", "b) x", "- x", "• x"
+_LIST_ITEM = re.compile(r"^\s*(?:(?:\d{1,2}|[a-dA-D])[.)]|[-*•])\s+(.*\S)")
+
+
+def _tokenize(lines: Iterable[str]) -> Iterator[tuple]:
+    """Yield ("open",), ("close",), ("fields", [(name, numbered, value), ...], line), ("item", text, line)
+    and ("text", line, line)."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if _OPEN_TAG.match(line):
+            yield ("open",)
+            continue
+        if _CLOSE_TAG.match(line):
+            yield ("close",)
+            continue
+        marker = _LINE_MARKER.match(line)
+        # "Sprecher 1: ..." is a line of dialogue; a Speaker field is never numbered
+        if marker is None or (_FIELD_BY_MARKER[marker.group(1)] == "Speaker" and marker.group(2)):
+            item = _LIST_ITEM.match(line)
+            yield ("item", item.group(1), line) if item else ("text", line, line)
+            continue
+        # Only unnumbered markers of other fields count mid-line, so a value may mention "Sprecher 2:"
+        markers = [marker] + [
+            inline for inline in _INLINE_MARKER.finditer(line, marker.end())
+            if inline.group(2) is None and _FIELD_BY_MARKER[inline.group(1)] != "Speaker"
+        ]
+        fields = []
+        for current, following in zip(markers, markers[1:] + [None]):
+            value = line[current.end():following.start() if following else len(line)].strip()
+            fields.append((_FIELD_BY_MARKER[current.group(1)], current.group(2) is not None, value))
+        yield ("fields", fields, line)
+
+
+def iter_questions(lines: Iterable[str]) -> Iterator[Question]:
+    """Yield each question as soon as its last line has been read.
+
+    A field starts with a marker at the beginning of a line. A question ends at a
+    closing tag, an opening tag, or a field it already has a value for or that is
+    numbered (the next "Text 2:" of a file without tags). Numbered statements
+    ("Statement 1: ...") are collected in "Statements". Inside a conversation,
+    speaker labels and numbered markers are dialogue, not fields. Text before the
+    first field, such as "Neue Frage:", is ignored.
+    """
+    question = {}
+    field = None
+    for token in _tokenize(lines):
+        kind = token[0]
+        if kind in ("open", "close"):
+            if question:
+                yield question
+            question, field = {}, None
+        elif kind == "fields":
+            _, fields, line = token
+            name, numbered, _ = fields[0]
+            if field == "Conversation" and (name == "Speaker" or numbered):
+                # A dialogue line such as "Sprecher: ..." or "Person 2: ..." continues the conversation
+                question[field] = f"{question[field]}\n{line}" if question[field] else line
+                continue
+            for name, numbered, value in fields:
+                if name == "Statement" and numbered:
+                    question.setdefault("Statements", [])
+                    if value:
+                        question["Statements"].append(value)
+                    field = "Statements"
+                    continue
+                if name in question:
+                    if question[name] or numbered:
+                        yield question
+                        question = {}
+                    else:
+                        # Only an empty heading so far, like "Neue Frage:"; filled in here instead
+                        del question[name]
+                field = name
+                if name in LIST_FIELDS:
+                    question[name] = [value] if value else []
+                else:
+                    question[name] = value
+        elif field is None:
+            continue
+        elif field in LIST_FIELDS:
+            question[field].append(token[1])
+        else:
+            # Continuation lines of a text field, e.g. a conversation, keep any list markers
+            line = token[2]
+            question[field] = f"{question[field]}\n{line}" if question[field] else line
+    if question:
+        yield question
+
+
+def parse_questions(text: str) -> List[Question]:
+    return list(iter_questions(text.splitlines()))
+
+
+def parse_question(text: str) -> Question:
+    """The first question of an LLM response, or {} when it has no recognizable fields."""
+    return next(iter_questions(text.splitlines()), {})
+
+
+def iter_questions_file(filename: str) -> Iterator[Question]:
+    """Stream the questions of a file without reading it into memory first."""
+    with open(filename, "r", encoding="utf-8") as f:
+        yield from iter_questions(f)
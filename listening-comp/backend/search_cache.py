@@ -0,0 +1,80 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from backend.embeddings import normalize_text
+
+
+class SearchResultCache:
+    """LRU cache of search results with a time-to-live and per-section generations.
+
+    Every write to a section bumps its generation, and entries stored under an
+    older generation are treated as misses, so a search never returns results
+    from before a write made in this process. The TTL bounds how stale results
+    can get when another process writes to the same store. Safe to share
+    between threads.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (generation, expires_at, results)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(section_num: int, query: str, *options: Hashable) -> tuple:
+        return (section_num, normalize_text(query).lower()) + options
+
+    def generation(self, section_num: int) -> int:
+        return self._generations.get(section_num, 0)
+
+    def bump(self, section_num: int):
+        """Invalidate the cached results of a section after a write."""
+        with self._lock:
+            self._generations[section_num] = self.generation(section_num) + 1
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, results = entry
+                if generation == self.generation(key[0]) and time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    # Callers get their own copy, so changing a result can't change the cache
+                    return copy.deepcopy(results)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, results: Any, generation: int):
+        """Store results computed while the section was at `generation` (read before searching).
+
+        Results of a search that raced with a write are dropped rather than cached.
+        """
+        with self._lock:
+            if generation != self.generation(key[0]):
+                return
+            self._entries[key] = (generation, time.monotonic() + self.ttl, copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
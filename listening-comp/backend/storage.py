@@ -0,0 +1,131 @@
+"""Local persistence shared by the caches, manifests and indexes of the backend."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def write_json_atomic(path: str, data: Any):
+    """Write JSON to a temporary file and rename it over `path`, so an interrupted
+    write never leaves a truncated file behind."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """The JSON in `path`, or `default` (an empty dict if not given) when the file doesn't exist."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {} if default is None else default
+
+
+class SQLiteCache:
+    """Persistent key-value cache in one SQLite table, optionally evicting the least recently used entries.
+
+    Subclasses name the table and value column and convert their values to what
+    is stored. Hit/miss counters are available through `stats()`. Safe to share
+    between threads.
+    """
+
+    table = "entries"
+    value_column = "value"
+    value_type = "BLOB"
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        """
+        Args:
+            path (str): SQLite database file
+            max_entries (int): Entries kept before evicting; None keeps everything
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                key TEXT PRIMARY KEY,
+                {self.value_column} {self.value_type} NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_used ON {self.table} (last_used)")
+        self.connection.commit()
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Stored values for `keys`, with None where nothing is cached."""
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = self.connection.execute(
+                    f"SELECT key, {self.value_column} FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self.connection.executemany(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self.connection.commit()
+            results = [found.get(key) for key in keys]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, keys: List[str], values: List[Any]):
+        now = time.time()
+        rows = [(key, value, now) for key, value in zip(keys, values)]
+        with self.lock:
+            self.connection.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)", rows)
+            self._evict()
+            self.connection.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            entries = self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute(f"DELETE FROM {self.table}")
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _evict(self):
+        if self.max_entries is None:
+            return
+        count = self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Evict down to 90% of the cap, so eviction doesn't run on every insert
+        excess = count - int(self.max_entries * 0.9)
+        self.connection.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self.evictions += excess
@@ -1,6 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
 from typing import Optional, Dict, List
 import boto3
+import glob
+import hashlib
+import json
 import os
+import random
+import threading
+import time
+from botocore.config import Config
+
+from backend.llm_cache import ResponseCache
+from backend.storage import read_json, write_json_atomic
+from backend.transcript_chunks import chunk_transcript, estimate_tokens, merge_section_outputs
 
 
 # MODEL_ID = "amazon.titan-text-lite-v1" # Getting errors sometimes because the Max input tokens is: 4096
@@ -13,13 +25,90 @@ MODEL_ID = "mistral.mistral-7b-instruct-v0:2" # Pretty results!!
 # MODEL_ID = "meta.llama3-2-1b-instruct-v1:0"
 # MODEL_ID = "meta.llama3-2-3b-instruct-v1:0"
 
-VIDEO_ID = "J6B82SjPFYY"
+SECTIONS = (1, 2, 3, 4)
+# Temperature 0 makes the output a function of model, prompt and transcript, so responses can be cached
+INFERENCE_CONFIG = {"temperature": 0}
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TRANSCRIPTS_DIR = os.path.join(DATA_DIR, "transcripts")
+QUESTIONS_DIR = os.path.join(DATA_DIR, "questions")
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.sqlite3"))
+
+# Context window of each model in tokens; transcripts that don't fit with the prompt are structured in chunks
+MODEL_MAX_INPUT_TOKENS = {
+    "amazon.titan-text-lite-v1": 4096,
+    "amazon.titan-text-express-v1": 8192,
+    "mistral.mistral-7b-instruct-v0:2": 32000,
+    "mistral.mixtral-8x7b-instruct-v0:1": 32000,
+    "mistral.mistral-large-2402-v1:0": 32000,
+    "meta.llama3-2-1b-instruct-v1:0": 128000,
+    "meta.llama3-2-3b-instruct-v1:0": 128000,
+}
+# Overrides the table above, e.g. to force chunking while testing
+MAX_INPUT_TOKENS = int(os.environ["STRUCTURE_MAX_INPUT_TOKENS"]) if os.environ.get("STRUCTURE_MAX_INPUT_TOKENS") else None
+# Tokens kept free for the response
+OUTPUT_TOKEN_RESERVE = 1024
+# Token counts are estimated without the model's tokenizer, so chunks only use this share of the budget
+TOKEN_ESTIMATE_MARGIN = 0.85
+# Transcript tokens repeated at the start of each chunk, so a sentence cut at a boundary is seen whole
+CHUNK_OVERLAP_TOKENS = 150
+# Smaller chunks would cut the transcript into fragments too short to extract questions from
+MIN_CHUNK_TOKENS = 256
+CHUNK_PROMPT = """
+                This transcript is part {part} of {parts} of a longer recording; consecutive parts overlap slightly.
+                Only use what this part contains.
+"""
 
 class TranscriptStructurer:
-    def __init__(self, model_id: str = MODEL_ID):
-        # Initialize Bedrock client
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name="eu-west-1")
+    def __init__(
+        self,
+        model_id: str = MODEL_ID,
+        max_workers: int = 4,
+        call_timeout: float = 120.0,
+        section_timeout: float = 300.0,
+        max_retries: int = 2,
+        backoff_base: float = 2.0,
+        cache_path: Optional[str] = LLM_CACHE_PATH,
+        max_input_tokens: Optional[int] = MAX_INPUT_TOKENS
+    ):
+        """Structure transcripts into the four Teil sections with Bedrock.
+
+        Args:
+            model_id (str): Bedrock model used for all sections
+            max_workers (int): Sections extracted concurrently
+            call_timeout (float): Seconds to wait for one Bedrock response
+            section_timeout (float): Seconds after which a section is given up, counted from its first call
+                and covering its retries and, for a chunked transcript, the calls of all its chunks
+            max_retries (int): Retries of a failed call, with jittered exponential backoff
+            backoff_base (float): Seconds before the first retry
+            cache_path (str): SQLite file caching the responses, defaults to $LLM_CACHE_PATH or
+                data/llm_cache.sqlite3; None disables the cache
+            max_input_tokens (int): Context window of the model, defaults to $STRUCTURE_MAX_INPUT_TOKENS
+                or MODEL_MAX_INPUT_TOKENS; longer transcripts are split into chunks that fit
+        """
+        # Initialize Bedrock client; retries are done per section, so botocore makes one attempt
+        self.bedrock_client = boto3.client(
+            'bedrock-runtime',
+            region_name="eu-west-1",
+            config=Config(
+                connect_timeout=10,
+                read_timeout=call_timeout,
+                retries={"max_attempts": 1},
+                max_pool_connections=max(10, max_workers)
+            )
+        )
         self.model_id = model_id
+        self.max_workers = max_workers
+        self.section_timeout = section_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_input_tokens = max_input_tokens or MODEL_MAX_INPUT_TOKENS.get(model_id)
+        # Seconds per section and for the whole transcript, from the last structure_transcript call
+        self.last_timings = {}
+        self.cache = ResponseCache(cache_path) if cache_path and INFERENCE_CONFIG.get("temperature") == 0 else None
+        # Bedrock calls made (not served from the cache); sections count them from several threads
+        self.llm_calls = 0
+        self.llm_calls_lock = threading.Lock()
         self.prompts = {
             1: """
                 Extract and structure section 'Teil 1' from this transcript.
@@ -77,32 +166,170 @@ class TranscriptStructurer:
                 </statement>
             """
         }
+        if self.max_input_tokens and self.chunk_budget < MIN_CHUNK_TOKENS:
+            raise ValueError(
+                f"max_input_tokens={self.max_input_tokens} leaves room for only {self.chunk_budget} transcript "
+                f"tokens per call after the prompt and {OUTPUT_TOKEN_RESERVE} response tokens; "
+                f"at least {MIN_CHUNK_TOKENS} are needed"
+            )
+
+    def close(self):
+        """Close the response cache. The structurer can't be used afterwards."""
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    def _invoke_bedrock(self, prompt: str, transcript: str) -> Optional[str]:
+    def _invoke_bedrock(
+        self, prompt: str, transcript: str, label: str, deadline: float, calls: ThreadPoolExecutor
+    ) -> Optional[str]:
+        """Call Bedrock, retrying failures with backoff until the retries run out or the deadline passes.
+
+        Each attempt runs on `calls`, so a call still running at the deadline can be
+        abandoned; its thread ends at the client's read timeout.
+
+        Responses are served from and stored in the response cache; failures aren't cached.
+        """
+        cache_key = ResponseCache.key(self.model_id, prompt, transcript, INFERENCE_CONFIG)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         full_prompt = f"{prompt}\n\nHere's the transcript:\n{transcript}"
         messages = [{
             "role": "user",
             "content": [{"text": full_prompt}]
         }]
-        try:
-            response = self.bedrock_client.converse(
+        if time.monotonic() >= deadline:
+            print(f"Bedrock call{label} skipped: the section's {self.section_timeout:.0f}s ran out")
+            return None
+        for attempt in range(self.max_retries + 1):
+            with self.llm_calls_lock:
+                self.llm_calls += 1
+            call = calls.submit(
+                self.bedrock_client.converse,
                 modelId=self.model_id,
                 messages=messages,
-                inferenceConfig={"temperature": 0}
+                inferenceConfig=INFERENCE_CONFIG
             )
-            return response['output']['message']['content'][0]['text']
-        except Exception as e:
-            print(f"Error invoking Bedrock: {str(e)}")
-            return None
+            try:
+                response = call.result(timeout=max(deadline - time.monotonic(), 0))
+                text = response['output']['message']['content'][0]['text']
+                if self.cache is not None:
+                    self.cache.put(cache_key, text)
+                return text
+            except FutureTimeoutError:
+                call.cancel()
+                print(f"Bedrock call{label} timed out: the section's {self.section_timeout:.0f}s ran out")
+                return None
+            except Exception as e:
+                delay = self.backoff_base * 2 ** attempt * random.uniform(0.5, 1.5)
+                if attempt == self.max_retries or time.monotonic() + delay >= deadline:
+                    print(f"Error invoking Bedrock{label}: {str(e)}")
+                    return None
+                print(f"Error invoking Bedrock{label}, retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+
+    def _structure_section(
+        self, section_num: int, transcript: str, part: int, parts: int, deadlines: Dict[int, float], calls: ThreadPoolExecutor
+    ):
+        started = time.perf_counter()
+        # The first chunk of a section to start sets the deadline shared by all of them
+        # (dict.setdefault is atomic, so concurrent chunks agree on it)
+        deadline = deadlines.setdefault(section_num, time.monotonic() + self.section_timeout)
+        prompt = self.prompts[section_num]
+        label = f" for Teil {section_num}"
+        if parts > 1:
+            prompt += CHUNK_PROMPT.format(part=part + 1, parts=parts)
+            label += f" (chunk {part + 1}/{parts})"
+        result = self._invoke_bedrock(prompt, transcript, label, deadline, calls)
+        return result, time.perf_counter() - started
+
+    def chunk_transcript(self, transcript: str) -> List[str]:
+        """The transcript as a single chunk if it fits the model's context with the prompts, otherwise
+        split on segment boundaries into overlapping chunks that do."""
+        if not self.max_input_tokens:
+            return [transcript]
+        budget = self.chunk_budget
+        if estimate_tokens(transcript) <= budget:
+            return [transcript]
+        return chunk_transcript(transcript, budget, min(CHUNK_OVERLAP_TOKENS, budget // 4))
 
-    def structure_transcript(self, transcript: str) -> Dict[int, str]:
+    @property
+    def chunk_budget(self) -> int:
+        """Estimated transcript tokens that fit one call next to the longest prompt and the response."""
+        prompt_tokens = max(map(estimate_tokens, self.prompts.values())) + estimate_tokens(CHUNK_PROMPT) + 10
+        return int((self.max_input_tokens - OUTPUT_TOKEN_RESERVE) * TOKEN_ESTIMATE_MARGIN) - prompt_tokens
+
+    def structure_transcript(self, transcript: str, sections: List[int] = SECTIONS) -> Dict[int, str]:
+        """Extract the sections concurrently, one Bedrock call each.
+
+        A transcript too long for the model is split into chunks (see `chunk_transcript`);
+        every section is then extracted from every chunk concurrently and the chunk
+        results are merged and deduplicated per section. A section's timeout starts
+        with its first call and covers the calls of all its chunks. Sections that fail
+        or run out of time (in any chunk) are left out, so the others can still be
+        saved; chunks that did succeed are cached for the next run. Timings are kept
+        in `last_timings`.
+        """
         results = {}
-        # Process all 4 sections (Teil 1 to Teil 4)
-        for section_num in range(1, 5):
-            result = self._invoke_bedrock(self.prompts[section_num], transcript)
-            if result:
-                results[section_num] = result
-        return results
+        timings = {}
+        started = time.perf_counter()
+        chunks = self.chunk_transcript(transcript)
+        if len(chunks) > 1:
+            print(f"Transcript of ~{estimate_tokens(transcript)} tokens exceeds the {self.max_input_tokens} of "
+                  f"{self.model_id}; structuring it in {len(chunks)} chunks")
+        outputs = {section_num: [None] * len(chunks) for section_num in sections}
+        deadlines = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        # The Bedrock calls themselves run here, so a section can stop waiting at its deadline
+        calls = ThreadPoolExecutor(max_workers=2 * self.max_workers)
+        try:
+            futures = {
+                executor.submit(
+                    self._structure_section, section_num, chunk, part, len(chunks), deadlines, calls
+                ): (section_num, part)
+                for section_num in sections
+                for part, chunk in enumerate(chunks)
+            }
+            # Every section gives up at its deadline (see _invoke_bedrock), so this ends
+            for future in as_completed(futures):
+                section_num, part = futures[future]
+                result, seconds = future.result()
+                timings[section_num] = timings.get(section_num, 0.0) + seconds
+                outputs[section_num][part] = result
+        finally:
+            # On an error or interrupt, don't start the sections still queued; abandoned
+            # calls finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+            calls.shutdown(wait=False, cancel_futures=True)
+
+        for section_num, parts in outputs.items():
+            if not all(parts):
+                continue
+            if len(parts) == 1:
+                results[section_num] = parts[0]
+                continue
+            merged = merge_section_outputs(section_num, parts)
+            if merged.strip():
+                results[section_num] = merged
+            else:
+                print(f"Teil {section_num}: no questions could be parsed from the {len(parts)} chunk results")
+
+        wall = time.perf_counter() - started
+        sequential = sum(timings.values())
+        self.last_timings = {"sections": timings, "wall": wall, "sequential": sequential}
+        failed = sorted(set(sections) - set(results))
+        print(
+            f"Structured {len(results)}/{len(sections)} sections in {wall:.1f}s "
+            f"(the calls took {sequential:.1f}s in total, saving {max(sequential - wall, 0):.1f}s)"
+            + (f"; failed: Teil {', '.join(map(str, failed))}" if failed else "")
+        )
+        return dict(sorted(results.items()))
 
     def save_questions(self, structured_sections: Dict[int, str], base_filename: str) -> bool:
         try:
@@ -117,6 +344,103 @@ class TranscriptStructurer:
             print(f"Error saving structured sections: {str(e)}")
             return False
 
+    def structure_file(self, transcript_file: str, questions_dir: str = QUESTIONS_DIR, manifest: Optional[Dict] = None) -> str:
+        """Structure a transcript file into `<video id>_teil<N>.txt` files, unless it is up to date.
+
+        The manifest records each transcript's content hash, the model, a hash of the
+        prompts, the model's input limit and the files written. A transcript whose record matches and whose
+        files all exist is skipped without a cache lookup or a write. When a section fails, an
+        older file of that section is removed, unless it was made from the same transcript and
+        configuration, so stale questions don't get indexed.
+
+        Returns:
+            str: "unchanged", "structured", "partial" (some sections failed) or "failed"
+        """
+        save = manifest is None
+        if manifest is None:
+            manifest = self.load_manifest(questions_dir)
+        video_id = os.path.splitext(os.path.basename(transcript_file))[0]
+        transcript = self.load_transcript(transcript_file)
+        if transcript is None:
+            return "failed"
+        transcript_sha256 = hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+        entry = manifest.get(video_id)
+        # Whether the recorded files were made from this transcript with this configuration
+        current = (
+            entry is not None
+            and entry["transcript_sha256"] == transcript_sha256
+            and entry["model_id"] == self.model_id
+            and entry["prompts_sha256"] == self.prompts_sha256
+            and entry.get("max_input_tokens") == self.max_input_tokens
+        )
+        if (
+            current
+            and len(entry["files"]) == len(SECTIONS)
+            and all(os.path.exists(os.path.join(questions_dir, name)) for name in entry["files"].values())
+        ):
+            return "unchanged"
+
+        structured_sections = self.structure_transcript(transcript)
+        if structured_sections and not self.save_questions(structured_sections, os.path.join(questions_dir, f"{video_id}.txt")):
+            return "failed"
+        files = {str(section_num): f"{video_id}_teil{section_num}.txt" for section_num in structured_sections}
+        for section_num in SECTIONS:
+            name = f"{video_id}_teil{section_num}.txt"
+            path = os.path.join(questions_dir, name)
+            if str(section_num) in files or not os.path.exists(path):
+                continue
+            if current and entry["files"].get(str(section_num)) == name:
+                # Still made from this transcript, only missing from this run's results
+                files[str(section_num)] = name
+                continue
+            # A failed section's old file came from a different transcript or configuration;
+            # removing it keeps its questions out of the index
+            os.remove(path)
+            print(f"Removed {name}: Teil {section_num} failed for the changed transcript")
+
+        if files:
+            manifest[video_id] = {
+                "transcript": os.path.abspath(transcript_file),
+                "transcript_sha256": transcript_sha256,
+                "model_id": self.model_id,
+                "prompts_sha256": self.prompts_sha256,
+                # Decides whether and how the transcript was chunked
+                "max_input_tokens": self.max_input_tokens,
+                "files": dict(sorted(files.items()))
+            }
+        else:
+            manifest.pop(video_id, None)
+        if save:
+            self.save_manifest(manifest, questions_dir)
+        if not structured_sections:
+            return "failed"
+        return "structured" if len(structured_sections) == len(SECTIONS) else "partial"
+
+    def structure_directory(self, transcripts_dir: str = TRANSCRIPTS_DIR, questions_dir: str = QUESTIONS_DIR) -> Dict[str, int]:
+        """Structure every transcript of a folder that changed since the last run."""
+        manifest = self.load_manifest(questions_dir)
+        counts = {"structured": 0, "unchanged": 0, "partial": 0, "failed": 0}
+        try:
+            for transcript_file in sorted(glob.glob(os.path.join(transcripts_dir, "*.txt"))):
+                counts[self.structure_file(transcript_file, questions_dir, manifest)] += 1
+        finally:
+            self.save_manifest(manifest, questions_dir)
+        return counts
+
+    @property
+    def prompts_sha256(self) -> str:
+        return hashlib.sha256(json.dumps(self.prompts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def manifest_path(questions_dir: str = QUESTIONS_DIR) -> str:
+        return os.path.join(questions_dir, "structure_manifest.json")
+
+    def load_manifest(self, questions_dir: str = QUESTIONS_DIR) -> Dict:
+        return read_json(self.manifest_path(questions_dir))
+
+    def save_manifest(self, manifest: Dict, questions_dir: str = QUESTIONS_DIR):
+        write_json_atomic(self.manifest_path(questions_dir), manifest)
+
     def load_transcript(self, filename: str) -> Optional[str]:
         try:
             with open(filename, 'r', encoding='utf-8') as f:
@@ -126,8 +450,8 @@ class TranscriptStructurer:
             return None
 
 if __name__ == "__main__":
-    structurer = TranscriptStructurer()
-    transcript = structurer.load_transcript(f"./data/transcripts/{VIDEO_ID}.txt")
-    if transcript:
-        structured_sections = structurer.structure_transcript(transcript)
-        structurer.save_questions(structured_sections, f"./data/questions/{VIDEO_ID}.txt")
+    # Structure every new or changed transcript in data/transcripts (run from listening-comp/:
+    # python -m backend.structured_data); unchanged ones cost no LLM calls
+    with TranscriptStructurer() as structurer:
+        counts = structurer.structure_directory(TRANSCRIPTS_DIR, QUESTIONS_DIR)
+        print(f"{counts}, {structurer.llm_calls} LLM calls, cache: {structurer.cache.stats() if structurer.cache else 'off'}")
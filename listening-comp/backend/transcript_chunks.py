@@ -0,0 +1,135 @@
+"""Token-aware transcript chunking and the reduce step of chunked transcript structuring.
+
+Transcripts are split on sentence or caption-segment boundaries into chunks that
+fit a model's input budget, with some overlap so nothing said across a boundary
+is lost. Each chunk is structured on its own; `merge_section_outputs` then
+parses the per-chunk outputs, drops the duplicates the overlap (or a repeated
+answer) produced and writes the section back in the file format.
+"""
+import math
+import re
+from itertools import zip_longest
+from typing import Callable, List, Optional
+
+from backend.near_duplicates import NearDuplicateIndex
+from backend.question_parser import LIST_FIELDS, Question, iter_questions
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Items each section prompt asks for
+SECTION_ITEM_COUNTS = {1: 5, 2: 5, 3: 6, 4: 8}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough subword token count: words and punctuation marks, plus 30% for words split into several tokens."""
+    return math.ceil(len(_TOKEN.findall(text)) * 1.3)
+
+
+def split_segments(transcript: str) -> List[str]:
+    """Sentences, or caption lines when the transcript has no punctuation (as YouTube captions don't)."""
+    segments = []
+    for line in transcript.splitlines():
+        segments.extend(part for part in _SENTENCE_END.split(line.strip()) if part)
+    return segments
+
+
+def chunk_transcript(
+    transcript: str,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    count_tokens: Callable[[str], int] = estimate_tokens
+) -> List[str]:
+    """Split a transcript into chunks of at most max_tokens, cut between segments.
+
+    Each chunk after the first repeats the last segments of the one before, up to
+    overlap_tokens. A single segment longer than max_tokens is cut between words.
+    """
+    pieces = []
+    for segment in split_segments(transcript):
+        if count_tokens(segment) <= max_tokens:
+            pieces.append(segment)
+            continue
+        words, current = segment.split(), []
+        for word in words:
+            if current and count_tokens(" ".join(current + [word])) > max_tokens:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(" ".join(current))
+
+    chunks = []
+    current, current_tokens = [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            # Carry the tail of the chunk over, as long as it leaves room for this piece
+            overlap, overlap_count = [], 0
+            for previous in reversed(current):
+                previous_tokens = count_tokens(previous)
+                if overlap_count + previous_tokens > overlap_tokens or overlap_count + previous_tokens + tokens > max_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_count += previous_tokens
+            current, current_tokens = overlap, overlap_count
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def render_questions(section_num: int, questions: List[Question]) -> str:
+    """Write questions in the section's file format (see the prompts of TranscriptStructurer)."""
+    blocks = []
+    for number, question in enumerate(questions, 1):
+        lines = []
+        if section_num == 1:
+            lines.append(f"Text {number}: {question.get('Text', '')}".rstrip())
+            lines.extend(
+                f"Statement {index}: {statement}" for index, statement in enumerate(question.get("Statements", []), 1)
+            )
+            blocks.append("\n".join(lines))
+            continue
+        for field, value in question.items():
+            if field in LIST_FIELDS:
+                lines.append(f"{field}:")
+                lines.extend(f"{index}. {item}" for index, item in enumerate(value, 1))
+            else:
+                lines.append(f"{field}: {value}")
+        tag = "question" if section_num == 2 else "statement"
+        blocks.append(f"<{tag}>\n" + "\n".join(lines) + f"\n</{tag}>")
+    return "\n\n".join(blocks) + "\n"
+
+
+def merge_section_outputs(
+    section_num: int,
+    outputs: List[str],
+    max_items: Optional[int] = None,
+    duplicate_threshold: float = 0.8
+) -> str:
+    """Reduce the per-chunk outputs of a section into one section file.
+
+    Items are taken from the chunks in turn, so later parts of the transcript are
+    represented too, and near duplicates of an item already taken are dropped.
+    At most max_items (by default what the section's prompt asks for) are kept.
+    """
+    max_items = SECTION_ITEM_COUNTS.get(section_num) if max_items is None else max_items
+    parsed = [list(iter_questions(output.splitlines())) for output in outputs]
+    seen = NearDuplicateIndex(duplicate_threshold)
+    merged = []
+    for round_items in zip_longest(*parsed):
+        for question in round_items:
+            if question is None:
+                continue
+            text = "\n".join(
+                ", ".join(value) if isinstance(value, list) else value
+                for field, value in question.items() if field != "Answer"
+            )
+            if seen.add_unique(str(len(merged)), text) is None:
+                merged.append(question)
+        if max_items is not None and len(merged) >= max_items:
+            break
+    return render_questions(section_num, merged[:max_items])
@@ -0,0 +1,160 @@
+"""Compressed store of timestamped YouTube transcripts.
+
+Each transcript is kept with all its segments ({"text", "start", "duration"}) as
+gzip-compressed NDJSON, one file per video and language. The file is a series of
+independent gzip members, one per BLOCK_SECONDS of audio, whose byte offsets and
+time spans are recorded in a small JSON index. Reading a time range therefore
+seeks to and decompresses only the blocks it overlaps, and checking whether a
+transcript is stored never touches the transcript files.
+"""
+import bisect
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.storage import read_json, write_json_atomic
+
+TRANSCRIPT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "transcript_store")
+# Audio seconds per compressed block; smaller blocks make range reads cheaper but compress worse
+BLOCK_SECONDS = 120.0
+
+Segment = Dict[str, object]
+
+
+class TranscriptStore:
+    """Transcripts keyed by video id and language, with an index of their blocks in index.json.
+
+    Safe to share between threads; the index is read once, so other processes'
+    writes are seen after reopening the store.
+    """
+
+    def __init__(self, directory: str = TRANSCRIPT_STORE_DIR, block_seconds: float = BLOCK_SECONDS):
+        self.directory = directory
+        self.block_seconds = block_seconds
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.index = self.load_index()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def load_index(self) -> Dict:
+        return read_json(self.index_path)
+
+    def save_index(self):
+        write_json_atomic(self.index_path, self.index)
+
+    def find(self, video_id: str, languages: Iterable[str] = ()) -> Optional[str]:
+        """The first of the languages stored for a video, or any stored language if none are given."""
+        stored = self.index.get(video_id, {})
+        for language in languages or stored:
+            if language in stored:
+                return language
+        return None
+
+    def put(self, video_id: str, segments: List[Segment], language: str) -> Dict:
+        """Store a transcript's segments, replacing any stored for the same video and language.
+
+        Returns:
+            Dict: The index entry of the transcript
+        """
+        segments = sorted(
+            ({"text": s["text"], "start": float(s["start"]), "duration": float(s.get("duration", 0.0))} for s in segments),
+            key=lambda s: s["start"]
+        )
+        filename = f"{video_id}.{language}.ndjson.gz"
+        blocks = []
+        tmp_path = os.path.join(self.directory, filename + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            for block in self._split_blocks(segments):
+                payload = "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in block).encode("utf-8")
+                data = gzip.compress(payload, mtime=0)
+                end = max(s["start"] + s["duration"] for s in block)
+                blocks.append([block[0]["start"], end, f.tell(), len(data)])
+                f.write(data)
+        os.replace(tmp_path, os.path.join(self.directory, filename))
+
+        entry = {
+            "file": filename,
+            "segments": len(segments),
+            "duration": max((block[1] for block in blocks), default=0.0),
+            "bytes": sum(block[3] for block in blocks),
+            # [first segment start, last segment end, byte offset, compressed length]
+            "blocks": blocks,
+            "saved_at": time.time()
+        }
+        with self.lock:
+            self.index.setdefault(video_id, {})[language] = entry
+            self.save_index()
+        return entry
+
+    def _split_blocks(self, segments: List[Segment]) -> Iterable[List[Segment]]:
+        block = []
+        for segment in segments:
+            if block and segment["start"] - block[0]["start"] >= self.block_seconds:
+                yield block
+                block = []
+            block.append(segment)
+        if block:
+            yield block
+
+    def _read_blocks(self, entry: Dict, blocks: List[list]) -> List[Segment]:
+        segments = []
+        with open(os.path.join(self.directory, entry["file"]), 'rb') as f:
+            for _, _, offset, length in blocks:
+                f.seek(offset)
+                for line in gzip.decompress(f.read(length)).decode("utf-8").splitlines():
+                    segments.append(json.loads(line))
+        return segments
+
+    def get(self, video_id: str, languages: Iterable[str] = ()) -> Optional[List[Segment]]:
+        """All segments of a stored transcript in the first available language, or None."""
+        language = self.find(video_id, languages)
+        if language is None:
+            return None
+        entry = self.index[video_id][language]
+        return self._read_blocks(entry, entry["blocks"])
+
+    def get_range(self, video_id: str, start: float, end: float, languages: Iterable[str] = ()) -> Optional[List[Segment]]:
+        """The segments heard between start and end seconds, reading only the blocks that span them.
+
+        A segment is included if any part of it overlaps the range. None if the transcript isn't stored.
+        """
+        language = self.find(video_id, languages)
+        if language is None:
+            return None
+        entry = self.index[video_id][language]
+        # Blocks are in start order; those starting at or after `end` can't overlap
+        last = bisect.bisect_left([block[0] for block in entry["blocks"]], end)
+        blocks = [block for block in entry["blocks"][:last] if block[1] > start]
+        return [
+            segment for segment in self._read_blocks(entry, blocks)
+            if segment["start"] < end and segment["start"] + segment["duration"] > start
+        ]
+
+    def text(self, video_id: str, languages: Iterable[str] = (), time_range: Optional[Tuple[float, float]] = None) -> Optional[str]:
+        """A transcript (or a time range of it) as one caption line per segment, like the .txt transcripts."""
+        if time_range is None:
+            segments = self.get(video_id, languages)
+        else:
+            segments = self.get_range(video_id, *time_range, languages=languages)
+        return None if segments is None else "".join(f"{segment['text']}\n" for segment in segments)
+
+    def delete(self, video_id: str, language: Optional[str] = None):
+        """Remove one language of a video's transcript, or all of them."""
+        with self.lock:
+            stored = self.index.get(video_id, {})
+            for stored_language in [language] if language else list(stored):
+                entry = stored.pop(stored_language, None)
+                if entry:
+                    try:
+                        os.remove(os.path.join(self.directory, entry["file"]))
+                    except FileNotFoundError:
+                        pass
+            if not stored:
+                self.index.pop(video_id, None)
+            self.save_index()
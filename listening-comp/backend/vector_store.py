@@ -1,160 +1,556 @@
+import argparse
 import chromadb
-from chromadb.utils import embedding_functions
+import hashlib
 import json
-import boto3
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Optional, Union
 import os
 import re
 import glob
+import threading
+import time
 
-MODEL_ID = "amazon.titan-embed-text-v2:0" 
+from backend.embeddings import MODEL_ID, EmbeddingCache, create_embedding_function
+from backend.keyword_index import BM25Index, reciprocal_rank_fusion, tokenize
+from backend.near_duplicates import NearDuplicateIndex, duplicate_clusters
+from backend.quantized_index import QUANTIZATIONS, QuantizedIndex
+from backend.question_parser import iter_questions_file
+from backend.search_cache import SearchResultCache
+from backend.storage import read_json, write_json_atomic
 
+QUESTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions")
+QUESTION_FILE_PATTERN = re.compile(r".*_teil(\d+)\.txt")
 
-class BedrockEmbeddingFunction(embedding_functions.EmbeddingFunction):
-    def __init__(self, model_id=MODEL_ID):
-        """Initialize Bedrock embedding function (using region eu-west-1)"""
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name="eu-west-1")
-        self.model_id = model_id
+# "bedrock" (Titan, eu-west-1) or "hashing" (local, CPU only)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "bedrock")
+# Collections indexed before the model was recorded in their metadata used Titan
+LEGACY_EMBEDDING_MODEL = f"bedrock:{MODEL_ID}"
+
+SECTION_DESCRIPTIONS = {
+    "section1": "Goethe B1 listening exercises - Section 1 (True/False statements about texts)",
+    "section2": "Goethe B1 listening comprehension questions - Section 2 (Multiple-choice questions)",
+    "section3": "Goethe B1 listening exercises - Section 3 (True/False statements)",
+    "section4": "Goethe B1 listening exercises - Section 4 (Speaker identification)",
+}
+
+# Fields of the searchable document of each section, in order
+DOCUMENT_FIELDS = {
+    1: ("Text", "Statements"),  # Text with associated True/False statements
+    2: ("Introduction", "Conversation", "Question", "Options"),  # Listening comprehension multiple-choice question
+    3: ("Situation", "Question", "Statements"),  # True/False statements exercise
+    4: ("Statement", "Options"),  # Speaker identification task
+}
+
+SEARCH_MODES = ("auto", "dense", "keyword", "hybrid")
+# In "auto" mode, queries of at most this many terms are answered from the keyword index alone
+KEYWORD_QUERY_MAX_TOKENS = 2
+# Estimated Jaccard similarity of the question documents above which a new question is a near duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.9))
+# Cached search results per store, and how long one is reused (0 disables the cache)
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 256))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 300))
+
+# HNSW parameters of new collections (Chroma's defaults); per-section values can be passed to the store
+HNSW_SETTINGS = {
+    "M": int(os.environ.get("HNSW_M", 16)),
+    "construction_ef": int(os.environ.get("HNSW_CONSTRUCTION_EF", 100)),
+    "search_ef": int(os.environ.get("HNSW_SEARCH_EF", 10)),
+}
+# "float16" or "int8" answers dense searches from an in-memory quantized index instead of HNSW
+QUANTIZED_INDEX = os.environ.get("QUANTIZED_INDEX", "")
+# The quantized scan keeps n_results * this many candidates for exact re-ranking
+QUANTIZED_RERANK_FACTOR = int(os.environ.get("QUANTIZED_RERANK_FACTOR", 4))
+
+
+def question_id(question: Dict) -> str:
+    """Content-hash id of a question: the same question always gets the same id."""
+    return hashlib.sha256(json.dumps(question, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:32]
+
+
+def file_sha256(filename: str) -> str:
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def tag_key(tag: str) -> str:
+    """Metadata key of a topic tag. Chroma metadata can't hold lists, so each tag is a boolean key."""
+    return "tag_" + re.sub(r"\W+", "_", tag.strip().lower())
+
+
+def build_where(
+    video_id: Union[str, List[str], None] = None,
+    tags: Optional[List[str]] = None,
+    difficulty: Union[str, List[str], None] = None
+) -> Optional[Dict]:
+    """Chroma `where` filter for questions from any of the videos, with all of the tags, at any of the difficulties."""
+    conditions = []
+    for key, value in (("video_id", video_id), ("difficulty", difficulty)):
+        if isinstance(value, str):
+            conditions.append({key: value})
+        elif value:
+            conditions.append({key: {"$in": list(value)}})
+    conditions.extend({tag_key(tag): True} for tag in tags or [])
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
 
-    def __call__(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts using Bedrock"""
-        embeddings = []
-        for text in texts:
-            try:
-                response = self.bedrock_client.invoke_model(
-                    modelId=self.model_id,
-                    body=json.dumps({
-                        "inputText": text
-                    })
-                )
-                response_body = json.loads(response['body'].read())
-                embedding = response_body['embedding']
-                embeddings.append(embedding)
-            except Exception as e:
-                print(f"Error generating embedding: {str(e)}")
-                # Return a zero vector as fallback; Titan model uses 1536 dimensions
-                embeddings.append([0.0] * 1536)
-        return embeddings
+
+@dataclass
+class SearchRequest:
+    section_num: int
+    query: str
+    n_results: int = 5
+    where: Optional[Dict] = None  # e.g. build_where(video_id=..., tags=[...], difficulty=...)
+
+
+class SearchHit:
+    """One search result. The stored question JSON is only parsed when `question` is read."""
+
+    def __init__(self, id: str, distance: float, metadata: Dict):
+        self.id = id
+        self.distance = distance
+        self.metadata = metadata
+
+    @cached_property
+    def question(self) -> Dict:
+        return json.loads(self.metadata['full_structure'])
+
+    @property
+    def video_id(self) -> str:
+        return self.metadata.get('video_id')
+
+    def __repr__(self):
+        return f"SearchHit(id={self.id!r}, distance={self.distance:.4f}, video_id={self.video_id!r})"
 
 class QuestionVectorStore:
-    def __init__(self, persist_directory: str = "./backend/data/vectorstore"):
-        """Initialize the vector store for Goethe B1 listening exercises (Sections 1-4)"""
+    def __init__(
+        self,
+        persist_directory: str = "./backend/data/vectorstore",
+        embedding_backend: Optional[str] = None,
+        duplicate_threshold: Optional[float] = None,
+        hnsw_settings: Optional[Dict[str, Dict[str, int]]] = None,
+        quantization: Optional[str] = None
+    ):
+        """Initialize the vector store for Goethe B1 listening exercises (Sections 1-4)
+
+        Args:
+            persist_directory (str): Where ChromaDB, the embedding cache and the index manifest live
+            embedding_backend (str): "bedrock" or "hashing"; defaults to $EMBEDDING_BACKEND or "bedrock"
+            duplicate_threshold (float): Similarity above which add_questions merges a question into
+                a stored one; defaults to $NEAR_DUPLICATE_THRESHOLD or 0.9
+            hnsw_settings (dict): Per-section overrides of HNSW_SETTINGS, e.g.
+                {"section2": {"M": 32, "search_ef": 64}}; only applied when a collection is created
+            quantization (str): "float16", "int8" or "" (off); defaults to $QUANTIZED_INDEX
+
+        Raises:
+            ValueError: If the collections were built with a different embedding model
+        """
         self.persist_directory = persist_directory
         
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(path=persist_directory)
         
-        # Use Bedrock embedding function
-        self.embedding_fn = BedrockEmbeddingFunction()
+        # Embeddings are cached across re-indexing, restarts and queries
+        self.embedding_cache = EmbeddingCache(os.path.join(persist_directory, "embedding_cache.sqlite3"))
+        self.embedding_fn = create_embedding_function(embedding_backend or EMBEDDING_BACKEND, cache=self.embedding_cache)
         
         # Create or get collections for each section type
         self.collections = {
-            "section1": self.client.get_or_create_collection(
-                name="section1_questions",
-                embedding_function=self.embedding_fn,
-                metadata={"description": "Goethe B1 listening exercises - Section 1 (True/False statements about texts)"}
-            ),
-            "section2": self.client.get_or_create_collection(
-                name="section2_questions",
-                embedding_function=self.embedding_fn,
-                metadata={"description": "Goethe B1 listening comprehension questions - Section 2 (Multiple-choice questions)"}
-            ),
-            "section3": self.client.get_or_create_collection(
-                name="section3_questions",
-                embedding_function=self.embedding_fn,
-                metadata={"description": "Goethe B1 listening exercises - Section 3 (True/False statements)"}
-            ),
-            "section4": self.client.get_or_create_collection(
-                name="section4_questions",
-                embedding_function=self.embedding_fn,
-                metadata={"description": "Goethe B1 listening exercises - Section 4 (Speaker identification)"}
+            section: self._get_collection(
+                f"{section}_questions", description, {**HNSW_SETTINGS, **(hnsw_settings or {}).get(section, {})}
             )
+            for section, description in SECTION_DESCRIPTIONS.items()
         }
 
-    def add_questions(self, section_num: int, questions: List[Dict], video_id: str):
-        """Add questions to the vector store for sections 1-4"""
+        self.quantization = QUANTIZED_INDEX if quantization is None else quantization
+        if self.quantization and self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {self.quantization!r}, expected one of {', '.join(QUANTIZATIONS)}")
+
+        # In-memory indexes over the collections, each built on first use and kept in sync on writes
+        self.index_build_lock = threading.Lock()
+        # Quantized copies of the stored embeddings, built on the first dense search of a section
+        self.quantized_indexes = {}
+        # BM25 indexes over the same documents, built on the first keyword search of a section
+        self.keyword_indexes = {}
+        # MinHash indexes of the stored documents, built on the first add_questions of a section
+        self.duplicate_threshold = NEAR_DUPLICATE_THRESHOLD if duplicate_threshold is None else duplicate_threshold
+        self.duplicate_indexes = {}
+        # Repeated topic searches are served from memory; writes to a section invalidate its entries
+        self.search_cache = SearchResultCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+    def _get_collection(self, name: str, description: str, hnsw_settings: Dict[str, int]):
+        """Get or create a collection, making sure it was built with the configured embedding model."""
+        model_name = self.embedding_fn.model_name
+        hnsw_metadata = {f"hnsw:{key}": value for key, value in hnsw_settings.items()}
+        collection = self.client.get_or_create_collection(
+            name=name,
+            embedding_function=self.embedding_fn,
+            metadata={"description": description, "embedding_model": model_name, **hnsw_metadata}
+        )
+        metadata = collection.metadata or {}
+        differing = {key: value for key, value in hnsw_metadata.items() if metadata.get(key, value) != value}
+        if differing:
+            # Chroma fixes the HNSW graph parameters when the collection is created
+            print(f"Collection {name} keeps its HNSW settings; {differing} only apply to a re-created collection")
+        recorded = metadata.get("embedding_model")
+        if recorded is None:
+            recorded = LEGACY_EMBEDDING_MODEL if collection.count() else model_name
+            if recorded == model_name:
+                collection.modify(metadata={**metadata, "embedding_model": model_name})
+        if recorded != model_name:
+            # Vectors of different models aren't comparable; querying would return nonsense
+            raise ValueError(
+                f"Collection {name} was built with embedding model {recorded}, not {model_name}. "
+                f"Use a different persist_directory or re-index it with the same backend."
+            )
+        return collection
+
+    def add_questions(
+        self,
+        section_num: int,
+        questions: List[Dict],
+        video_id: str,
+        source_file: str = "",
+        dedupe: bool = True,
+        tags: Optional[List[str]] = None,
+        difficulty: Optional[str] = None
+    ) -> List[str]:
+        """Add questions to the vector store for sections 1-4.
+
+        Questions get content-hash ids and are upserted, so only questions the
+        collection doesn't have yet are embedded. With `dedupe`, a question whose
+        document is a near duplicate of a stored one (the same exercise from another
+        transcript) isn't stored; the stored question's id stands in for it.
+        Returns the ids of all questions, with duplicates merged.
+
+        `tags` (topics) and `difficulty` are stored with the new questions so
+        searches can filter on them (see build_where).
+        """
         if section_num not in [1, 2, 3, 4]:
             raise ValueError("Only sections 1, 2, 3, and 4 are supported")
             
         collection = self.collections[f"section{section_num}"]
         
+        # Identical questions share an id; keep the first occurrence
+        by_id = {}
+        for idx, question in enumerate(questions):
+            by_id.setdefault(question_id(question), (idx, question))
+        all_ids = list(by_id)
+
+        existing = set(collection.get(ids=all_ids, include=[])['ids']) if all_ids else set()
+        duplicates = self.duplicate_index(section_num)
+        filter_fields = {tag_key(tag): True for tag in tags or []}
+        if difficulty is not None:
+            filter_fields["difficulty"] = difficulty
+        merged = {}
         ids = []
         documents = []
         metadatas = []
         
-        for idx, question in enumerate(questions):
-            # Create a unique ID for each question
-            question_id = f"{video_id}_{section_num}_{idx}"
-            ids.append(question_id)
+        for qid, (idx, question) in by_id.items():
+            if qid in existing:
+                continue
+            document = self._question_document(section_num, question)
+            if dedupe:
+                # Indexes the document when it's new, so later questions of the batch are checked against it
+                match = duplicates.add_unique(qid, document)
+                if match is not None:
+                    merged[qid] = match[0]
+                    continue
+            ids.append(qid)
             
             # Store the full question structure as metadata
             metadatas.append({
                 "video_id": video_id,
                 "section": section_num,
                 "question_index": idx,
-                "full_structure": json.dumps(question)
+                "source_file": source_file,
+                "full_structure": json.dumps(question),
+                **filter_fields
             })
-            
-            # Create a searchable document based on section type
-            if section_num == 1:
-                # Section 1: Text with associated True/False statements
-                document = f"Text: {question.get('Text', '')}\nStatements: {', '.join(question.get('Statements', []))}"
-            elif section_num == 2:
-                # Section 2: Listening comprehension multiple-choice question
-                document = (
-                    f"Introduction: {question.get('Introduction', '')}\n"
-                    f"Conversation: {question.get('Conversation', '')}\n"
-                    f"Question: {question.get('Question', '')}\n"
-                    f"Options: {', '.join(question.get('Options', []))}"
-                )
-            elif section_num == 3:
-                # Section 3: True/False statements exercise
-                document = (
-                    f"Situation: {question.get('Situation', '')}\n"
-                    f"Question: {question.get('Question', '')}\n"
-                    f"Statements: {', '.join(question.get('Statements', []))}"
-                )
-            elif section_num == 4:
-                # Section 4: Speaker identification task
-                document = (
-                    f"Statement: {question.get('Statement', '')}\n"
-                    f"Options: {', '.join(question.get('Options', []))}"
-                )
             documents.append(document)
         
-        # Add to collection
-        collection.add(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
+        # Upsert only what is new; unchanged questions keep their stored embeddings
+        if ids:
+            try:
+                collection.upsert(
+                    ids=ids,
+                    documents=documents,
+                    metadatas=metadatas
+                )
+            except Exception:
+                duplicates.remove(ids)
+                self.search_cache.bump(section_num)  # The upsert may have been partly applied
+                raise
+            if not dedupe:
+                duplicates.add(ids, documents)
+            keyword_index = self.keyword_indexes.get(section_num)
+            if keyword_index is not None:
+                keyword_index.add(ids, documents)
+            quantized_index = self.quantized_indexes.get(section_num)
+            if quantized_index is not None:
+                stored = collection.get(ids=ids, include=['embeddings'])
+                quantized_index.add(stored['ids'], stored['embeddings'])
+            self.search_cache.bump(section_num)
+        if merged:
+            print(f"Merged {len(merged)} near-duplicate questions into stored ones (section {section_num})")
+        return list(dict.fromkeys(merged.get(qid, qid) for qid in all_ids))
+
+    def _question_document(self, section_num: int, question: Dict) -> str:
+        """Create a searchable document based on section type
+
+        The section's fields come first, as in its template; other fields the question
+        has (question files also use Text, Statement and Speaker) follow, so questions
+        that don't fill the template still get distinct documents.
+        """
+        template = DOCUMENT_FIELDS[section_num]
+        fields = list(template) + [field for field in question if field not in template and field != "Answer"]
+        lines = []
+        for field in fields:
+            value = question.get(field, '')
+            if isinstance(value, list):
+                value = ', '.join(value)
+            if value or field in template:
+                lines.append(f"{field}: {value}")
+        return "\n".join(lines)
+
+    def delete_questions(self, section_num: int, ids: List[str]):
+        if ids:
+            self.collections[f"section{section_num}"].delete(ids=list(ids))
+            keyword_index = self.keyword_indexes.get(section_num)
+            if keyword_index is not None:
+                keyword_index.remove(ids)
+            duplicate_index = self.duplicate_indexes.get(section_num)
+            if duplicate_index is not None:
+                duplicate_index.remove(ids)
+            quantized_index = self.quantized_indexes.get(section_num)
+            if quantized_index is not None:
+                quantized_index.remove(ids)
+            self.search_cache.bump(section_num)
+
+    def keyword_index(self, section_num: int) -> BM25Index:
+        """The section's BM25 index, built from the stored documents on first use.
+
+        add_questions and delete_questions keep a built index in sync with the collection.
+        """
+        keyword_index = self.keyword_indexes.get(section_num)
+        if keyword_index is not None:
+            return keyword_index
+        with self.index_build_lock:
+            if section_num not in self.keyword_indexes:
+                stored = self.collections[f"section{section_num}"].get(include=['documents'])
+                keyword_index = BM25Index()
+                keyword_index.add(stored['ids'], stored['documents'])
+                self.keyword_indexes[section_num] = keyword_index
+            return self.keyword_indexes[section_num]
+
+    def quantized_index(self, section_num: int) -> Optional[QuantizedIndex]:
+        """The section's quantized index, built from the stored embeddings on first use.
+
+        None when quantization is off or the section is empty. Re-ranking fetches
+        the candidates' float32 embeddings from Chroma.
+        """
+        if not self.quantization:
+            return None
+        quantized_index = self.quantized_indexes.get(section_num)
+        if quantized_index is not None:
+            return quantized_index
+        with self.index_build_lock:
+            if section_num not in self.quantized_indexes:
+                collection = self.collections[f"section{section_num}"]
+                stored = collection.get(include=['embeddings'])
+                if not stored['ids']:
+                    return None
+
+                def fetch_exact(ids):
+                    exact = collection.get(ids=ids, include=['embeddings'])
+                    by_id = dict(zip(exact['ids'], exact['embeddings']))
+                    return [by_id[qid] for qid in ids]
+
+                quantized_index = QuantizedIndex(
+                    len(stored['embeddings'][0]), self.quantization, QUANTIZED_RERANK_FACTOR, fetch_exact
+                )
+                quantized_index.add(stored['ids'], stored['embeddings'])
+                self.quantized_indexes[section_num] = quantized_index
+            return self.quantized_indexes[section_num]
+
+    def _dense_search(self, section_num: int, query: str, n_results: int):
+        """Ids, distances and metadatas of the nearest questions, from the quantized index if enabled."""
+        collection = self.collections[f"section{section_num}"]
+        quantized_index = self.quantized_index(section_num)
+        if quantized_index is None:
+            results = collection.query(query_texts=[query], n_results=n_results)
+            return results['ids'][0], results['distances'][0], results['metadatas'][0]
+
+        hits = quantized_index.search(self.embedding_fn([query])[0], n_results)
+        ids = [qid for qid, _ in hits]
+        stored = collection.get(ids=ids, include=['metadatas'])
+        by_id = dict(zip(stored['ids'], stored['metadatas']))
+        return ids, [distance for _, distance in hits], [by_id[qid] for qid in ids]
+
+    def duplicate_index(self, section_num: int) -> NearDuplicateIndex:
+        """The section's near-duplicate index, built from the stored documents on first use."""
+        duplicate_index = self.duplicate_indexes.get(section_num)
+        if duplicate_index is not None:
+            return duplicate_index
+        with self.index_build_lock:
+            if section_num not in self.duplicate_indexes:
+                stored = self.collections[f"section{section_num}"].get(include=['documents'])
+                duplicate_index = NearDuplicateIndex(self.duplicate_threshold)
+                duplicate_index.add(stored['ids'], stored['documents'])
+                self.duplicate_indexes[section_num] = duplicate_index
+            return self.duplicate_indexes[section_num]
+
+    def find_duplicates(self, section_num: int, threshold: Optional[float] = None) -> List[List[Dict]]:
+        """Clusters of near-duplicate questions already stored in a section, largest first.
+
+        Each question is {"id", "video_id", "source_file", "document"}.
+        """
+        stored = self.collections[f"section{section_num}"].get(include=['documents', 'metadatas'])
+        by_id = {
+            qid: {
+                "id": qid,
+                "video_id": metadata.get("video_id"),
+                "source_file": metadata.get("source_file", ""),
+                "document": document
+            }
+            for qid, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        }
+        clusters = duplicate_clusters(
+            {qid: question["document"] for qid, question in by_id.items()},
+            self.duplicate_threshold if threshold is None else threshold
         )
+        return [[by_id[qid] for qid in cluster] for cluster in clusters]
 
     def search_similar_questions(
         self, 
         section_num: int, 
         query: str, 
-        n_results: int = 5
+        n_results: int = 5,
+        mode: str = "auto"
     ) -> List[Dict]:
-        """Search for similar questions in the vector store for sections 1-4"""
+        """Search for similar questions in the vector store for sections 1-4
+
+        Args:
+            section_num (int): Section to search
+            query (str): Topic or text to look for
+            n_results (int): Maximum number of questions returned
+            mode (str): "dense" (embeddings only), "keyword" (BM25 only, no embedding call),
+                "hybrid" (both, fused with reciprocal rank fusion) or "auto": keyword
+                for queries of at most KEYWORD_QUERY_MAX_TOKENS terms that match, else hybrid
+
+        Returns:
+            List[Dict]: Question structures, best first, with `similarity_score` (embedding
+                distance) where known, `keyword_score` (BM25) and `rrf_score` (hybrid only)
+        """
         if section_num not in [1, 2, 3, 4]:
             raise ValueError("Only sections 1, 2, 3, and 4 are supported")
-            
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}, expected one of {', '.join(SEARCH_MODES)}")
+
+        if not (SEARCH_CACHE_SIZE and SEARCH_CACHE_TTL):
+            return self._search(section_num, query, n_results, mode)
+        key = self.search_cache.key(section_num, query, n_results, mode)
+        questions = self.search_cache.get(key)
+        if questions is None:
+            generation = self.search_cache.generation(section_num)
+            questions = self._search(section_num, query, n_results, mode)
+            self.search_cache.put(key, questions, generation)
+        return questions
+
+    def _search(self, section_num: int, query: str, n_results: int, mode: str) -> List[Dict]:
         collection = self.collections[f"section{section_num}"]
         
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-        
-        # Convert results to a more usable format
+        if mode == "dense":
+            _, distances, metadatas = self._dense_search(section_num, query, n_results)
+            
+            # Convert results to a more usable format
+            questions = []
+            for idx, metadata in enumerate(metadatas):
+                question_data = json.loads(metadata['full_structure'])
+                question_data['similarity_score'] = distances[idx]
+                questions.append(question_data)
+                
+            return questions
+
+        # Fetch deeper than n_results, so fusion has overlapping candidates to work with
+        depth = n_results if mode == "keyword" else max(n_results * 4, 20)
+        keyword_hits = self.keyword_index(section_num).search(query, depth)
+        if mode == "auto":
+            if keyword_hits and len(tokenize(query)) <= KEYWORD_QUERY_MAX_TOKENS:
+                mode = "keyword"
+                keyword_hits = keyword_hits[:n_results]
+            else:
+                mode = "hybrid"
+        keyword_scores = dict(keyword_hits)
+
+        if mode == "keyword":
+            ranked = [doc_id for doc_id, _ in keyword_hits]
+            distances, metadatas, rrf_scores = {}, {}, {}
+        else:
+            dense_ids, dense_distances, dense_metadatas = self._dense_search(section_num, query, depth)
+            distances = dict(zip(dense_ids, dense_distances))
+            metadatas = dict(zip(dense_ids, dense_metadatas))
+            rrf_scores = reciprocal_rank_fusion([dense_ids, [doc_id for doc_id, _ in keyword_hits]])
+            ranked = sorted(rrf_scores, key=lambda doc_id: -rrf_scores[doc_id])[:n_results]
+
+        # Keyword-only hits still need their stored question
+        missing = [doc_id for doc_id in ranked if doc_id not in metadatas]
+        if missing:
+            stored = collection.get(ids=missing, include=['metadatas'])
+            metadatas.update(zip(stored['ids'], stored['metadatas']))
+
         questions = []
-        for idx, metadata in enumerate(results['metadatas'][0]):
-            question_data = json.loads(metadata['full_structure'])
-            question_data['similarity_score'] = results['distances'][0][idx]
+        for doc_id in ranked:
+            if doc_id not in metadatas:
+                continue
+            question_data = json.loads(metadatas[doc_id]['full_structure'])
+            if doc_id in distances:
+                question_data['similarity_score'] = distances[doc_id]
+            if doc_id in keyword_scores:
+                question_data['keyword_score'] = keyword_scores[doc_id]
+            if doc_id in rrf_scores:
+                question_data['rrf_score'] = rrf_scores[doc_id]
             questions.append(question_data)
-            
         return questions
 
+    def search_batch(self, requests: List[SearchRequest]) -> List[List[SearchHit]]:
+        """Run many dense searches, with one collection query per section and filter.
+
+        Requests that share a section and a `where` filter are answered together by
+        a single Chroma query over all their query texts. Hits carry the raw metadata
+        and only decode the question JSON on access, so callers that just need ids,
+        distances or video ids don't parse every hit.
+
+        Returns:
+            List[List[SearchHit]]: The hits of each request, in request order
+        """
+        groups = {}
+        for position, request in enumerate(requests):
+            if request.section_num not in [1, 2, 3, 4]:
+                raise ValueError("Only sections 1, 2, 3, and 4 are supported")
+            key = (request.section_num, json.dumps(request.where, sort_keys=True))
+            groups.setdefault(key, []).append(position)
+
+        results = [[] for _ in requests]
+        for (section_num, _), positions in groups.items():
+            where = requests[positions[0]].where
+            query_args = {"where": where} if where else {}
+            response = self.collections[f"section{section_num}"].query(
+                query_texts=[requests[position].query for position in positions],
+                n_results=max(requests[position].n_results for position in positions),
+                include=['metadatas', 'distances'],
+                **query_args
+            )
+            for row, position in enumerate(positions):
+                hits = zip(response['ids'][row], response['distances'][row], response['metadatas'][row])
+                results[position] = [
+                    SearchHit(qid, distance, metadata)
+                    for qid, distance, metadata in list(hits)[:requests[position].n_results]
+                ]
+        return results
+
     def get_question_by_id(self, section_num: int, question_id: str) -> Optional[Dict]:
         """Retrieve a specific question by its ID for sections 1-4"""
         if section_num not in [1, 2, 3, 4]:
@@ -172,123 +568,154 @@ class QuestionVectorStore:
         return None
 
     def parse_questions_from_file(self, filename: str) -> List[Dict]:
-        """Parse questions from a structured text file.
-           Supports keys:
-             - For Section 1: 'Text:' and 'Statements:'
+        """Parse questions from a structured text file (see backend/question_parser.py).
+           Supports German and English keys, on the key's line or the lines after it:
+             - For Section 1: 'Text:' and 'Statements:' or numbered 'Statement 1:' lines
              - For Section 2: 'Introduction:', 'Conversation:', 'Question:', 'Options:'
              - For Section 3: 'Situation:', 'Question:', 'Statements:'
              - For Section 4: 'Statement:' and 'Options:'
         """
-        questions = []
-        current_question = {}
-        
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                if line.startswith('<question>'):
-                    current_question = {}
-                elif line.startswith('Text:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Text'] = lines[i].strip()
-                elif line.startswith('Statements:'):
-                    statements = []
-                    i += 1
-                    # Read until an empty line or a line that looks like a new key or end tag
-                    while i < len(lines):
-                        next_line = lines[i].strip()
-                        if not next_line or next_line.endswith(':') or next_line.startswith('<'):
-                            break
-                        # If the line starts with a digit and a dot, remove them
-                        if next_line[0].isdigit() and next_line[1] == '.':
-                            statements.append(next_line[2:].strip())
-                        else:
-                            statements.append(next_line)
-                        i += 1
-                    current_question['Statements'] = statements
-                    continue  # skip the increment at the end of loop
-                elif line.startswith('Introduction:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Introduction'] = lines[i].strip()
-                elif line.startswith('Conversation:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Conversation'] = lines[i].strip()
-                elif line.startswith('Situation:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Situation'] = lines[i].strip()
-                elif line.startswith('Question:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Question'] = lines[i].strip()
-                elif line.startswith('Statement:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Statement'] = lines[i].strip()
-                elif line.startswith('Options:'):
-                    options = []
-                    i += 1
-                    while i < len(lines):
-                        option_line = lines[i].strip()
-                        if option_line and option_line[0].isdigit() and option_line[1] == '.':
-                            options.append(option_line[2:].strip())
-                        else:
-                            break
-                        i += 1
-                    current_question['Options'] = options
-                    continue
-                elif line.startswith('</question>'):
-                    if current_question:
-                        questions.append(current_question)
-                        current_question = {}
-                i += 1
-            return questions
-        except Exception as e:
+            return list(iter_questions_file(filename))
+        except (OSError, UnicodeDecodeError) as e:
             print(f"Error parsing questions from {filename}: {str(e)}")
             return []
 
-    def index_questions_file(self, filename: str, section_num: int):
-        """Index all questions from a file into the vector store"""
+    def index_questions_file(self, filename: str, section_num: int, manifest: Optional[Dict] = None) -> str:
+        """Index the questions of a file, skipping it if it hasn't changed since the last run.
+
+        The manifest records each file's size, mtime, content hash and question ids.
+        An unchanged size and mtime skips the file without reading it; new or edited
+        questions are upserted and questions removed from the file are deleted.
+
+        Returns:
+            str: "unchanged", "indexed" or "empty"
+        """
+        save = manifest is None
+        if manifest is None:
+            manifest = self.load_manifest()
+        key = os.path.abspath(filename)
+        entry = manifest.get(key)
+        stat = os.stat(filename)
+
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return "unchanged"
+        content_hash = file_sha256(filename)
+        if entry and entry["sha256"] == content_hash and entry["section"] == section_num:
+            # Touched but not edited
+            entry.update(size=stat.st_size, mtime=stat.st_mtime)
+            if save:
+                self.save_manifest(manifest)
+            return "unchanged"
+
         # Extract video ID from filename (assumes filename starts with the video ID)
-        video_id = os.path.basename(filename).split('_section')[0]
+        video_id = re.split(r"_(?:section|teil)\d", os.path.basename(filename))[0]
         
         # Parse questions from file
         questions = self.parse_questions_from_file(filename)
-        
-        # Add to vector store if any questions were parsed
-        if questions:
-            self.add_questions(section_num, questions, video_id)
-            print(f"Indexed {len(questions)} questions from {filename}")
+        ids = self.add_questions(section_num, questions, video_id, source_file=key) if questions else []
 
-if __name__ == "__main__":
-    # Example usage
-    store = QuestionVectorStore()
+        if entry:
+            self._delete_unreferenced(manifest, key, entry, ids)
+        manifest[key] = {
+            "section": section_num,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": content_hash,
+            "ids": ids
+        }
+        if save:
+            self.save_manifest(manifest)
+        if ids:
+            print(f"Indexed {len(ids)} questions from {filename}")
+            return "indexed"
+        return "empty"
 
-    # Automatically capture all question files in the folder
-    questions_folder = "./data/questions"
-    pattern = re.compile(r".*_teil(\d+)\.txt")
-    question_files = []
+    def index_directory(self, folder: str = QUESTIONS_DIR) -> Dict[str, int]:
+        """Incrementally index every `*_teil<N>.txt` file of a folder.
 
-    for file_path in glob.glob(os.path.join(questions_folder, "*.txt")):
-        basename = os.path.basename(file_path)
-        match = pattern.match(basename)
-        if match:
-            section_num = int(match.group(1))
-            question_files.append((file_path, section_num))
+        Questions of files that were deleted since the last run are removed too.
+        Returns how many files were indexed, unchanged, empty or removed.
+        """
+        manifest = self.load_manifest()
+        counts = {"indexed": 0, "unchanged": 0, "empty": 0, "removed": 0}
+        seen = set()
 
-    # Optionally, sort by section number
-    question_files.sort(key=lambda x: x[1])
-    
-    for filename, section_num in question_files:
-        if os.path.exists(filename):
-            store.index_questions_file(filename, section_num)
+        for file_path in sorted(glob.glob(os.path.join(folder, "*.txt"))):
+            match = QUESTION_FILE_PATTERN.match(os.path.basename(file_path))
+            if match:
+                seen.add(os.path.abspath(file_path))
+                counts[self.index_questions_file(file_path, int(match.group(1)), manifest)] += 1
+
+        folder_prefix = os.path.join(os.path.abspath(folder), "")
+        for key in [key for key in manifest if key.startswith(folder_prefix) and key not in seen]:
+            self.remove_questions_file(key, manifest)
+            counts["removed"] += 1
+
+        self.save_manifest(manifest)
+        return counts
+
+    def remove_questions_file(self, filename: str, manifest: Optional[Dict] = None) -> bool:
+        """Remove the questions indexed from a (deleted) file.
+
+        Returns:
+            bool: Whether the file was indexed
+        """
+        save = manifest is None
+        if manifest is None:
+            manifest = self.load_manifest()
+        key = os.path.abspath(filename)
+        entry = manifest.pop(key, None)
+        if entry is None:
+            return False
+        self._delete_unreferenced(manifest, key, entry, [])
+        if save:
+            self.save_manifest(manifest)
+        return True
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.persist_directory, "index_manifest.json")
+
+    def load_manifest(self) -> Dict:
+        return read_json(self.manifest_path)
+
+    def save_manifest(self, manifest: Dict):
+        write_json_atomic(self.manifest_path, manifest)
+
+    def _delete_unreferenced(self, manifest: Dict, key: str, entry: Dict, kept_ids: List[str]):
+        """Delete a file's former questions, unless the file or another file still has them."""
+        still_used = set(kept_ids)
+        for other_key, other in manifest.items():
+            if other_key != key and other["section"] == entry["section"]:
+                still_used.update(other["ids"])
+        self.delete_questions(entry["section"], [qid for qid in entry["ids"] if qid not in still_used])
+
+
+if __name__ == "__main__":
+    # Run from listening-comp/:
+    #   python -m backend.vector_store             incrementally index all question files in data/questions
+    #   python -m backend.vector_store duplicates  list clusters of near-duplicate questions in the store
+    parser = argparse.ArgumentParser(description="Index question files or report near-duplicate questions")
+    parser.add_argument("command", nargs="?", choices=["index", "duplicates"], default="index")
+    parser.add_argument("--threshold", type=float, help="similarity for the duplicates report")
+    args = parser.parse_args()
+
+    store = QuestionVectorStore()
+
+    if args.command == "duplicates":
+        for section_num in [1, 2, 3, 4]:
+            clusters = store.find_duplicates(section_num, args.threshold)
+            print(f"Section {section_num}: {len(clusters)} clusters of near-duplicate questions")
+            for cluster in clusters:
+                print(f"  {len(cluster)} copies:")
+                for question in cluster:
+                    preview = question["document"].splitlines()[0][:70] if question["document"] else ""
+                    print(f"    {question['id'][:12]} {question['video_id']}: {preview}")
+    else:
+        started = time.perf_counter()
+        counts = store.index_directory(QUESTIONS_DIR)
+        print(f"{counts} in {(time.perf_counter() - started) * 1000:.1f} ms")
     
     # Search for similar questions using a German query example from Section 2
     # similar = store.search_similar_questions(2, "Frage zum Geburtstag", n_results=1)
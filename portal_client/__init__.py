@@ -0,0 +1,21 @@
+from .client import (
+    DEFAULT_BACKEND_URL,
+    BackendClient,
+    BackendError,
+    ReviewBatch,
+    ReviewItem,
+    StudySession,
+    Word,
+)
+from .review_saver import ReviewSaver
+
+__all__ = [
+    "DEFAULT_BACKEND_URL",
+    "BackendClient",
+    "BackendError",
+    "ReviewBatch",
+    "ReviewItem",
+    "ReviewSaver",
+    "StudySession",
+    "Word",
+]
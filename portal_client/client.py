@@ -0,0 +1,250 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+DEFAULT_BACKEND_URL = os.environ.get("BACKEND_URL", "http://127.0.0.1:5000")
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def _never_sent(error):
+    """True if a ConnectionError happened while connecting, i.e. before the request went out."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class BackendError(Exception):
+    """Raised when the lang-portal backend can't be reached or answers with an error."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class Word:
+    id: int
+    german: str
+    english: str
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(id=data.get("id"), german=data.get("german", ""), english=data.get("english", ""))
+
+
+@dataclass
+class StudySession:
+    id: int
+    group_id: int
+    study_activity_id: int
+    created_at: Optional[str] = None
+
+
+@dataclass
+class ReviewItem:
+    id: int
+    study_session_id: int
+    word_id: int
+    correct: bool
+
+
+@dataclass
+class ReviewBatch:
+    batch_id: Optional[str]
+    study_session_id: int
+    items_count: int
+    duplicate: bool  # The backend had already stored this batch_id
+
+
+class BackendClient:
+    """Client for the lang-portal backend API.
+
+    All calls share one pooled keep-alive session and have a timeout. Reads are
+    retried with full-jitter exponential backoff on connection errors, timeouts
+    and 429/502/503/504. Writes are only retried when the request never reached
+    the server, so a retry can't store anything twice.
+
+    Each typed helper has an async twin prefixed with `a` (e.g. `acreate_study_session`)
+    that runs the call in a worker thread, for use from asyncio code.
+
+    Args:
+        base_url (str): Backend URL, defaults to $BACKEND_URL or http://127.0.0.1:5000
+        timeout: Seconds, or a (connect, read) tuple, applied to every request
+        max_retries (int): Retries after the first attempt
+        backoff_base (float): First backoff ceiling in seconds, doubled per retry
+        backoff_max (float): Upper bound of a single backoff
+        pool_size (int): Keep-alive connections kept open to the backend
+    """
+
+    def __init__(self, base_url=None, timeout=DEFAULT_TIMEOUT, max_retries=3,
+                 backoff_base=0.1, backoff_max=2.0, pool_size=10):
+        self.base_url = (base_url or DEFAULT_BACKEND_URL).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        """Send a request and return the decoded JSON body.
+
+        Args:
+            method (str): HTTP method
+            path (str): Path below the base URL, e.g. "/groups/1/words/raw"
+            idempotent (bool): Whether the request may be retried after reaching the
+                server; defaults to True for GET/HEAD/PUT/DELETE
+            **kwargs: Passed on to requests (params, json, ...)
+
+        Returns:
+            The JSON response, or None for empty bodies
+
+        Raises:
+            BackendError: On connection failures once retries are exhausted, and on error responses
+        """
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD", "PUT", "DELETE")
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.base_url + path
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # A failed connect never reached the backend, so any method can be resent
+                if attempt >= self.max_retries or not (idempotent or _never_sent(e)):
+                    raise BackendError(f"{method} {url} failed: {e}") from e
+            except requests.exceptions.Timeout as e:
+                if attempt >= self.max_retries or not idempotent:
+                    raise BackendError(f"{method} {url} timed out: {e}") from e
+            else:
+                if response.status_code in RETRY_STATUSES and idempotent and attempt < self.max_retries:
+                    response.close()
+                else:
+                    return self._decode(method, url, response)
+            time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+            attempt += 1
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def group_words(self, group_id, fields=("id", "german", "english")) -> List[Word]:
+        """All words of a group, with only the columns a Word needs."""
+        data = self.get(f"/groups/{group_id}/words/raw", params={"fields": ",".join(fields)})
+        return [Word.from_json(word) for word in data.get("raw_words", [])]
+
+    def sample_words(self, group_id, n=1, rng=None) -> List[Word]:
+        """`n` distinct random words of a group (fewer if the group is smaller)."""
+        words = self.group_words(group_id)
+        return (rng or random).sample(words, min(n, len(words)))
+
+    def create_study_session(self, group_id, study_activity_id, idempotency_key=None) -> StudySession:
+        """Start a study session.
+
+        Args:
+            group_id (int): Group of words being studied
+            study_activity_id (int): Activity performed
+            idempotency_key (str): With one the request is retried like a read, and
+                the backend returns the session it already created for the key
+        """
+        data = self.post(
+            "/study_sessions",
+            json={"group_id": group_id, "study_activity_id": study_activity_id, "idempotency_key": idempotency_key},
+            idempotent=idempotency_key is not None
+        )
+        return StudySession(
+            id=data["session_id"],
+            group_id=data["group_id"],
+            study_activity_id=data["study_activity_id"],
+            created_at=data.get("created_at")
+        )
+
+    def add_review(self, study_session_id, word_id, correct) -> ReviewItem:
+        data = self.post(
+            f"/study_sessions/{study_session_id}/review",
+            json={"word_id": word_id, "correct_count": bool(correct)}
+        )
+        return ReviewItem(
+            id=data["id"],
+            study_session_id=data["study_session_id"],
+            word_id=data["word_id"],
+            correct=bool(data["correct_count"])
+        )
+
+    def add_reviews(self, study_session_id, items, batch_id=None) -> ReviewBatch:
+        """Store several review items in one request.
+
+        Args:
+            study_session_id (int): Session the items belong to
+            items (list): Dicts with "word_id" and "correct"
+            batch_id (str): Idempotency key; with one the request is retried like a
+                read, and the backend ignores a batch it has already stored
+
+        Returns:
+            ReviewBatch: What the backend stored
+        """
+        data = self.post(
+            f"/study_sessions/{study_session_id}/reviews",
+            json={
+                "batch_id": batch_id,
+                "items": [{"word_id": item["word_id"], "correct_count": bool(item["correct"])} for item in items]
+            },
+            idempotent=batch_id is not None
+        )
+        return ReviewBatch(
+            batch_id=data["batch_id"],
+            study_session_id=data["study_session_id"],
+            items_count=data["items_count"],
+            duplicate=data["duplicate"]
+        )
+
+    async def agroup_words(self, group_id, fields=("id", "german", "english")) -> List[Word]:
+        return await asyncio.to_thread(self.group_words, group_id, fields)
+
+    async def asample_words(self, group_id, n=1, rng=None) -> List[Word]:
+        return await asyncio.to_thread(self.sample_words, group_id, n, rng)
+
+    async def acreate_study_session(self, group_id, study_activity_id, idempotency_key=None) -> StudySession:
+        return await asyncio.to_thread(self.create_study_session, group_id, study_activity_id, idempotency_key)
+
+    async def aadd_review(self, study_session_id, word_id, correct) -> ReviewItem:
+        return await asyncio.to_thread(self.add_review, study_session_id, word_id, correct)
+
+    async def aadd_reviews(self, study_session_id, items, batch_id=None) -> ReviewBatch:
+        return await asyncio.to_thread(self.add_reviews, study_session_id, items, batch_id)
+
+    def _decode(self, method, url, response):
+        try:
+            data = response.json() if response.content else None
+        except ValueError:
+            data = None
+        if response.status_code >= 400:
+            error = data.get("error") if isinstance(data, dict) else None
+            raise BackendError(
+                f"{method} {url} returned {response.status_code}: {error or response.reason}",
+                status_code=response.status_code
+            )
+        return data
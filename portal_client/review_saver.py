@@ -0,0 +1,176 @@
+import atexit
+import threading
+import time
+import uuid
+
+from .client import BackendError
+
+MAX_BATCH_ITEMS = 500  # Stays below the backend's limit of 1000 per request
+
+
+class _PendingSession:
+    def __init__(self, key, group_id, study_activity_id, study_session_id):
+        self.key = key
+        self.group_id = group_id
+        self.study_activity_id = study_activity_id
+        self.study_session_id = study_session_id
+        # Sent with every attempt to create the study session, so a retry after a timeout reuses it
+        self.session_request_key = uuid.uuid4().hex
+        self.items = []  # Not sent yet
+        self.batch = None  # (batch_id, items) being sent; kept until the backend has stored it
+        self.oldest = None  # When the oldest unsent item was added
+        self.flush_requested = False
+        self.last_activity = time.monotonic()
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.saved = 0
+
+
+class ReviewSaver:
+    """Saves review items to the backend in the background, in batches.
+
+    Items are collected per learner session and flushed by one worker thread
+    once `flush_count` items are waiting or the oldest has waited
+    `flush_interval` seconds. The study session is created with the first
+    batch, with a key that makes retrying it safe. Each batch gets an id that is
+    reused for every retry, and a batch is only dropped once the backend
+    confirmed it, so failures never lose or duplicate items or sessions. `end_session` and process exit flush whatever is left.
+
+    Args:
+        client (BackendClient): Client used to talk to the backend
+        flush_count (int): Unsent items that trigger a flush
+        flush_interval (float): Seconds an item may wait before it is flushed
+        retry_interval (float): First wait after a failed flush, doubled per failure up to a minute
+        idle_timeout (float): Seconds after which a fully saved, inactive session is forgotten
+        on_error: Called as on_error(key, error) when a flush fails
+    """
+
+    def __init__(self, client, flush_count=10, flush_interval=5.0, retry_interval=1.0,
+                 idle_timeout=3600.0, on_error=None):
+        self.client = client
+        self.flush_count = flush_count
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.idle_timeout = idle_timeout
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sessions = {}
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="review-saver", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, key, group_id, study_activity_id, word_id, correct, study_session_id=None):
+        """Queue one review item for the learner session `key`; never blocks on the network.
+
+        `study_session_id` continues an existing study session; otherwise one is
+        created with the first batch.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is None:
+                state = self._sessions[key] = _PendingSession(key, group_id, study_activity_id, study_session_id)
+            state.items.append({"word_id": word_id, "correct": correct})
+            state.last_activity = now
+            if state.oldest is None:
+                state.oldest = now
+            if len(state.items) >= self.flush_count:
+                self._wakeup.notify()
+
+    def end_session(self, key):
+        """Flush everything the session has left, in the background."""
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is not None and (state.items or state.batch):
+                state.flush_requested = True
+                self._wakeup.notify()
+
+    def pending(self, key):
+        """Number of the session's items the backend hasn't confirmed yet."""
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is None:
+                return 0
+            return len(state.items) + (len(state.batch[1]) if state.batch else 0)
+
+    def study_session_id(self, key):
+        with self._lock:
+            state = self._sessions.get(key)
+            return state.study_session_id if state else None
+
+    def close(self, timeout=10.0):
+        """Flush all sessions, waiting at most `timeout` seconds. Runs at interpreter exit."""
+        with self._lock:
+            self._closing = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        tick = min(1.0, self.flush_interval / 2)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                due = [state for state in self._sessions.values() if self._is_due(state, now)]
+                if not due:
+                    if self._closing and not any(state.items or state.batch for state in self._sessions.values()):
+                        return
+                    self._forget_idle(now)
+                    self._wakeup.wait(tick)
+                    continue
+            for state in due:
+                self._flush(state)
+
+    def _is_due(self, state, now):
+        if not (state.items or state.batch) or now < state.next_attempt:
+            return False
+        return (
+            state.batch is not None
+            or self._closing
+            or state.flush_requested
+            or len(state.items) >= self.flush_count
+            or now - state.oldest >= self.flush_interval
+        )
+
+    def _forget_idle(self, now):
+        for key, state in list(self._sessions.items()):
+            if not (state.items or state.batch) and now - state.last_activity > self.idle_timeout:
+                del self._sessions[key]
+
+    def _flush(self, state):
+        with self._lock:
+            if state.batch is None:
+                items = state.items[:MAX_BATCH_ITEMS]
+                del state.items[:len(items)]
+                state.batch = (uuid.uuid4().hex, items)
+                state.oldest = time.monotonic() if state.items else None
+                state.flush_requested = state.flush_requested and bool(state.items)
+            batch_id, items = state.batch
+
+        try:
+            if state.study_session_id is None:
+                state.study_session_id = self.client.create_study_session(
+                    state.group_id, state.study_activity_id, idempotency_key=state.session_request_key
+                ).id
+            self.client.add_reviews(state.study_session_id, items, batch_id=batch_id)
+        except BackendError as e:
+            with self._lock:
+                if e.status_code == 404:
+                    # The study session was deleted (history reset); save into a new one
+                    state.study_session_id = None
+                    state.session_request_key = uuid.uuid4().hex
+                elif e.status_code == 400:
+                    # The backend will never accept this batch; retrying can't help
+                    state.batch = None
+                state.failures += 1
+                state.next_attempt = time.monotonic() + min(60.0, self.retry_interval * 2 ** (state.failures - 1))
+            if self.on_error:
+                self.on_error(state.key, e)
+            return
+
+        with self._lock:
+            state.batch = None
+            state.saved += len(items)
+            state.failures = 0
+            state.next_attempt = 0.0
@@ -1,58 +1,80 @@
 import sys
 from pathlib import Path
-import requests
-import random
+import os
 
 sys.path.append(str(Path(__file__).parent.parent))
 
 from themes.gradio_theme import apply_custom_theme
+from app_logging import get_logger
+from portal_client import BackendClient, BackendError, ReviewSaver
+from word_cache import WordCache
 
 theme = apply_custom_theme(primary_color="#90cdec")
 
 import gradio as gr
 
-BACKEND_URL = "http://127.0.0.1:5000"
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://127.0.0.1:5000")
 SCRIPT_DIR = Path(__file__).parent
-
-def log_message(message):
-    with open("log.txt", "a") as logfile:
-        logfile.write(message + "\n")
-
-def fetch_random_word(current_group):
+WORD_CACHE_TTL = float(os.environ.get("WORD_CACHE_TTL", 300))
+REVIEW_FLUSH_COUNT = int(os.environ.get("REVIEW_FLUSH_COUNT", 10))
+REVIEW_FLUSH_INTERVAL = float(os.environ.get("REVIEW_FLUSH_INTERVAL", 5))
+STUDY_ACTIVITY_ID = 2
+# Gradio queue limits: events handled in parallel (0 keeps Gradio's default of no queue),
+# and events allowed to wait (0 = unlimited)
+QUEUE_CONCURRENCY = int(os.environ.get("GRADIO_CONCURRENCY_COUNT", 0))
+QUEUE_MAX_SIZE = int(os.environ.get("GRADIO_QUEUE_MAX_SIZE", 0)) or None
+SERVER_PORT = int(os.environ.get("GRADIO_SERVER_PORT", 6001))
+
+logger = get_logger("vocabulary-practice", log_dir=SCRIPT_DIR / "logs")
+
+backend = BackendClient(BACKEND_URL)
+
+def fetch_group_words(current_group):
+    words = backend.group_words(current_group)
+    logger.info("group_words_fetched", group_id=current_group, words=len(words))
+    return words
+
+def log_refresh_error(current_group, error):
+    logger.warning("group_words_refresh_failed", group_id=current_group, error=str(error))
+
+# Words are fetched once per group and refreshed in the background after the TTL,
+# so drawing the next word is an in-memory pop from the session's pre-drawn queue
+word_cache = WordCache(fetch_group_words, ttl=WORD_CACHE_TTL, on_error=log_refresh_error)
+
+def log_save_error(session_key, error):
+    logger.warning("review_save_failed", session=session_key, error=str(error), status=error.status_code)
+
+# Review items are saved in the background in batches, while the learner keeps playing
+review_saver = ReviewSaver(
+    backend,
+    flush_count=REVIEW_FLUSH_COUNT,
+    flush_interval=REVIEW_FLUSH_INTERVAL,
+    on_error=log_save_error
+)
+
+def fetch_random_word(current_group, session_key=None):
     try:
-        log_message(f"Fetching random word for group: {current_group}")
-        response = requests.get(
-            f"{BACKEND_URL}/groups/{current_group}/words/raw",
-            timeout=5
-        )
-        log_message(f"HTTP GET request to: {BACKEND_URL}/groups/{current_group}/words/raw, status code: {response.status_code}")
-        response.raise_for_status()
-        data = response.json()
-        words = data.get("raw_words", [])
-        if not words:
-            log_message("No words found for this group.")
+        random_word = word_cache.next_word(current_group, session_key)
+        if random_word is None:
+            logger.warning("group_empty", group_id=current_group)
             return None, "🟡 No words found for this group.", None
-        random_word = random.choice(words)
-        log_message("Selected random word: " + str(random_word))
-        english = random_word.get("english", "Unknown")
-        log_message("Selected random word english: " + str(english))
-        german = random_word.get("german", "Unknown")
-        word_id = random_word.get("id", None)
-        log_message(f"Returning word - English: {english}, German: {german}, ID: {word_id}")
+        english = random_word.english or "Unknown"
+        german = random_word.german or "Unknown"
+        word_id = random_word.id
+        logger.debug("word_drawn", group_id=current_group, word_id=word_id)
         return english, german, word_id
-    except requests.exceptions.RequestException as e:
-        log_message(f"❌ Error fetching data: {e}")
+    except BackendError as e:
+        logger.error("group_words_fetch_failed", group_id=current_group, error=str(e))
         return None, f"❌ Error fetching data: {e}", None
 
-def generate_word(current_group):
-    english_word, correct_german, word_id = fetch_random_word(current_group)
+def generate_word(current_group, session_key=None):
+    english_word, correct_german, word_id = fetch_random_word(current_group, session_key)
     if not english_word:
         return "", "", correct_german, None
     return english_word, "", correct_german, word_id
 
 def get_url_params():
     import urllib.parse
-    import os
     
     url_path = os.environ.get('GRADIO_SERVER_PATH', '')
     if '?' in url_path:
@@ -62,27 +84,24 @@ def get_url_params():
 
 def init_game(request: gr.Request):
     url_params = get_url_params()
-    log_message(f"URL params: {url_params}")
     
     group_id = url_params.get("group_id", "1") 
     session_id = url_params.get("session_id")
     
-    log_message(f"Using group_id: {group_id}, session_id: {session_id}")
+    logger.info("game_started", group_id=group_id, study_session_id=session_id, url_params=url_params)
     
     if not group_id:
         return session_id, None, "No group id provided.", "", "", None
 
-    english_word, correct_german, word_id = fetch_random_word(group_id)
+    english_word, correct_german, word_id = fetch_random_word(group_id, request.session_hash)
     return session_id, group_id, english_word, "", correct_german, word_id
 
-def check_answer_and_generate(user_input, english_word, correct_german, review_items, current_word_id, current_group):
+def check_answer_and_generate(user_input, english_word, correct_german, current_word_id, study_session_id, current_group, request: gr.Request):
     correct = user_input.strip().lower() == correct_german.lower()
-    log_message(f"current_id: {current_word_id}")
-    log_message(f"correct: {correct}")
+    logger.debug("answer_checked", word_id=current_word_id, correct=correct)
     
-    review_items = review_items or []
-    review_items.append({"word_id": current_word_id, "correct": correct})
-    log_message(f"review_items: {review_items}")
+    # Queued only; the review saver flushes it to the backend in the background
+    review_saver.add(request.session_hash, current_group, STUDY_ACTIVITY_ID, current_word_id, correct, study_session_id=study_session_id)
     
     # Build the feedback message BEFORE fetching the new word
     if correct:
@@ -90,14 +109,13 @@ def check_answer_and_generate(user_input, english_word, correct_german, review_i
     else:
         message = f"<p style='color:red;'>❌ Incorrect. '{english_word}' in German is '{correct_german}'.</p>"
     
-    # Now get the new word for the next round
-    new_english, _, new_german, new_id = generate_word(current_group)
+    # Now get the new word for the next round; served from the session's pre-drawn queue
+    new_english, _, new_german, new_id = generate_word(current_group, request.session_hash)
     
     if correct:
         return (
             gr.update(value=message, visible=True),      # result_success
             gr.update(value="", visible=False),           # result_error
-            review_items,                                 # review_items_state
             new_english,                                  # english_output
             "",                                           # answer_input (cleared)
             new_german,                                   # hidden_correct (new word's german)
@@ -107,40 +125,18 @@ def check_answer_and_generate(user_input, english_word, correct_german, review_i
         return (
             gr.update(value="", visible=False),           # result_success
             gr.update(value=message, visible=True),         # result_error
-            review_items,                                   # review_items_state
             new_english,                                    # english_output
             "",                                            # answer_input (cleared)
             new_german,                                    # hidden_correct (new word's german)
             new_id                                         # hidden_id (new word's id)
         )
 
-def save_study_session(study_session_id, review_items, current_group):
-    log_message(f"study_session_id: {study_session_id}")
-    log_message(f"review_items: {review_items}")
-    log_message(f"current_group: {current_group}")
-    if not review_items:
-        return study_session_id, []
-    if not study_session_id:
-        payload = {"group_id": current_group, "study_activity_id": 2}
-        try:
-            response = requests.post(f"{BACKEND_URL}/study_sessions", json=payload)
-            log_message(f"response: {response}")
-            response.raise_for_status()
-            data = response.json()
-            study_session_id = data["session_id"]
-        except Exception as e:
-            raise gr.Error(f"Failed to create study session: {e}")
-    for item in review_items:
-        payload = {"word_id": item["word_id"], "correct_count": item["correct"]}
-        log_message(f"payload: {payload}")
-        try:
-            response = requests.post(f"{BACKEND_URL}/study_sessions/{study_session_id}/review", json=payload)
-            response.raise_for_status()
-            log_message(f"response: {response}")
-        except Exception as e:
-            raise gr.Error("Failed to save study session")
-    gr.Info("💾 Study session saved!")
-    return study_session_id, []
+def save_study_session(session_key):
+    # Returns at once; the remaining items are flushed in the background
+    pending = review_saver.pending(session_key)
+    logger.info("study_session_save_requested", session=session_key, pending=pending)
+    review_saver.end_session(session_key)
+    return pending
 
 with gr.Blocks(
     theme=theme,
@@ -154,7 +150,6 @@ with gr.Blocks(
     gr.HTML("<h1> ✍🏼 English to German Vocabulary Practice </h1>")
 
     study_session_state = gr.State(None)
-    review_items_state = gr.State([])
     current_group_state = gr.State(None)
     
     with gr.Row():
@@ -171,28 +166,32 @@ with gr.Blocks(
         check_button = gr.Button("Check Answer", variant="primary")
         save_button = gr.Button("Save Study Session", variant="primary")
     
-    demo.load(fn=init_game, outputs=[study_session_state, current_group_state, english_output, answer_input, hidden_correct, hidden_id])
+    demo.load(fn=init_game, outputs=[study_session_state, current_group_state, english_output, answer_input, hidden_correct, hidden_id], api_name="init")
 
     check_button.click(
         fn=check_answer_and_generate,
-        inputs=[answer_input, english_output, hidden_correct, review_items_state, hidden_id, current_group_state],
-        outputs=[result_success, result_error, review_items_state, english_output, answer_input, hidden_correct, hidden_id]
+        inputs=[answer_input, english_output, hidden_correct, hidden_id, study_session_state, current_group_state],
+        outputs=[result_success, result_error, english_output, answer_input, hidden_correct, hidden_id],
+        api_name="check"
     )
 
     save_notification = gr.Markdown(visible=False)
 
-    def handle_save(study_session_id, review_items, current_group):
+    def handle_save(request: gr.Request):
         # Save the session
-        new_session_id, new_items = save_study_session(study_session_id, review_items, current_group)
+        pending = save_study_session(request.session_hash)
         # Update notification
-        notification = "**💾 Study session saved successfully!**"
+        if pending:
+            notification = f"**💾 Saving {pending} review items in the background...**"
+        else:
+            notification = "**💾 Study session saved successfully!**"
         # Clear error message
-        return new_session_id, new_items, gr.update(value=notification, visible=True), gr.update(value="", visible=False)
+        return gr.update(value=notification, visible=True), gr.update(value="", visible=False)
 
     save_button.click(
         fn=handle_save,
-        inputs=[study_session_state, review_items_state, current_group_state],
-        outputs=[study_session_state, review_items_state, save_notification, result_error]
+        outputs=[save_notification, result_error],
+        api_name="save"
     )
 
     check_button.click(
@@ -202,4 +201,6 @@ with gr.Blocks(
 
     gr.Markdown("Save progress and close the tab when finished.")
 
-demo.launch(server_port=6001, server_name="127.0.0.1", show_error=True)
\ No newline at end of file
+if QUEUE_CONCURRENCY:
+    demo.queue(concurrency_count=QUEUE_CONCURRENCY, max_size=QUEUE_MAX_SIZE)
+demo.launch(server_port=SERVER_PORT, server_name="127.0.0.1", show_error=True)
\ No newline at end of file
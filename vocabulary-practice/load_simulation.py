@@ -0,0 +1,277 @@
+"""Load simulation for the vocabulary practice app: N virtual learners against one app process.
+
+Starts a stand-in of the lang-portal backend and the Gradio app (app.py) with the
+given queue limits, then has every virtual learner open its own Gradio session,
+answer words through the "check" endpoint and periodically hit "save". Reports
+throughput and latency percentiles per endpoint, plus the requests the backend saw.
+
+Usage:
+  python load_simulation.py [--users 20] [--duration 30] [--concurrency-count 4] [--max-size 0]
+  python load_simulation.py --app-url http://127.0.0.1:6001  # an app that is already running
+"""
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+from gradio_client import Client
+
+SCRIPT_DIR = Path(__file__).parent
+
+
+class StubBackend(ThreadingHTTPServer):
+    """Stand-in for the lang-portal backend, with just the routes the app uses."""
+
+    daemon_threads = True
+
+    def __init__(self, words=200, latency=0.0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.words = [
+            {"id": i, "german": f"wort{i}", "english": f"word {i}"} for i in range(1, words + 1)
+        ]
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.sessions = 0
+        self.batches = set()
+        self.review_items = 0
+
+    def count(self, route):
+        with self.lock:
+            self.requests[route] += 1
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count("GET /groups/:id/words/raw")
+        if not re.fullmatch(r"/groups/\d+/words/raw(\?.*)?", self.path):
+            return self.reply(404, {"error": "Not found"})
+        self.reply(200, {"raw_words": self.server.words})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        if self.path == "/study_sessions":
+            server.count("POST /study_sessions")
+            with server.lock:
+                server.sessions += 1
+                session_id = server.sessions
+            return self.reply(201, {
+                "session_id": session_id,
+                "group_id": body.get("group_id"),
+                "study_activity_id": body.get("study_activity_id"),
+                "created_at": None
+            })
+        match = re.fullmatch(r"/study_sessions/(\d+)/reviews?", self.path)
+        if not match:
+            return self.reply(404, {"error": "Not found"})
+        if self.path.endswith("/reviews"):
+            server.count("POST /study_sessions/:id/reviews")
+            items = body.get("items", [])
+            with server.lock:
+                duplicate = body.get("batch_id") in server.batches
+                if not duplicate:
+                    server.batches.add(body.get("batch_id"))
+                    server.review_items += len(items)
+            return self.reply(200 if duplicate else 201, {
+                "batch_id": body.get("batch_id"),
+                "study_session_id": int(match.group(1)),
+                "items_count": len(items),
+                "duplicate": duplicate
+            })
+        server.count("POST /study_sessions/:id/review")
+        with server.lock:
+            server.review_items += 1
+        self.reply(201, {
+            "id": server.review_items,
+            "study_session_id": int(match.group(1)),
+            "word_id": body.get("word_id"),
+            "correct_count": body.get("correct_count")
+        })
+
+    def reply(self, status, data):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def timed(results, endpoint, call):
+    start = time.perf_counter()
+    try:
+        result = call()
+        ok = True
+    except Exception:
+        result, ok = None, False
+    results.record(endpoint, time.perf_counter() - start, ok)
+    return result
+
+
+def virtual_user(app_url, answers_per_save, accuracy, deadline, results, seed):
+    rng = random.Random(seed)
+    try:
+        client = Client(app_url, verbose=False)
+    except Exception:
+        results.record("connect", 0.0, False)
+        return
+    # Outputs without the State components: english, answer, correct german, word id
+    word = timed(results, "init", lambda: client.predict(api_name="/init"))
+    answers = 0
+    while word is not None and time.monotonic() < deadline:
+        english, _, german, word_id = word
+        answer = german if rng.random() < accuracy else "falsch"
+        outputs = timed(results, "check", lambda: client.predict(answer, english, german, word_id, api_name="/check"))
+        if outputs is not None:
+            word = outputs[2], outputs[3], outputs[4], outputs[5]
+        answers += 1
+        if answers % answers_per_save == 0:
+            timed(results, "save", lambda: client.predict(api_name="/save"))
+    timed(results, "save", lambda: client.predict(api_name="/save"))
+
+
+def start_app(backend_url, port, concurrency_count, max_size):
+    env = dict(
+        os.environ,
+        BACKEND_URL=backend_url,
+        GRADIO_SERVER_PORT=str(port),
+        GRADIO_CONCURRENCY_COUNT=str(concurrency_count),
+        GRADIO_QUEUE_MAX_SIZE=str(max_size),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "app.py"], cwd=SCRIPT_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    app_url = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    while time.monotonic() - started < 60:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py exited with code {process.returncode}")
+        try:
+            if requests.get(app_url, timeout=1).ok:
+                return process, app_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("app.py did not start within 60 seconds")
+
+
+def stop_app(process):
+    # SIGINT rather than SIGTERM, so the app's exit handlers run
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual learners")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--answers-per-save", type=int, default=10)
+    parser.add_argument("--accuracy", type=float, default=0.7, help="share of correct answers")
+    parser.add_argument("--concurrency-count", type=int, default=4, help="Gradio queue concurrency, 0 disables the queue")
+    parser.add_argument("--max-size", type=int, default=0, help="Gradio queue max size, 0 for unlimited")
+    parser.add_argument("--port", type=int, default=6101, help="port for the app under test")
+    parser.add_argument("--backend-latency", type=float, default=0.02, help="seconds added to every backend response")
+    parser.add_argument("--words", type=int, default=200, help="words in the stand-in group")
+    parser.add_argument("--app-url", help="drive an already running app instead of starting one")
+    args = parser.parse_args()
+
+    backend = process = None
+    app_url = args.app_url
+    if app_url is None:
+        backend = StubBackend(words=args.words, latency=args.backend_latency)
+        threading.Thread(target=backend.serve_forever, daemon=True).start()
+        process, app_url = start_app(backend.url, args.port, args.concurrency_count, args.max_size)
+
+    try:
+        results = Results()
+        deadline = time.monotonic() + args.duration
+        users = [
+            threading.Thread(
+                target=virtual_user,
+                args=(app_url, args.answers_per_save, args.accuracy, deadline, results, seed)
+            )
+            for seed in range(args.users)
+        ]
+        start = time.perf_counter()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.perf_counter() - start
+
+        total = sum(len(latencies) for latencies in results.latencies.values())
+        errors = sum(results.errors.values())
+        queue = f"concurrency_count={args.concurrency_count}, max_size={args.max_size or 'unlimited'}"
+        print(f"{args.users} virtual learners for {elapsed:.1f}s against {app_url} ({queue})")
+        print(f"{total} calls, {total / elapsed:.1f} calls/s, {errors} errors ({errors / max(total, 1):.2%})")
+        print(f"{'endpoint':<10} {'count':>7} {'calls/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for endpoint, latencies in sorted(results.latencies.items()):
+            print(
+                f"{endpoint:<10} {len(latencies):>7} {len(latencies) / elapsed:>8.1f} "
+                f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 90) * 1000:>8.1f} "
+                f"{percentile(latencies, 99) * 1000:>8.1f} {results.errors[endpoint]:>7}"
+            )
+
+        if backend is not None:
+            # Stopping the app runs its final flush of queued review items
+            stop_app(process)
+            process = None
+            print("Backend requests:")
+            for route, count in sorted(backend.requests.items()):
+                print(f"  {route:<36} {count}")
+            print(f"  {'review items stored':<36} {backend.review_items}")
+    finally:
+        if process is not None:
+            stop_app(process)
+        if backend is not None:
+            backend.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class WordCache:
+    """In-process cache of each group's words, with a TTL and background refresh.
+
+    Stale words keep being served while a background thread refetches them, so
+    only the very first lookup of a group waits for the backend. Each session
+    also gets a small queue of pre-drawn words, so showing the next word is an
+    in-memory pop.
+    """
+
+    def __init__(self, fetch_words, ttl=300.0, queue_size=5, max_sessions=1000, on_error=None):
+        self.fetch_words = fetch_words  # group_id -> list of word dicts, raises on failure
+        self.ttl = ttl
+        self.queue_size = queue_size
+        self.max_sessions = max_sessions
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._groups = {}  # group_id -> (fetched_at, words)
+        self._refreshing = set()
+        self._queues = OrderedDict()  # (session_key, group_id) -> deque of pre-drawn words, oldest session first
+
+    def get_words(self, group_id):
+        """Words of a group; blocks only if the group has never been fetched."""
+        with self._lock:
+            entry = self._groups.get(group_id)
+        if entry is None:
+            return self._load(group_id)
+        fetched_at, words = entry
+        if time.monotonic() - fetched_at > self.ttl:
+            self.refresh_async(group_id)
+        return words
+
+    def refresh_async(self, group_id):
+        """Refetch a group's words in a background thread (at most one refresh per group at a time)."""
+        with self._lock:
+            if group_id in self._refreshing:
+                return
+            self._refreshing.add(group_id)
+        threading.Thread(target=self._refresh, args=(group_id,), daemon=True).start()
+
+    def next_word(self, group_id, session_key):
+        """Pop the next pre-drawn word for a session and top its queue back up. Returns None for empty groups."""
+        words = self.get_words(group_id)
+        if not words:
+            return None
+        key = (session_key, group_id)
+        with self._lock:
+            queue = self._queues.pop(key, None) or deque()
+            self._queues[key] = queue
+            while len(self._queues) > self.max_sessions:
+                self._queues.popitem(last=False)
+            while len(queue) <= self.queue_size:
+                queue.append(self._draw(words, queue[-1] if queue else None))
+            return queue.popleft()
+
+    def invalidate(self, group_id=None):
+        with self._lock:
+            if group_id is None:
+                self._groups.clear()
+                self._queues.clear()
+            else:
+                self._groups.pop(group_id, None)
+                for key in [key for key in self._queues if key[1] == group_id]:
+                    del self._queues[key]
+
+    def _draw(self, words, previous):
+        # Avoid showing the same word twice in a row when the group has a choice
+        word = random.choice(words)
+        if previous is not None and len(words) > 1:
+            while word is previous:
+                word = random.choice(words)
+        return word
+
+    def _load(self, group_id):
+        words = self.fetch_words(group_id)
+        with self._lock:
+            self._groups[group_id] = (time.monotonic(), words)
+        return words
+
+    def _refresh(self, group_id):
+        try:
+            self._load(group_id)
+        except Exception as e:
+            # Keep serving the stale words; the next lookup after the TTL tries again
+            if self.on_error:
+                self.on_error(group_id, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(group_id)
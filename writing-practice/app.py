@@ -1,6 +1,7 @@
 import boto3
 import json
 import sys
+import time
 from pathlib import Path
 
 # Initialize the Bedrock runtime client in the eu-west-1 region
@@ -11,6 +12,7 @@ MODEL_ID = "mistral.mistral-large-2402-v1:0"
 sys.path.append(str(Path(__file__).parent.parent))
 
 from themes.streamlit_theme import apply_custom_theme
+from app_logging import get_logger
 
 import streamlit as st
 
@@ -21,6 +23,9 @@ st.set_page_config(
 
 apply_custom_theme(primary_color="#90cdec")
 
+# Returns the same logger on every Streamlit rerun
+logger = get_logger("writing-practice", log_dir=Path(__file__).parent / "logs")
+
 def parse_response(response):
     raw_body = response.get("body")
     if hasattr(raw_body, "read"):
@@ -35,6 +40,7 @@ def generate_target_sentence():
     messages = [
         {"role": "user", "content": "Generate an English sentence that is scoped to Goethe B1 grammar. Provide just the sentence. Choose different topics everytime."}
     ]
+    started = time.perf_counter()
     response = client.invoke_model(
         modelId=MODEL_ID,
         contentType='application/json',
@@ -45,6 +51,7 @@ def generate_target_sentence():
         })
     )
     result = parse_response(response)
+    logger.info("sentence_generated", model=MODEL_ID, seconds=round(time.perf_counter() - started, 3))
     if "choices" in result and result["choices"]:
         return result["choices"][0]["message"]["content"].strip()
     return "No sentence generated."
@@ -69,6 +76,7 @@ def grade_submission(target_sentence, submission):
             "*Correct Sentence:*"
         )}
     ]
+    started = time.perf_counter()
     response = client.invoke_model(
         modelId=MODEL_ID,
         contentType='application/json',
@@ -79,6 +87,7 @@ def grade_submission(target_sentence, submission):
         })
     )
     result = parse_response(response)
+    logger.info("submission_graded", model=MODEL_ID, submission_chars=len(submission), seconds=round(time.perf_counter() - started, 3))
     if "choices" in result and result["choices"]:
         return result["choices"][0]["message"]["content"].strip()
     return "No assessment provided."